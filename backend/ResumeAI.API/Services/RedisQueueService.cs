@@ -1,6 +1,8 @@
 using Microsoft.Extensions.Options;
 using Npgsql;
 using StackExchange.Redis;
+using System.Security.Cryptography;
+using System.Text;
 using System.Text.Json;
 using ResumeAI.API.Models;
 
@@ -36,6 +38,22 @@ namespace ResumeAI.API.Services
             
             try
             {
+                // Idempotency: the same resumes/JD/plan for the same user maps to one queued or running job
+                var dedupKey = $"job:dedup:{GetJobFingerprint("bulk_analysis", request)}";
+                if (!await _database.StringSetAsync(dedupKey, jobId, TimeSpan.FromHours(1), When.NotExists))
+                {
+                    var existingJobId = (string?)await _database.StringGetAsync(dedupKey);
+                    var existingJob = existingJobId != null ? await GetJobAsync(existingJobId) : null;
+                    if (existingJob != null && existingJob.Status is JobStatus.Queued or JobStatus.Processing)
+                    {
+                        _logger.LogInformation($"Duplicate bulk analysis request for job {existingJobId}, returning the existing job");
+                        return existingJobId!;
+                    }
+
+                    // The earlier job already finished; this submission starts a new one
+                    await _database.StringSetAsync(dedupKey, jobId, TimeSpan.FromHours(1));
+                }
+
                 // Store job in database
                 var job = new ProcessingJob
                 {
@@ -450,6 +468,21 @@ namespace ResumeAI.API.Services
             return priority > 0 ? $"queue:{jobType}:high" : $"queue:{jobType}:normal";
         }
 
+        // Must match job_fingerprint in recruiter_ai_service/services/job_coalescer.py
+        private static string GetJobFingerprint(string jobType, BulkAnalysisJobRequest request)
+        {
+            var resumeIds = request.ResumeIds.Select(id => id.ToLowerInvariant()).OrderBy(id => id, StringComparer.Ordinal);
+            var canonical = string.Join("|",
+                jobType,
+                request.UserId.ToLowerInvariant(),
+                request.JobDescriptionId.ToLowerInvariant(),
+                (string.IsNullOrEmpty(request.PlanType) ? "free" : request.PlanType).ToLowerInvariant(),
+                string.Join(",", resumeIds));
+
+            var hash = SHA256.HashData(Encoding.UTF8.GetBytes(canonical));
+            return Convert.ToHexString(hash).ToLowerInvariant();
+        }
+
         private async Task StoreJobInDatabaseAsync(ProcessingJob job)
         {
             using var connection = new NpgsqlConnection(_connectionString);
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local ANN index (services/ann_index.py) recall and latency
+Clustered synthetic resume chunk embeddings are loaded into an IvfIndex and
+queried at several nprobe values; recall@k is measured against an exact
+brute-force scan (best chunk per resume, like find_similar_candidates).
+
+With --pgvector (needs DATABASE_URL and the pgvector extension) the same
+chunks are copied into a scratch table and searched there too, optionally
+through an hnsw or ivfflat index.
+
+    python benchmarks/bench_ann_index.py --resumes 20000 --chunks 5 --queries 200 --nprobe 32,64,128,192
+    python benchmarks/bench_ann_index.py --resumes 5000 --pgvector --pg-index hnsw
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DB_PREPARE_ON_INIT", "false")
+
+from services.ann_index import IvfIndex, normalize  # noqa: E402
+
+SCRATCH_TABLE = "bench_ann_embeddings"
+MODEL_VERSION = "text-embedding-ada-002"
+
+
+def build_dataset(resumes: int, chunks: int, dimensions: int, topics: int, seed: int):
+    """Topic -> resume -> chunk: each resume leans towards a topic, its chunks scatter around it"""
+    rng = np.random.default_rng(seed)
+    scale = 1 / np.sqrt(dimensions)
+    centers = normalize(rng.standard_normal((topics, dimensions)))
+    resume_centers = normalize(
+        centers[rng.integers(0, topics, resumes)] + rng.standard_normal((resumes, dimensions)).astype(np.float32) * (2 * scale)
+    )
+    vectors = normalize(
+        np.repeat(resume_centers, chunks, axis=0)
+        + rng.standard_normal((resumes * chunks, dimensions)).astype(np.float32) * (1.5 * scale)
+    )
+    resume_ids = [str(uuid.UUID(int=int(value))) for value in rng.integers(1, 2 ** 63, resumes)]
+    return resume_ids, vectors, centers, rng
+
+
+def build_queries(centers: np.ndarray, queries: int, rng: np.random.Generator):
+    """Job descriptions straddle two topics"""
+    dimensions = centers.shape[1]
+    first, second = rng.integers(0, len(centers), (2, queries))
+    noise = rng.standard_normal((queries, dimensions)).astype(np.float32) / np.sqrt(dimensions)
+    return normalize(centers[first] + 0.7 * centers[second] + noise)
+
+
+def brute_force(vectors: np.ndarray, row_resume: np.ndarray, query: np.ndarray, limit: int):
+    """Exact best-chunk-per-resume ranking"""
+    similarities = vectors @ query
+    best = np.full(row_resume.max() + 1, -np.inf, dtype=np.float32)
+    np.maximum.at(best, row_resume, similarities)
+    top = np.argpartition(-best, limit)[:limit]
+    return top[np.argsort(-best[top])]
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def report(label, latencies_ms, recalls=None):
+    latencies = np.asarray(latencies_ms)
+    line = f"{label:>26}: p50 {np.percentile(latencies, 50):7.2f} ms | p95 {np.percentile(latencies, 95):7.2f} ms"
+    if recalls is not None:
+        line += f" | recall@k {np.mean(recalls):.3f}"
+    print(line)
+
+
+async def bench_pgvector(args, resume_ids, vectors, chunks, queries, exact, limit):
+    from utils.database import DatabaseService
+
+    db = DatabaseService()
+    await db.initialize()
+    try:
+        await db.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        await db.execute(f"""
+            CREATE UNLOGGED TABLE {SCRATCH_TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                resume_id UUID NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_text TEXT,
+                embedding vector({vectors.shape[1]}),
+                model_version VARCHAR(50),
+                plan_type VARCHAR(20),
+                created_at TIMESTAMP DEFAULT NOW()
+            )
+        """)
+        records = [
+            (uuid.UUID(resume_ids[row // chunks]), row % chunks, "", vectors[row], MODEL_VERSION, "free")
+            for row in range(len(vectors))
+        ]
+        await db.copy_resume_embeddings(records, table=SCRATCH_TABLE, replace=False)
+        if args.pg_index == "hnsw":
+            await db.execute(f"CREATE INDEX ON {SCRATCH_TABLE} USING hnsw (embedding vector_cosine_ops)")
+        elif args.pg_index == "ivfflat":
+            lists = max(16, int(np.sqrt(len(vectors))))
+            await db.execute(f"CREATE INDEX ON {SCRATCH_TABLE} USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})")
+        await db.execute(f"ANALYZE {SCRATCH_TABLE}")
+
+        # Chunks closest first, then the best chunk per resume (as the local index ranks)
+        sql = f"""
+            SELECT resume_id FROM (
+                SELECT DISTINCT ON (resume_id) resume_id, distance FROM (
+                    SELECT resume_id, embedding <=> $1 AS distance
+                    FROM {SCRATCH_TABLE}
+                    ORDER BY embedding <=> $1
+                    LIMIT $2
+                ) nearest
+                ORDER BY resume_id, distance
+            ) best
+            ORDER BY distance
+            LIMIT $3
+        """
+        position = {resume_id: slot for slot, resume_id in enumerate(resume_ids)}
+        latencies, recalls = [], []
+        for query, expected in zip(queries, exact):
+            started = time.perf_counter()
+            rows = await db.fetch_all(sql, (query, limit * chunks, limit))
+            latencies.append((time.perf_counter() - started) * 1000)
+            found = {position[str(row["resume_id"])] for row in rows}
+            recalls.append(len(found & set(expected.tolist())) / limit)
+        report(f"pgvector ({args.pg_index})", latencies, recalls)
+    finally:
+        await db.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=20000)
+    parser.add_argument("--chunks", type=int, default=5, help="Chunks per resume")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=500, help="Clusters the synthetic embeddings are drawn around")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=15, help="k: candidates per query")
+    parser.add_argument("--nprobe", default="32,64,128,192", help="Comma-separated nprobe values")
+    parser.add_argument("--nlist", type=int, help="Lists (default about sqrt(chunks))")
+    parser.add_argument("--pgvector", action="store_true", help="Also search a pgvector scratch table (DATABASE_URL)")
+    parser.add_argument("--pg-index", choices=["none", "hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    resume_ids, vectors, centers, rng = build_dataset(args.resumes, args.chunks, args.dimensions, args.topics, args.seed)
+    queries = build_queries(centers, args.queries, rng)
+    print(f"{len(vectors)} chunks ({args.resumes} resumes x {args.chunks}, {args.dimensions} dims), {args.queries} queries, k={args.limit}")
+
+    # Probe the partition at every size (the service scans up to ANN_EXACT_SEARCH_MAX live chunks exactly)
+    index = IvfIndex(args.dimensions, nlist=args.nlist, exact_search_max=0)
+    started = time.perf_counter()
+    for slot, resume_id in enumerate(resume_ids):
+        rows = slice(slot * args.chunks, (slot + 1) * args.chunks)
+        index.add(resume_id, vectors[rows], range(args.chunks), [""] * args.chunks, {"plan_type": "free"})
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    index.install(index.train(*index.snapshot()))
+    print(f"{'load / train':>26}: {loaded:.2f}s / {time.perf_counter() - started:.2f}s ({len(index.centroids)} lists)")
+
+    row_resume = np.repeat(np.arange(args.resumes), args.chunks)
+    exact = [brute_force(vectors, row_resume, query, args.limit) for query in queries]
+
+    # Probing every list is the same search without the partition: a brute-force scan
+    for nprobe in [len(index.centroids)] + [int(value) for value in args.nprobe.split(",")]:
+        latencies, recalls = [], []
+        for query, expected in zip(queries, exact):
+            matches, elapsed = timed(index.search, query, args.limit, -1.0, None, nprobe)
+            latencies.append(elapsed)
+            found = {index.resume_slots[resume_id] for resume_id, _, _ in matches}
+            recalls.append(len(found & set(expected.tolist())) / args.limit)
+        report("brute force" if nprobe == len(index.centroids) else f"ivf nprobe={nprobe}", latencies, recalls)
+
+    if args.pgvector:
+        asyncio.run(bench_pgvector(args, resume_ids, vectors, args.chunks, queries, exact, args.limit))
+
+
+if __name__ == "__main__":
+    main()
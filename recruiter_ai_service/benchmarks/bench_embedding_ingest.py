@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: resume chunk embedding ingestion
+Compares row-by-row INSERT, executemany and binary COPY into a scratch table.
+
+Requires a PostgreSQL database with the pgvector extension (DATABASE_URL).
+
+    python benchmarks/bench_embedding_ingest.py --resumes 2000 --chunks 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DB_PREPARE_ON_INIT", "false")
+
+from utils.database import DatabaseService  # noqa: E402
+
+SCRATCH_TABLE = "bench_resume_embeddings"
+
+INSERT_SQL = f"""
+    INSERT INTO {SCRATCH_TABLE} (
+        resume_id, chunk_index, chunk_text, embedding, model_version, plan_type
+    ) VALUES ($1, $2, $3, $4, $5, $6)
+"""
+
+
+def build_records(resumes: int, chunks: int, dimensions: int):
+    """Synthetic rows shaped like VectorService._build_embedding_records output"""
+    rng = np.random.default_rng(7)
+    records = []
+    for _ in range(resumes):
+        resume_id = uuid.uuid4()
+        for chunk_index in range(chunks):
+            records.append((
+                resume_id,
+                chunk_index,
+                "lorem ipsum " * 40,
+                rng.standard_normal(dimensions).astype(np.float32),
+                "text-embedding-ada-002",
+                "free"
+            ))
+    return records
+
+
+async def reset_table(db: DatabaseService, dimensions: int):
+    await db.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+    await db.execute(f"""
+        CREATE UNLOGGED TABLE {SCRATCH_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            resume_id UUID NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            chunk_text TEXT,
+            embedding vector({dimensions}),
+            model_version VARCHAR(50),
+            plan_type VARCHAR(20),
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+
+
+async def bench_row_by_row(db: DatabaseService, records):
+    for record in records:
+        await db.execute(INSERT_SQL, record)
+
+
+async def bench_executemany(db: DatabaseService, records):
+    async with db.pool.acquire() as connection:
+        await connection.executemany(INSERT_SQL, records)
+
+
+async def bench_copy(db: DatabaseService, records):
+    await db.copy_resume_embeddings(records, table=SCRATCH_TABLE, replace=False)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--skip-row-by-row", action="store_true", help="Skip the slowest strategy")
+    args = parser.parse_args()
+
+    db = DatabaseService()
+    await db.initialize()
+
+    records = build_records(args.resumes, args.chunks, args.dimensions)
+    strategies = [("executemany", bench_executemany), ("copy (binary)", bench_copy)]
+    if not args.skip_row_by_row:
+        strategies.insert(0, ("row-by-row insert", bench_row_by_row))
+
+    print(f"{len(records)} rows ({args.resumes} resumes x {args.chunks} chunks, {args.dimensions} dims)")
+    try:
+        for label, strategy in strategies:
+            await reset_table(db, args.dimensions)
+            started = time.perf_counter()
+            await strategy(db, records)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>20}: {elapsed:8.2f}s  {len(records) / elapsed:10.0f} rows/s")
+    finally:
+        await db.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the local ANN index from the on-disk embedding store
+Fills a store (services/embedding_store.py) through a store-backed IvfIndex,
+trains it (which compacts the store in list order), then measures what a
+restart costs: mapping the store back into an index and the first searches.
+For comparison it times decoding embeddings from their JSON/text form, as a
+reload from Postgres would (measured on a sample, extrapolated to every row).
+
+    python benchmarks/bench_embedding_store.py --resumes 20000 --chunks 5 --dtype float32
+    python benchmarks/bench_embedding_store.py --resumes 20000 --dtype float16 --dir /var/tmp/store
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.ann_index import IvfIndex, normalize  # noqa: E402
+from services.embedding_store import EmbeddingStore  # noqa: E402
+
+MODEL_VERSION = "text-embedding-ada-002"
+
+
+def fill_store(directory: str, args) -> float:
+    """Index synthetic resumes into a new store and train (compact) it; returns seconds"""
+    rng = np.random.default_rng(args.seed)
+    store = EmbeddingStore(directory, MODEL_VERSION, args.dimensions, args.dtype)
+    index = IvfIndex(args.dimensions, store=store)
+    started = time.perf_counter()
+    for resume in range(args.resumes):
+        vectors = rng.standard_normal((args.chunks, args.dimensions)).astype(np.float32)
+        index.add(
+            f"00000000-0000-0000-0000-{resume:012d}", vectors, range(args.chunks),
+            ["lorem ipsum " * 40] * args.chunks, {"user_id": f"user-{resume % 100}", "plan_type": "free"}
+        )
+    index.install(index.train(*index.snapshot()))
+    elapsed = time.perf_counter() - started
+    store.close()
+    return elapsed
+
+
+def text_decode_seconds(args, sample: int) -> float:
+    """Seconds to decode every row from JSON text, extrapolated from `sample` rows"""
+    rng = np.random.default_rng(args.seed)
+    texts = [json.dumps(rng.standard_normal(args.dimensions).astype(np.float32).tolist()) for _ in range(sample)]
+    started = time.perf_counter()
+    for text in texts:
+        np.asarray(json.loads(text), dtype=np.float32)
+    return (time.perf_counter() - started) / sample * args.resumes * args.chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=20000)
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--dir", help="Store directory (default: a temporary one, removed afterwards)")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="embedding-store-")
+    try:
+        rows = args.resumes * args.chunks
+        print(f"{rows} chunks ({args.resumes} resumes x {args.chunks}, {args.dimensions} dims, {args.dtype})")
+        print(f"{'fill + compact':>24}: {fill_store(directory, args):8.2f}s")
+
+        store = EmbeddingStore(directory, MODEL_VERSION)
+        size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6
+        started = time.perf_counter()
+        index = IvfIndex.from_store(store)
+        loaded = time.perf_counter() - started
+        print(f"{'store on disk':>24}: {size_mb:8.1f} MB")
+        print(f"{'map into index':>24}: {loaded:8.3f}s ({'trained' if index.trained else 'untrained'}, {len(index.resume_ids)} resumes)")
+
+        queries = normalize(np.random.default_rng(args.seed + 1).standard_normal((args.queries, args.dimensions)))
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, 15, -1.0)
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{'first search':>24}: {latencies[0]:8.2f} ms, then p50 {np.percentile(latencies[1:], 50):.2f} ms")
+        print(f"{'ready to serve':>24}: {loaded + latencies[0] / 1000:8.3f}s after boot")
+        print(f"{'JSON decode (estimate)':>24}: {text_decode_seconds(args, min(rows, 2000)):8.1f}s for every row, before any network time")
+        store.close()
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: queue backend throughput
+Producers LPUSH job payloads to the priority lists exactly like the .NET
+backend; consumers pop + ack through each QueueBackend. Reports end-to-end
+jobs/s (for streams this includes the list -> stream bridge).
+
+Requires a local Redis (REDIS_URL, default redis://localhost:6379).
+
+    python benchmarks/bench_queue_backends.py --jobs 20000 --consumers 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import redis.asyncio as redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.queue_backend import (  # noqa: E402
+    PRIORITY_LANES, RedisListQueueBackend, RedisStreamQueueBackend, list_key
+)
+
+
+async def produce(client: redis.Redis, job_type: str, jobs: int):
+    pipe = client.pipeline(transaction=False)
+    for index in range(jobs):
+        payload = {"job_id": str(uuid.uuid4()), "job_type": job_type, "priority": index % 5 == 0, "data": "{}"}
+        lane = "high" if payload["priority"] else "normal"
+        pipe.lpush(list_key(job_type, lane), json.dumps(payload))
+        if index % 1000 == 999:
+            await pipe.execute()
+    await pipe.execute()
+
+
+async def consume(backend, job_type: str, remaining: list):
+    while remaining[0] > 0:
+        messages = await backend.pop([job_type], count=10, timeout=0.1)
+        for message in messages:
+            await backend.ack(message)
+            remaining[0] -= 1
+
+
+async def run(label: str, client: redis.Redis, backend_factory, jobs: int, consumers: int):
+    job_type = f"bench-{uuid.uuid4().hex[:8]}"
+    backends = [backend_factory(job_type, index) for index in range(consumers)]
+    for backend in backends:
+        await backend.start()
+
+    remaining = [jobs]
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            produce(client, job_type, jobs),
+            *(consume(backend, job_type, remaining) for backend in backends)
+        )
+        elapsed = time.perf_counter() - started
+        print(f"{label:>8}: {elapsed:8.2f}s  {jobs / elapsed:10.0f} jobs/s")
+    finally:
+        for backend in backends:
+            await backend.stop()
+        keys = [list_key(job_type, lane) for lane in PRIORITY_LANES]
+        keys += [RedisStreamQueueBackend.stream_key(job_type, lane) for lane in PRIORITY_LANES]
+        await client.delete(*keys)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--consumers", type=int, default=4, help="Workers sharing the queue")
+    args = parser.parse_args()
+
+    client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+    print(f"{args.jobs} jobs, {args.consumers} consumers")
+
+    try:
+        await run("list", client, lambda job_type, index: RedisListQueueBackend(client), args.jobs, args.consumers)
+        # Every stream worker also runs the list -> stream bridge, as in production
+        await run(
+            "stream", client,
+            lambda job_type, index: RedisStreamQueueBackend(client, [job_type], group="bench", consumer=f"bench-{index}"),
+            args.jobs, args.consumers
+        )
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
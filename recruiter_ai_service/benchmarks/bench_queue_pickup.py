@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: job pickup latency, legacy per-type polling vs single dispatcher
+Legacy: one loop per job type doing a 1s BRPOP on high, a 1s BRPOP on normal
+and a 1s sleep when both were empty (the pre-dispatcher QueueWorker).
+Dispatcher: one blocking multi-key pop across every queue (QueueWorker.dispatch).
+
+Jobs are LPUSHed at random intervals to random types/lanes; latency is
+enqueue -> pop. Requires a local Redis (REDIS_URL).
+
+    python benchmarks/bench_queue_pickup.py --jobs 200 --rate 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import redis.asyncio as redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.queue_backend import PRIORITY_LANES, RedisListQueueBackend, list_key  # noqa: E402
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS  # noqa: E402
+
+
+async def produce(client: redis.Redis, job_types, jobs: int, rate: float):
+    for _ in range(jobs):
+        await asyncio.sleep(random.expovariate(rate))
+        job_type = random.choice(job_types)
+        lane = "high" if random.random() < 0.2 else "normal"
+        payload = {"job_id": str(uuid.uuid4()), "job_type": job_type, "enqueued_at": time.time()}
+        await client.lpush(list_key(job_type, lane), json.dumps(payload))
+
+
+def observe(histogram: Histogram, payload: str):
+    histogram.observe((time.time() - json.loads(payload)["enqueued_at"]) * 1000)
+
+
+async def legacy_loop(client: redis.Redis, job_type: str, histogram: Histogram, remaining: list):
+    while remaining[0] > 0:
+        item = await client.brpop(list_key(job_type, "high"), timeout=1)
+        if not item:
+            item = await client.brpop(list_key(job_type, "normal"), timeout=1)
+        if item:
+            observe(histogram, item[1])
+            remaining[0] -= 1
+        else:
+            await asyncio.sleep(1)
+
+
+async def dispatcher_loop(client: redis.Redis, job_types, histogram: Histogram, remaining: list):
+    backend = RedisListQueueBackend(client)
+    while remaining[0] > 0:
+        for message in await backend.pop(job_types, count=5, timeout=1):
+            histogram.observe((time.time() - message.payload["enqueued_at"]) * 1000)
+            remaining[0] -= 1
+
+
+async def run(label: str, client: redis.Redis, jobs: int, rate: float, consumers):
+    histogram = Histogram(LATENCY_BUCKETS_MS)
+    remaining = [jobs]
+    job_types = [f"bench-{uuid.uuid4().hex[:6]}-{index}" for index in range(3)]
+
+    try:
+        await asyncio.gather(produce(client, job_types, jobs, rate), *consumers(job_types, histogram, remaining))
+        snapshot = histogram.snapshot()
+        # Percentiles are bucket upper bounds (the max when past the last bucket)
+        print(
+            f"{label:>10}: p50<={snapshot['p50']:>8.1f}ms  p95<={snapshot['p95']:>8.1f}ms  "
+            f"max={snapshot['max']:>9.1f}ms  avg={snapshot['avg']:>9.1f}ms"
+        )
+    finally:
+        await client.delete(*[list_key(job_type, lane) for job_type in job_types for lane in PRIORITY_LANES])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=5, help="Mean jobs enqueued per second")
+    args = parser.parse_args()
+
+    client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+    print(f"{args.jobs} jobs at ~{args.rate}/s across 3 job types")
+
+    try:
+        await run(
+            "legacy", client, args.jobs, args.rate,
+            lambda job_types, histogram, remaining: [legacy_loop(client, job_type, histogram, remaining) for job_type in job_types]
+        )
+        await run(
+            "dispatcher", client, args.jobs, args.rate,
+            lambda job_types, histogram, remaining: [dispatcher_loop(client, job_types, histogram, remaining)]
+        )
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: skill gap analysis of many resumes against one job
+Compares calling SkillGapService.analyze_skill_gaps per resume with the batch
+path (prepare_batch once, then analyze_batch_item), both under one entity
+loader scope at the same item concurrency. The database and the LLM are
+simulated with fixed latencies, so only the service code is measured.
+
+    python benchmarks/bench_skill_gap_batch.py --resumes 500 --concurrency 10 --llm-ms 800 --covered 0.4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# The OpenAI client is created at import; no request is sent
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import services.skill_gap_service as skill_gap_module  # noqa: E402
+from services.skill_gap_service import SkillGapService, SKILL_KEYWORDS  # noqa: E402
+from utils.dataloader import EntityLoader  # noqa: E402
+
+JOB_SKILLS = ["Python", "PostgreSQL", "Docker", "Kubernetes", "AWS", "REST", "Git", "Linux"]
+
+
+class SimulatedDatabase:
+    """Just enough of DatabaseService for SkillGapService, with a fixed latency per round-trip"""
+
+    def __init__(self, jobs, resumes, latency_seconds: float):
+        self.rows = {"job": jobs, "resume": resumes}
+        self.latency = latency_seconds
+        self.loader = None
+        self.round_trips = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def load(self, kind, entity_id):
+        return await self.loader.load(kind, entity_id)
+
+    async def fetch_all(self, query, params=()):
+        await self._round_trip()
+        kind = "job" if query.startswith("job_descriptions") else "resume"
+        return [self.rows[kind][str(entity_id)] for entity_id in params[0] if str(entity_id) in self.rows[kind]]
+
+    async def fetch_one(self, query, params=()):
+        await self._round_trip()
+        return {"id": str(uuid.uuid4())}
+
+
+def build_dataset(resumes: int, covered: float, rng: random.Random):
+    """One job and `resumes` resumes, a `covered` share of which list every job skill"""
+    job_id = str(uuid.uuid4())
+    jobs = {job_id: {
+        "id": job_id,
+        "title": "Backend Engineer",
+        "description": "Build services on AWS with a REST API, shipped with Docker and CI/CD. Machine Learning is a plus.",
+        "requirements": ", ".join(JOB_SKILLS)
+    }}
+
+    rows = {}
+    for index in range(resumes):
+        resume_id = str(uuid.uuid4())
+        skills = list(JOB_SKILLS) if index < resumes * covered else rng.sample(SKILL_KEYWORDS, 6)
+        rows[resume_id] = {
+            "id": resume_id,
+            "file_name": f"resume-{index}.pdf",
+            "parsed_text": "Experienced engineer. " + " ".join(f"Worked with {skill} daily." for skill in skills) * 20,
+            "extracted_data": {"name": f"Candidate {index}", "skills": skills, "experience": []}
+        }
+    return job_id, jobs, rows
+
+
+def install_simulated_llm(latency_seconds: float, calls: list):
+    async def call_openai_with_cache(**kwargs):
+        calls.append(1)
+        await asyncio.sleep(latency_seconds * random.uniform(0.8, 1.2))
+        return json.dumps({"critical_missing_skills": ["Kubernetes"], "timeline_for_acquisition": "3 months"}), None, 0.0
+
+    skill_gap_module.call_openai_with_cache = call_openai_with_cache
+
+
+async def run_per_item(service, db, job_id, resume_ids, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def analyze(resume_id):
+        async with slots:
+            return await service.analyze_skill_gaps(resume_id, job_id, "user", "basic")
+
+    return await asyncio.gather(*(analyze(resume_id) for resume_id in resume_ids))
+
+
+async def run_batch(service, db, job_id, resume_ids, concurrency):
+    started = time.perf_counter()
+    batch = await service.prepare_batch(job_id, resume_ids)
+    prepare_seconds = time.perf_counter() - started
+    slots = asyncio.Semaphore(concurrency)
+
+    async def analyze(resume_id):
+        async with slots:
+            return await service.analyze_batch_item(batch, resume_id, "user", "basic")
+
+    results = await asyncio.gather(*(analyze(resume_id) for resume_id in resume_ids))
+    print(f"         prepare_batch: {prepare_seconds * 1000:.1f} ms for {len(resume_ids)} resumes x {len(batch.keywords)} keywords")
+    return results
+
+
+async def measure(label, runner, args, dataset):
+    job_id, jobs, resumes = dataset
+    db = SimulatedDatabase(jobs, resumes, args.db_ms / 1000)
+    db.loader = EntityLoader(db)
+    calls = []
+    install_simulated_llm(args.llm_ms / 1000, calls)
+    service = SkillGapService(db, cache_service=None)
+
+    started = time.perf_counter()
+    results = await runner(service, db, job_id, list(resumes), args.concurrency)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:>8}: {len(results)} resumes in {elapsed:6.2f}s = {len(results) / elapsed:7.1f} resumes/s | "
+        f"LLM calls {len(calls)} | DB round-trips {db.round_trips}"
+    )
+
+
+async def run(args):
+    dataset = build_dataset(args.resumes, args.covered, random.Random(args.seed))
+    await measure("per-item", run_per_item, args, dataset)
+    await measure("batch", run_batch, args, dataset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10, help="Items in flight (plan item concurrency)")
+    parser.add_argument("--llm-ms", type=float, default=800, help="Simulated LLM latency per call")
+    parser.add_argument("--db-ms", type=float, default=2, help="Simulated database round-trip")
+    parser.add_argument("--covered", type=float, default=0.4, help="Share of resumes listing every job skill")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,9 @@ Vector DB: Supabase (Free) / Pinecone (Basic/Premium)
 LLM: GPT-3.5 (Free/Basic) / GPT-4 (Premium)
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
@@ -16,6 +17,8 @@ import asyncio
 from datetime import datetime, timedelta
 import hashlib
 import json
+import time
+import uuid
 
 # Import our custom modules
 from services.resume_parser import ResumeParserService
@@ -26,6 +29,10 @@ from services.skill_gap_service import SkillGapService
 from services.report_service import ReportService
 from services.llamaindex_service import LlamaIndexService
 from services.cache_service import CacheService
+from services.queue_backend import QueueBackend, InMemoryQueueBackend, create_queue_backend
+from services.dead_letter import DeadLetterReplayer
+from services.queue_telemetry import collect_queue_telemetry, render_prometheus
+from services.result_store import ResultStore, is_result_reference
 from utils.openai_utils import get_model_for_plan, call_openai_with_cache
 from utils.database import DatabaseService
 
@@ -49,7 +56,7 @@ app.add_middleware(
 )
 
 # Initialize services
-db_service = DatabaseService()
+db_service = DatabaseService(workload="interactive")
 cache_service = CacheService(db_service)
 vector_service = VectorService(db_service)
 resume_parser = ResumeParserService(cache_service)
@@ -57,7 +64,26 @@ analysis_service = AnalysisService(db_service, cache_service, vector_service)
 comparison_service = ComparisonService(db_service, cache_service, vector_service)
 skill_gap_service = SkillGapService(db_service, cache_service)
 report_service = ReportService(db_service, cache_service)
-llamaindex_service = LlamaIndexService(db_service, cache_service)
+llamaindex_service = LlamaIndexService(db_service, cache_service, vector_service)
+result_store = ResultStore(db_service)
+
+# Single-node deployments (QUEUE_BACKEND=memory) run the queue worker inside this process
+queue_backend: Optional[InMemoryQueueBackend] = None
+queue_worker = None
+queue_worker_task: Optional[asyncio.Task] = None
+
+# VECTOR_PROVIDER=local: the in-process ANN index loads in the background
+local_index_task: Optional[asyncio.Task] = None
+
+# Shared Redis queues, for dead-letter tooling and telemetry when the worker runs elsewhere
+redis_queue_backend: Optional[QueueBackend] = None
+dead_letter_replay: Dict[str, Any] = {"task": None, "summary": None, "started_at": None, "error": None}
+
+# One entity loader per request: services share resume/job/analysis row reads
+@app.middleware("http")
+async def entity_loader_scope(request: Request, call_next):
+    with db_service.loader_scope():
+        return await call_next(request)
 
 # Request/Response Models
 class ResumeParseRequest(BaseModel):
@@ -91,6 +117,23 @@ class SkillGapRequest(BaseModel):
     user_id: str
     plan_type: str = "free"
 
+class BulkJobRequest(BaseModel):
+    resume_ids: List[str]
+    job_description_id: str
+    user_id: str
+    plan_type: str = "free"
+    priority: int = 0
+
+class DeadLetterReplayRequest(BaseModel):
+    error_classes: Optional[List[str]] = None
+    user_id: Optional[str] = None
+    job_type: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    limit: Optional[int] = None
+    rate: Optional[float] = None
+    dry_run: bool = False
+
 class GenerateReportRequest(BaseModel):
     report_type: str
     job_description_id: str
@@ -101,10 +144,39 @@ class GenerateReportRequest(BaseModel):
 @app.on_startup
 async def startup_event():
     """Initialize services on startup"""
+    global local_index_task
     logger.info("Starting Recruiter AI Service...")
     await db_service.initialize()
+    
+    if vector_service.local_index is not None:
+        local_index_task = asyncio.create_task(vector_service.build_local_index())
+    
+    if os.getenv("QUEUE_BACKEND", "list").lower() == "memory":
+        await start_in_process_worker()
+    
     logger.info("Recruiter AI Service started successfully")
 
+async def start_in_process_worker():
+    """Run a QueueWorker on an in-memory queue in this process (no Redis)"""
+    global queue_backend, queue_worker, queue_worker_task
+    from queue_worker import QueueWorker
+    
+    queue_backend = InMemoryQueueBackend()
+    queue_worker = QueueWorker(
+        max_concurrent=int(os.getenv("MAX_CONCURRENT_JOBS", "5")),
+        queue_backend=queue_backend
+    )
+    queue_worker_task = asyncio.create_task(queue_worker.start())
+    logger.info("In-process queue worker started")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Let in-process jobs finish before the service exits"""
+    if queue_worker:
+        await queue_worker.drain()
+        await queue_worker_task
+    vector_service.close()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -197,37 +269,38 @@ async def analyze_bulk_resumes(request: BulkAnalyzeRequest):
         # Check plan limits
         max_concurrent = 1 if request.plan_type == "free" else 10 if request.plan_type == "basic" else 20
         
-        # Process in batches
+        # Process in batches on the bulk pool so interactive reads keep their connections
         results = []
-        for i in range(0, len(request.resume_ids), max_concurrent):
-            batch = request.resume_ids[i:i + max_concurrent]
-            
-            # Process batch concurrently
-            tasks = [
-                analysis_service.analyze_resume(
-                    resume_id=resume_id,
-                    job_description_id=request.job_description_id,
-                    user_id=request.user_id,
-                    plan_type=request.plan_type
-                )
-                for resume_id in batch
-            ]
-            
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for resume_id, result in zip(batch, batch_results):
-                if isinstance(result, Exception):
-                    results.append({
-                        "resume_id": resume_id,
-                        "success": False,
-                        "error": str(result)
-                    })
-                else:
-                    results.append({
-                        "resume_id": resume_id,
-                        "success": True,
-                        "analysis": result
-                    })
+        with db_service.use_pool("bulk"):
+            for i in range(0, len(request.resume_ids), max_concurrent):
+                batch = request.resume_ids[i:i + max_concurrent]
+                
+                # Process batch concurrently
+                tasks = [
+                    analysis_service.analyze_resume(
+                        resume_id=resume_id,
+                        job_description_id=request.job_description_id,
+                        user_id=request.user_id,
+                        plan_type=request.plan_type
+                    )
+                    for resume_id in batch
+                ]
+                
+                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+                
+                for resume_id, result in zip(batch, batch_results):
+                    if isinstance(result, Exception):
+                        results.append({
+                            "resume_id": resume_id,
+                            "success": False,
+                            "error": str(result)
+                        })
+                    else:
+                        results.append({
+                            "resume_id": resume_id,
+                            "success": True,
+                            "analysis": result
+                        })
         
         return {
             "success": True,
@@ -240,6 +313,218 @@ async def analyze_bulk_resumes(request: BulkAnalyzeRequest):
         logger.error(f"Error in bulk analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to analyze resumes in bulk: {str(e)}")
 
+@app.post("/jobs/bulk-analysis")
+async def submit_bulk_analysis_job(request: BulkJobRequest):
+    """
+    Queue a bulk analysis job on the in-process worker (QUEUE_BACKEND=memory)
+    Follow it with GET /jobs/{job_id}/events
+    """
+    if queue_backend is None:
+        raise HTTPException(status_code=503, detail="In-process queue is not enabled (QUEUE_BACKEND=memory)")
+    
+    try:
+        job_id = str(uuid.uuid4())
+        job_data = {
+            "ResumeIds": request.resume_ids,
+            "JobDescriptionId": request.job_description_id,
+            "UserId": request.user_id,
+            "PlanType": request.plan_type,
+            "Priority": request.priority
+        }
+        
+        await db_service.execute(
+            "processing_jobs.create",
+            (job_id, request.user_id, "bulk_analysis", request.priority, len(request.resume_ids), job_data)
+        )
+        await db_service.execute("processing_job_items.create_many", (job_id, request.resume_ids, "resume_analysis"))
+        
+        # Same payload shape the .NET API pushes to Redis
+        await queue_backend.enqueue({
+            "job_id": job_id,
+            "job_type": "bulk_analysis",
+            "priority": request.priority,
+            "data": json.dumps(job_data),
+            "created_at": datetime.utcnow().isoformat(),
+            "enqueued_at": time.time()
+        })
+        
+        return {
+            "success": True,
+            "job_id": job_id,
+            "message": "Bulk analysis job queued"
+        }
+        
+    except Exception as e:
+        logger.error(f"Error queueing bulk analysis job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue bulk analysis job: {str(e)}")
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events with the job's progress and completion messages"""
+    if queue_backend is None:
+        raise HTTPException(status_code=503, detail="In-process queue is not enabled (QUEUE_BACKEND=memory)")
+    
+    async def events():
+        subscription = queue_backend.subscribe(f"job_updates:{job_id}")
+        try:
+            async for message in subscription:
+                yield f"data: {json.dumps(message)}\n\n"
+                if message.get("type") in ("job_completed", "job_failed", "job_cancelled"):
+                    break
+        finally:
+            await subscription.aclose()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, user_id: str, offset: int = 0, limit: int = 100):
+    """Page through a processing job's results (inline or in the compressed result store)"""
+    try:
+        job = await db_service.fetch_one("processing_jobs.get_results", (job_id, user_id))
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        page = await result_store.fetch_page(job_id, job["result_data"], offset, min(limit, 1000))
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": job["status"],
+            "summary": job["result_data"]["summary"] if is_result_reference(job["result_data"]) else None,
+            **page
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting job results: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get job results: {str(e)}")
+
+def get_shared_queue_backend() -> QueueBackend:
+    """The in-process queue, or a client for the shared Redis queues (not started: it never pops)"""
+    global redis_queue_backend
+    if queue_backend is not None:
+        return queue_backend
+    if redis_queue_backend is None:
+        import redis.asyncio as redis
+        from queue_worker import JOB_TYPES
+        redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+        # Depths of the stream backend live in its streams; everything else is shared by both Redis backends
+        name = "stream" if os.getenv("QUEUE_BACKEND", "list").lower() == "stream" else "list"
+        redis_queue_backend = create_queue_backend(redis_client, JOB_TYPES, name=name)
+    return redis_queue_backend
+
+@app.get("/queue/metrics", response_class=PlainTextResponse)
+async def get_queue_metrics():
+    """Queue depths, lag, durations, occupancy and the scaling hint in Prometheus text format"""
+    from queue_worker import JOB_TYPES
+    try:
+        telemetry = await collect_queue_telemetry(get_shared_queue_backend(), JOB_TYPES)
+        return render_prometheus(telemetry)
+    except Exception as e:
+        logger.error(f"Error collecting queue metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to collect queue metrics: {str(e)}")
+
+@app.get("/queue/scaling")
+async def get_queue_scaling_hint():
+    """Scaling hint with the queue and worker totals it was computed from"""
+    from queue_worker import JOB_TYPES
+    try:
+        telemetry = await collect_queue_telemetry(get_shared_queue_backend(), JOB_TYPES)
+        return {
+            "success": True,
+            "scaling": telemetry["scaling"],
+            "depths": telemetry["depths"],
+            "backlog": telemetry["backlog"],
+            "totals": telemetry["totals"]
+        }
+    except Exception as e:
+        logger.error(f"Error computing scaling hint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute scaling hint: {str(e)}")
+
+@app.get("/queue/dead-letters")
+async def list_dead_letters(
+    error_class: Optional[str] = None,
+    user_id: Optional[str] = None,
+    job_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100
+):
+    """Jobs that exhausted their retries, oldest first (payloads omitted)"""
+    try:
+        backend = get_shared_queue_backend()
+        entries = await DeadLetterReplayer(backend).list(
+            limit=min(limit, 1000),
+            error_classes=error_class.split(",") if error_class else None,
+            user_id=user_id,
+            job_type=job_type,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None
+        )
+        return {
+            "success": True,
+            "entries": entries,
+            "total_dead_lettered": await backend.dead_letter_count()
+        }
+    except Exception as e:
+        logger.error(f"Error listing dead letters: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to list dead letters: {str(e)}")
+
+@app.post("/queue/dead-letters/replay")
+async def replay_dead_letters(request: DeadLetterReplayRequest):
+    """
+    Re-enqueue matching dead-lettered jobs at a controlled rate
+    Dry runs answer right away; real replays run in the background (GET for progress)
+    """
+    try:
+        replayer = DeadLetterReplayer(get_shared_queue_backend(), db_service)
+        replay_args = dict(
+            error_classes=request.error_classes,
+            user_id=request.user_id,
+            job_type=request.job_type,
+            since=request.since.timestamp() if request.since else None,
+            until=request.until.timestamp() if request.until else None,
+            limit=request.limit,
+            rate=request.rate
+        )
+        
+        if request.dry_run:
+            return {"success": True, "summary": await replayer.replay(dry_run=True, **replay_args)}
+        
+        if dead_letter_replay["task"] and not dead_letter_replay["task"].done():
+            raise HTTPException(status_code=409, detail="A dead-letter replay is already running")
+        
+        async def run_replay():
+            try:
+                dead_letter_replay["summary"] = await replayer.replay(**replay_args)
+            except Exception as e:
+                # Nobody awaits this task: record the failure for the status endpoint
+                logger.error(f"Dead-letter replay failed: {str(e)}")
+                dead_letter_replay["error"] = str(e)
+        
+        dead_letter_replay.update(
+            task=asyncio.create_task(run_replay()), summary=None, error=None, started_at=datetime.utcnow().isoformat()
+        )
+        return {"success": True, "message": "Dead-letter replay started"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error replaying dead letters: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to replay dead letters: {str(e)}")
+
+@app.get("/queue/dead-letters/replay")
+async def get_dead_letter_replay_status():
+    """State of the last background replay"""
+    task = dead_letter_replay["task"]
+    return {
+        "success": True,
+        "running": bool(task and not task.done()),
+        "started_at": dead_letter_replay["started_at"],
+        "summary": dead_letter_replay["summary"],
+        "error": dead_letter_replay["error"]
+    }
+
 @app.post("/compare-candidates")
 async def compare_candidates(request: CompareCandidatesRequest):
     """
@@ -346,6 +631,32 @@ async def clear_cache():
         logger.error(f"Error clearing cache: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to clear cache: {str(e)}")
 
+@app.get("/db/pool-stats")
+async def get_pool_stats():
+    """Get per-pool occupancy, saturation and acquire-wait metrics"""
+    try:
+        return {
+            "success": True,
+            "pool_stats": db_service.get_pool_stats(),
+            "replica_stats": db_service.get_replica_stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting pool stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get pool stats: {str(e)}")
+
+@app.get("/db/query-stats")
+async def get_query_stats():
+    """Get per-query latency and row-count histograms for monitoring"""
+    try:
+        return {
+            "success": True,
+            "query_stats": db_service.get_query_stats(),
+            "loader_stats": db_service.get_loader_stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting query stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get query stats: {str(e)}")
+
 # LlamaIndex Request Models
 class FindBestCandidatesRequest(BaseModel):
     job_description_id: str
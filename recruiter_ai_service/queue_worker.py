@@ -7,9 +7,13 @@ import asyncio
 import redis.asyncio as redis
 import json
 import logging
+import os
+import random
 import signal
-import sys
-from typing import Dict, Any, Optional
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, Callable, Awaitable
 from datetime import datetime
 import traceback
 
@@ -20,7 +24,14 @@ from services.comparison_service import ComparisonService
 from services.skill_gap_service import SkillGapService
 from services.cache_service import CacheService
 from services.vector_service import VectorService
+from services.job_progress import JobProgressAggregator
+from services.queue_backend import QueueBackend, QueueMessage, create_queue_backend, parse_enqueued_at
+from services.job_coalescer import JobCoalescer, LocalJobCoalescer
+from services.dead_letter import build_dead_letter
+from services.result_store import ResultStore, is_result_reference
+from services.fair_scheduler import FairScheduler, describe_job
 from utils.database import DatabaseService
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS, DURATION_BUCKETS_S
 
 # Configure logging
 logging.basicConfig(
@@ -29,24 +40,87 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+JOB_TYPES = ["bulk_analysis", "report_generation", "skill_gap_batch"]
+
+# Items of one bulk job analyzed concurrently, by plan (capped by BULK_MAX_ITEM_CONCURRENCY)
+ITEM_CONCURRENCY = {
+    "free": 1,
+    "basic": 5,
+    "premium": 10,
+    "recruiter": 10
+}
+
 class QueueWorker:
-    def __init__(self, redis_url: str = "redis://localhost:6379", max_concurrent: int = 5):
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        max_concurrent: int = 5,
+        queue_backend: Optional[QueueBackend] = None
+    ):
         self.redis_url = redis_url
         self.max_concurrent = max_concurrent
         self.running = False
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        
+        # Popped jobs wait here and start in tenant-fair order as slots free up
+        self.scheduler = FairScheduler()
+        self.lookahead = int(os.getenv("QUEUE_LOOKAHEAD", str(max_concurrent * 2)))
+        self.job_finished = asyncio.Event()
+        
+        # Provider quota: LLM-bound item calls in flight across all jobs of this process
+        self.llm_limit = int(os.getenv("LLM_MAX_CONCURRENCY", "20"))
+        self.llm_slots = asyncio.Semaphore(self.llm_limit)
+        self.llm_in_use = 0
+        self.max_item_concurrency = int(os.getenv("BULK_MAX_ITEM_CONCURRENCY", "10"))
+        self.cancel_check_interval = float(os.getenv("JOB_CANCEL_CHECK_SECONDS", "5"))
+        # A bulk item analyzed this recently by another job (same user, JD and plan) is reused
+        self.item_reuse_seconds = float(os.getenv("JOB_ITEM_REUSE_SECONDS", "900"))
+        
+        # Retry backoff: base * 2^attempt capped at max, with jitter
+        self.max_retries = int(os.getenv("JOB_MAX_RETRIES", "3"))
+        self.retry_base_seconds = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+        self.retry_max_seconds = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+        self.retry_promote_interval = float(os.getenv("JOB_RETRY_PROMOTE_SECONDS", "1"))
+        
+        # Dispatcher: blocking pop timeout and weighted fairness for normal priority
+        self.pop_timeout = float(os.getenv("QUEUE_POP_TIMEOUT_SECONDS", "1"))
+        self.normal_every = int(os.getenv("QUEUE_NORMAL_EVERY", "4"))
+        self.pickup_latency = Histogram(LATENCY_BUCKETS_MS)
+        
+        # Telemetry published to the backend every WORKER_METRICS_PUBLISH_SECONDS (see services/queue_telemetry.py)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.metrics_publish_interval = float(os.getenv("WORKER_METRICS_PUBLISH_SECONDS", "15"))
+        self.started_at = time.time()
+        self.start_lag = Histogram(DURATION_BUCKETS_S)
+        self.job_durations: Dict[str, Histogram] = {}
+        self.item_durations = Histogram(DURATION_BUCKETS_S)
+        self.completed_by_type: Dict[str, int] = {}
+        self.throughput = {"jobs_per_minute": 0.0, "items_per_minute": 0.0}
+        
+        # Running jobs (awaited on drain) and long-lived loops (cancelled on drain)
+        self.active_jobs = set()
+        self._tasks = []
+        self.draining = False
+        self.drain_timeout = float(os.getenv("WORKER_DRAIN_TIMEOUT_SECONDS", "120"))
+        self.stats = {
+            "jobs_started": 0, "jobs_succeeded": 0, "jobs_failed": 0, "jobs_retried": 0, "jobs_dead_lettered": 0, "items_processed": 0
+        }
         
         # Initialize services
-        self.db_service = DatabaseService()
+        self.db_service = DatabaseService(workload="bulk", pools=("bulk", "maintenance"))
         self.cache_service = CacheService(self.db_service)
-        self.vector_service = VectorService(self.db_service)
+        # The API process owns the local ANN index and its embedding store lock
+        self.vector_service = VectorService(self.db_service, local_index=False)
         self.analysis_service = AnalysisService(self.db_service, self.cache_service, self.vector_service)
         self.comparison_service = ComparisonService(self.db_service, self.cache_service, self.vector_service)
         self.skill_gap_service = SkillGapService(self.db_service, self.cache_service)
         self.report_service = ReportService(self.db_service, self.cache_service)
+        self.result_store = ResultStore(self.db_service)
         
-        # Redis connection
+        # Redis connection and queue backend (QUEUE_BACKEND=list|stream|memory); an
+        # in-process producer (the API with QUEUE_BACKEND=memory) passes its backend in
         self.redis_client = None
+        self.queue_backend = queue_backend
+        self.coalescer = None
         
     async def start(self):
         """Start the queue worker"""
@@ -55,105 +129,284 @@ class QueueWorker:
         # Initialize database connection
         await self.db_service.initialize()
         
-        # Connect to Redis
-        self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+        if self.queue_backend is None and os.getenv("QUEUE_BACKEND", "list").lower() != "memory":
+            # Connect to Redis
+            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+            
+            # Test Redis connection
+            try:
+                await self.redis_client.ping()
+                logger.info("Connected to Redis successfully")
+            except Exception as e:
+                logger.error(f"Failed to connect to Redis: {e}")
+                return
         
-        # Test Redis connection
-        try:
-            await self.redis_client.ping()
-            logger.info("Connected to Redis successfully")
-        except Exception as e:
-            logger.error(f"Failed to connect to Redis: {e}")
-            return
+        if self.queue_backend is None:
+            self.queue_backend = create_queue_backend(self.redis_client, JOB_TYPES)
+        await self.queue_backend.start()
+        logger.info(f"Using {self.queue_backend.name} queue backend")
+        self.coalescer = JobCoalescer(self.redis_client) if self.redis_client else LocalJobCoalescer()
         
         self.running = True
         
         # Start worker tasks
-        tasks = [
-            self.process_queue("bulk_analysis"),
-            self.process_queue("report_generation"),
-            self.process_queue("skill_gap_batch"),
-            self.monitor_jobs()
+        self._tasks = [
+            asyncio.create_task(self.dispatch()),
+            asyncio.create_task(self.promote_due_retries()),
+            asyncio.create_task(self.monitor_jobs()),
+            asyncio.create_task(self.publish_metrics())
         ]
         
         try:
-            await asyncio.gather(*tasks)
-        except KeyboardInterrupt:
+            await asyncio.gather(*self._tasks)
+        except (KeyboardInterrupt, asyncio.CancelledError):
             logger.info("Received shutdown signal")
         finally:
             await self.shutdown()
     
-    async def process_queue(self, job_type: str):
-        """Process jobs from a specific queue"""
-        high_priority_queue = f"queue:{job_type}:high"
-        normal_priority_queue = f"queue:{job_type}:normal"
+    async def drain(self, timeout: Optional[float] = None):
+        """
+        Graceful stop: take no new jobs, give running jobs up to `timeout`
+        seconds to finish, then stop the background loops (start() returns).
+        Jobs still running at the deadline are cancelled without an ack, so
+        the stream backend redelivers them.
+        """
+        if self.draining:
+            return
+        self.draining = True
+        self.running = False
         
-        logger.info(f"Started processing {job_type} queue")
+        # Jobs popped into the lookahead buffer but never started go back to their queue
+        for message in self.scheduler.drain_buffered():
+            try:
+                await self.requeue_message(message)
+            except Exception as e:
+                logger.error(f"Failed to requeue buffered job {message.payload.get('job_id')}: {e}")
+        
+        timeout = self.drain_timeout if timeout is None else timeout
+        if self.active_jobs:
+            logger.info(f"Draining {len(self.active_jobs)} running jobs (up to {timeout:.0f}s)")
+            _, pending = await asyncio.wait(set(self.active_jobs), timeout=timeout)
+            if pending:
+                logger.warning(f"Cancelling {len(pending)} jobs still running after drain timeout")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        for task in self._tasks:
+            task.cancel()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Point-in-time worker metrics (reported to the supervisor and published to the backend)"""
+        return {
+            **self.stats,
+            "worker_id": self.worker_id,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "active_jobs": len(self.active_jobs),
+            "max_concurrent": self.max_concurrent,
+            "llm_slots": self.llm_limit,
+            "llm_slots_in_use": self.llm_in_use,
+            "scheduler": self.scheduler.get_stats(),
+            "coalescer": dict(self.coalescer.stats) if self.coalescer else {},
+            "completed_by_type": dict(self.completed_by_type),
+            "throughput": dict(self.throughput),
+            "pickup_latency_ms": self.pickup_latency.snapshot(),
+            "start_lag_seconds": self.start_lag.snapshot(),
+            "job_duration_seconds": {job_type: histogram.snapshot() for job_type, histogram in self.job_durations.items()},
+            "item_duration_seconds": self.item_durations.snapshot()
+        }
+    
+    async def dispatch(self):
+        """
+        Single dispatcher for every job type: one blocking pop across all queues
+        (high lanes first) into the tenant-fair lookahead buffer, then start
+        buffered jobs in fair order while slots are free.
+        Every QUEUE_NORMAL_EVERY-th batch serves normal lanes first so normal
+        priority work can't starve, and the job type order rotates per batch.
+        Jobs of a tenant that already fills its share of the buffer are parked
+        and taken back once that tenant has room again.
+        """
+        logger.info(f"Started dispatcher for {', '.join(JOB_TYPES)}")
+        batches = 0
+        rotation = 0
         
         while self.running:
             try:
-                # Wait for semaphore (rate limiting)
-                await self.semaphore.acquire()
+                self.start_runnable_jobs()
+                if self.has_free_slot():
+                    await self.unpark_jobs()
+                    self.start_runnable_jobs()
+                
+                room = self.lookahead - len(self.scheduler)
+                if not self.has_free_slot() or room <= 0:
+                    # All slots busy, or the buffer only holds capped tenants' work: wait for a job to finish
+                    self.job_finished.clear()
+                    try:
+                        await asyncio.wait_for(self.job_finished.wait(), timeout=self.pop_timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                normal_first = self.normal_every > 0 and (batches + 1) % self.normal_every == 0
+                job_types = JOB_TYPES[rotation:] + JOB_TYPES[:rotation]
+                rotation = (rotation + 1) % len(JOB_TYPES)
                 
                 try:
-                    # Check high priority queue first
-                    queue_item = await self.redis_client.brpop(high_priority_queue, timeout=1)
-                    
-                    # If no high priority items, check normal priority
-                    if not queue_item:
-                        queue_item = await self.redis_client.brpop(normal_priority_queue, timeout=1)
-                    
-                    if queue_item:
-                        _, item_data = queue_item
-                        item = json.loads(item_data)
-                        
-                        # Process job in background
-                        asyncio.create_task(self.process_job(item))
-                    else:
-                        # No items, release semaphore and wait
-                        self.semaphore.release()
-                        await asyncio.sleep(1)
-                        
+                    messages = await self.queue_backend.pop(
+                        job_types, count=room, timeout=self.pop_timeout, normal_first=normal_first
+                    )
                 except Exception as e:
-                    self.semaphore.release()
-                    logger.error(f"Error processing {job_type} queue: {e}")
-                    await asyncio.sleep(5)
+                    logger.error(f"Error popping jobs: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                
+                if not self.running:
+                    # Drain started while we were blocked in pop
+                    for message in messages:
+                        await self.requeue_message(message)
+                    break
+                
+                if messages:
+                    batches += 1
+                for message in messages:
+                    self.record_pickup(message)
+                    if not self.scheduler.add(message):
+                        await self.park_job(message)
                     
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"Unexpected error in {job_type} queue processor: {e}")
+                logger.error(f"Unexpected error in dispatcher: {e}")
                 await asyncio.sleep(5)
     
-    async def process_job(self, queue_item: Dict[str, Any]):
+    def start_runnable_jobs(self):
+        """Start buffered jobs in fair order while there are free slots"""
+        while self.has_free_slot():
+            message = self.scheduler.next()
+            if message is None:
+                return
+            
+            enqueued_at = parse_enqueued_at(message.payload)
+            if enqueued_at is not None:
+                self.start_lag.observe(max(0.0, time.time() - enqueued_at))
+            
+            # Process job in background
+            task = asyncio.create_task(self.process_job(message))
+            self.active_jobs.add(task)
+            task.add_done_callback(self.active_jobs.discard)
+            task.add_done_callback(lambda _, message=message: self.on_job_finished(message))
+    
+    async def park_job(self, message: QueueMessage):
+        """Move a job whose tenant already fills its share of the buffer to the tenant's parked list"""
+        tenant, _, _ = describe_job(message.payload)
+        await self.queue_backend.park(tenant, message)
+    
+    async def unpark_jobs(self):
+        """Buffer the oldest parked job of every tenant that has room again"""
+        for tenant in await self.queue_backend.parked_tenants():
+            if not self.scheduler.can_buffer(tenant):
+                continue
+            message = await self.queue_backend.unpark(tenant)
+            if message:
+                self.scheduler.add(message)
+    
+    async def requeue_message(self, message: QueueMessage):
+        """Give back a popped job that was never started"""
+        if message.parked_tenant:
+            await self.queue_backend.park(message.parked_tenant, message, front=True)
+        else:
+            await self.queue_backend.requeue(message)
+    
+    def has_free_slot(self) -> bool:
+        """Fewer than MAX_CONCURRENT_JOBS jobs running"""
+        return len(self.active_jobs) < self.max_concurrent
+    
+    def on_job_finished(self, message: QueueMessage):
+        """Free the tenant's in-flight slot and wake the dispatcher"""
+        self.scheduler.release(message)
+        self.job_finished.set()
+    
+    def record_pickup(self, message: QueueMessage):
+        """Observe enqueue -> pickup latency when the payload carries its enqueue time"""
+        enqueued_at = parse_enqueued_at(message.payload)
+        if enqueued_at is not None:
+            self.pickup_latency.observe(max(0.0, (time.time() - enqueued_at) * 1000))
+    
+    @asynccontextmanager
+    async def llm_slot(self):
+        """One of the process's LLM_MAX_CONCURRENCY slots, counted for occupancy telemetry"""
+        async with self.llm_slots:
+            self.llm_in_use += 1
+            try:
+                yield
+            finally:
+                self.llm_in_use -= 1
+    
+    def record_item(self, started: float):
+        """Count a finished (or failed) job item started at time.monotonic() `started`"""
+        self.stats["items_processed"] += 1
+        self.item_durations.observe(time.monotonic() - started)
+    
+    async def process_job(self, message: QueueMessage):
         """Process a single job"""
+        queue_item = message.payload
         job_id = queue_item.get("job_id")
         job_type = queue_item.get("job_type")
+        handled = True
+        started = time.monotonic()
+        self.stats["jobs_started"] += 1
         
         try:
-            logger.info(f"Processing job {job_id} of type {job_type}")
+            logger.info(f"Processing job {job_id} of type {job_type}{' (redelivered)' if message.redelivered else ''}")
+            
+            # A duplicate of a job that is already running follows it instead of running again
+            leader_id = await self.coalescer.claim(queue_item)
+            if leader_id:
+                await self.follow_job(job_id, leader_id, queue_item)
+                return
             
             # Update job status to processing
             await self.update_job_status(job_id, "processing")
             
-            # Route to appropriate processor
-            if job_type == "bulk_analysis":
-                await self.process_bulk_analysis_job(queue_item)
-            elif job_type == "report_generation":
-                await self.process_report_generation_job(queue_item)
-            elif job_type == "skill_gap_batch":
-                await self.process_skill_gap_batch_job(queue_item)
-            else:
-                raise ValueError(f"Unknown job type: {job_type}")
+            # Route to appropriate processor; rows read by several items/services are loaded once per job.
+            # The lease keeps the message claimed so other workers don't reclaim it mid-job.
+            async with self.queue_backend.lease(message), self.coalescer.hold(job_id):
+                with self.db_service.loader_scope() as loader:
+                    if job_type == "bulk_analysis":
+                        await self.process_bulk_analysis_job(queue_item)
+                    elif job_type == "report_generation":
+                        await self.process_report_generation_job(queue_item)
+                    elif job_type == "skill_gap_batch":
+                        await self.process_skill_gap_batch_job(queue_item)
+                    else:
+                        raise ValueError(f"Unknown job type: {job_type}")
+            
+            logger.info(f"Job {job_id} entity loads: {loader.summary()}")
             
             logger.info(f"Successfully processed job {job_id}")
+            self.stats["jobs_succeeded"] += 1
+            self.completed_by_type[job_type] = self.completed_by_type.get(job_type, 0) + 1
+            self.job_durations.setdefault(job_type, Histogram(DURATION_BUCKETS_S)).observe(time.monotonic() - started)
             
+        except asyncio.CancelledError:
+            # Interrupted by drain: leave it unacked for redelivery
+            handled = False
+            raise
         except Exception as e:
             logger.error(f"Failed to process job {job_id}: {e}")
             logger.error(traceback.format_exc())
+            self.stats["jobs_failed"] += 1
             await self.handle_job_failure(job_id, str(e), queue_item)
         finally:
-            self.semaphore.release()
+            # A redelivered or retried run claims the job's fingerprint again
+            self.coalescer.forget(job_id)
+            
+            # Completed, failed and rescheduled jobs are all handled: ack so it isn't redelivered
+            if handled:
+                try:
+                    await self.queue_backend.ack(message)
+                except Exception as e:
+                    logger.error(f"Failed to ack job {job_id}: {e}")
     
     async def process_bulk_analysis_job(self, queue_item: Dict[str, Any]):
         """Process bulk analysis job"""
@@ -166,70 +419,205 @@ class QueueWorker:
         plan_type = job_data.get("PlanType", "free")
         
         total_resumes = len(resume_ids)
-        processed = 0
-        failed = 0
-        results = []
+        concurrency = self.get_item_concurrency(plan_type)
         
-        logger.info(f"Processing bulk analysis job {job_id} with {total_resumes} resumes")
+        # Resume from checkpoints: items completed by an earlier (crashed or retried) run are skipped
+        checkpointed, recovered = await self.load_bulk_checkpoint(job_id, user_id, job_description_id)
+        results: List[Any] = [None] * total_resumes
+        pending_indexes = []
+        for index, resume_id in enumerate(resume_ids):
+            done = checkpointed.get(str(resume_id)) or recovered.get(str(resume_id))
+            if done is not None:
+                results[index] = {"resume_id": resume_id, "success": True, "analysis": done}
+            else:
+                pending_indexes.append(index)
         
-        for resume_id in resume_ids:
-            try:
-                # Update progress
-                progress_percentage = (processed / total_resumes) * 100
-                await self.update_job_progress(job_id, processed, failed, progress_percentage, resume_id)
+        # Items an overlapping job already finished are reused before any item lock is taken
+        reused = await self.load_reusable_analyses(
+            user_id, job_description_id, plan_type, [resume_ids[index] for index in pending_indexes]
+        )
+        if reused:
+            logger.info(f"Bulk analysis job {job_id} reuses {len(reused)} analyses from overlapping jobs")
+            for index in pending_indexes:
+                done = reused.get(str(resume_ids[index]))
+                if done is not None:
+                    results[index] = {"resume_id": resume_ids[index], "success": True, "analysis": done}
+            pending_indexes = [index for index in pending_indexes if str(resume_ids[index]) not in reused]
+        
+        if len(pending_indexes) < total_resumes:
+            logger.info(f"Resuming bulk analysis job {job_id}: {total_resumes - len(pending_indexes)} of {total_resumes} items already done")
+        logger.info(f"Processing bulk analysis job {job_id} with {len(pending_indexes)} resumes ({concurrency} at a time)")
+        
+        # Item statuses and counters are flushed in batches; leaving the block flushes the rest
+        already_processed = sum(1 for resume_id in resume_ids if str(resume_id) in checkpointed)
+        async with JobProgressAggregator(
+            self.db_service, self.send_progress_update, job_id, total_resumes, already_processed=already_processed
+        ) as progress:
+            
+            # Analyses stored before the crash whose item checkpoint was never flushed,
+            # and those reused from overlapping jobs
+            for resume_id in resume_ids:
+                if str(resume_id) in recovered and str(resume_id) not in checkpointed:
+                    await progress.record(resume_id, "completed", recovered[str(resume_id)])
+                elif str(resume_id) in reused:
+                    await progress.record(resume_id, "completed", reused[str(resume_id)])
+            
+            async def analyze(resume_id: str) -> Dict[str, Any]:
+                started = time.monotonic()
+                try:
+                    # Overlapping jobs on the same JD run a shared resume once; the others reuse
+                    # that run's stored analysis instead of analyzing (and inserting) it again
+                    async with self.coalescer.item("analysis", user_id, job_description_id, resume_id, plan_type) as shared:
+                        result = shared.result
+                        if result is None:
+                            # Finished by an overlapping job since this one started
+                            result = (await self.load_reusable_analyses(
+                                user_id, job_description_id, plan_type, [resume_id]
+                            )).get(str(resume_id))
+                        if result is None:
+                            async with self.llm_slot():
+                                result = await self.analysis_service.analyze_resume(
+                                    resume_id=resume_id,
+                                    job_description_id=job_description_id,
+                                    user_id=user_id,
+                                    plan_type=plan_type,
+                                    processing_job_id=job_id
+                                )
+                            shared.publish(result)
+                    
+                    await progress.record(resume_id, "completed", result)
+                    return {
+                        "resume_id": resume_id,
+                        "success": True,
+                        "analysis": result
+                    }
+                    
+                except Exception as e:
+                    logger.error(f"Failed to analyze resume {resume_id}: {e}")
+                    await progress.record(resume_id, "failed", error=str(e))
+                    return {
+                        "resume_id": resume_id,
+                        "success": False,
+                        "error": str(e)
+                    }
+                finally:
+                    self.record_item(started)
+            
+            pending_results = await self.run_sliding_window(
+                job_id, [resume_ids[index] for index in pending_indexes], analyze, concurrency
+            )
+        
+        logger.info(f"Job {job_id} progress persisted in {progress.flushes} flushes for {total_resumes} items")
+        
+        if pending_results is None:
+            logger.info(f"Bulk analysis job {job_id} cancelled after {progress.processed + progress.failed}/{total_resumes} items")
+            await self.requeue_followers(job_id)
+            return
+        
+        for index, result in zip(pending_indexes, pending_results):
+            results[index] = result
+        
+        # Complete the job
+        await self.complete_job(job_id, results, progress.processed, progress.failed)
+    
+    async def load_bulk_checkpoint(self, job_id: str, user_id: str, job_description_id: str):
+        """
+        Work already done for a bulk job, keyed by resume ID:
+        - checkpointed: items whose 'completed' status was persisted (result_data)
+        - recovered: analyses stored for this job whose checkpoint was lost in a crash
+        Failed and unfinished items appear in neither, so a rerun redoes only those.
+        """
+        checkpointed = await self.load_item_checkpoint(job_id)
+        recovered: Dict[str, Any] = {}
+        try:
+            analyses = await self.db_service.fetch_all(
+                "resume_analysis.list_by_processing_job", (user_id, job_description_id, str(job_id))
+            )
+            for analysis in analyses:
+                recovered[str(analysis["resume_id"])] = self.analysis_service.result_from_row(analysis)
+        except Exception as e:
+            logger.error(f"Failed to load checkpoint for job {job_id}: {e}")
+        
+        return checkpointed, recovered
+    
+    async def load_reusable_analyses(
+        self,
+        user_id: str,
+        job_description_id: str,
+        plan_type: str,
+        resume_ids: List[str]
+    ) -> Dict[str, Any]:
+        """Latest analysis per resume stored within item_reuse_seconds for the same user, JD and plan, keyed by resume ID"""
+        if not resume_ids or self.item_reuse_seconds <= 0:
+            return {}
+        try:
+            rows = await self.db_service.fetch_all(
+                "resume_analysis.list_reusable",
+                (user_id, job_description_id, list(resume_ids), plan_type, self.item_reuse_seconds)
+            )
+        except Exception as e:
+            logger.error(f"Failed to look up reusable analyses: {e}")
+            return {}
+        return {str(row["resume_id"]): self.analysis_service.result_from_row(row) for row in rows}
+    
+    async def load_item_checkpoint(self, job_id: str) -> Dict[str, Any]:
+        """Result data of a job's items whose 'completed' status was persisted, keyed by item ID"""
+        checkpointed: Dict[str, Any] = {}
+        try:
+            items = await self.db_service.fetch_all("processing_job_items.list_by_job", (job_id,))
+            for item in items:
+                if item["status"] == "completed":
+                    checkpointed[str(item["item_id"])] = item["result_data"] or {}
+        except Exception as e:
+            logger.error(f"Failed to load item checkpoint for job {job_id}: {e}")
+        
+        return checkpointed
+    
+    def get_item_concurrency(self, plan_type: str) -> int:
+        """Items of one job run concurrently for a plan"""
+        return max(1, min(ITEM_CONCURRENCY.get(plan_type.lower(), 1), self.max_item_concurrency))
+    
+    async def run_sliding_window(
+        self,
+        job_id: str,
+        items: List[Any],
+        run_item: Callable[[Any], Awaitable[Any]],
+        limit: int
+    ) -> Optional[List[Any]]:
+        """
+        Run run_item over items with at most `limit` in flight, starting the next
+        item as soon as any finishes. Results keep the input order. run_item is
+        expected to handle its own errors. Returns None if the job was cancelled
+        meanwhile; in-flight items are cancelled and nothing further is started.
+        """
+        results: List[Any] = [None] * len(items)
+        in_flight: Dict[asyncio.Task, int] = {}
+        next_index = 0
+        last_cancel_check = time.monotonic()
+        
+        try:
+            while next_index < len(items) or in_flight:
+                while next_index < len(items) and len(in_flight) < limit:
+                    in_flight[asyncio.create_task(run_item(items[next_index]))] = next_index
+                    next_index += 1
                 
-                # Analyze resume
-                result = await self.analysis_service.analyze_resume(
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    user_id=user_id,
-                    plan_type=plan_type
+                done, _ = await asyncio.wait(
+                    in_flight, timeout=self.cancel_check_interval, return_when=asyncio.FIRST_COMPLETED
                 )
+                for task in done:
+                    results[in_flight.pop(task)] = task.result()
                 
-                results.append({
-                    "resume_id": resume_id,
-                    "success": True,
-                    "analysis": result
-                })
-                
-                processed += 1
-                
-                # Update job item status
-                await self.update_job_item_status(job_id, resume_id, "completed", result)
-                
-                # Send real-time update
-                await self.send_progress_update(job_id, {
-                    "resume_id": resume_id,
-                    "status": "completed",
-                    "result": result,
-                    "progress": (processed / total_resumes) * 100
-                })
-                
-            except Exception as e:
-                logger.error(f"Failed to analyze resume {resume_id}: {e}")
-                failed += 1
-                
-                results.append({
-                    "resume_id": resume_id,
-                    "success": False,
-                    "error": str(e)
-                })
-                
-                await self.update_job_item_status(job_id, resume_id, "failed", None, str(e))
-                
-                # Send error update
-                await self.send_progress_update(job_id, {
-                    "resume_id": resume_id,
-                    "status": "failed",
-                    "error": str(e),
-                    "progress": (processed / total_resumes) * 100
-                })
-            
-            # Rate limiting - small delay between requests
-            await asyncio.sleep(0.1)
+                if time.monotonic() - last_cancel_check >= self.cancel_check_interval:
+                    last_cancel_check = time.monotonic()
+                    if await self.get_job_status(job_id) == "cancelled":
+                        return None
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
         
-        # Complete the job
-        await self.complete_job(job_id, results, processed, failed)
+        return results
     
     async def process_report_generation_job(self, queue_item: Dict[str, Any]):
         """Process report generation job"""
@@ -266,42 +654,102 @@ class QueueWorker:
             raise
     
     async def process_skill_gap_batch_job(self, queue_item: Dict[str, Any]):
-        """Process skill gap batch analysis job"""
+        """
+        Process skill gap batch job (ResumeIds against one JobDescriptionId).
+        The job description is digested once and every resume goes through one
+        keyword pass; only resumes with gaps call the LLM, at the plan's item
+        concurrency within the process's LLM slots. Progress is reported per
+        item, and items completed by an earlier run are skipped.
+        """
         job_id = queue_item["job_id"]
         job_data = json.loads(queue_item["data"])
         
-        # Implementation for batch skill gap analysis
-        logger.info(f"Processing skill gap batch job {job_id}")
-        # Add implementation as needed
+        resume_ids = job_data["ResumeIds"]
+        job_description_id = job_data["JobDescriptionId"]
+        user_id = job_data["UserId"]
+        plan_type = job_data.get("PlanType", "free")
+        
+        total_resumes = len(resume_ids)
+        concurrency = self.get_item_concurrency(plan_type)
+        
+        checkpointed = await self.load_item_checkpoint(job_id)
+        results: List[Any] = [None] * total_resumes
+        pending_indexes = []
+        for index, resume_id in enumerate(resume_ids):
+            done = checkpointed.get(str(resume_id))
+            if done is not None:
+                results[index] = {"resume_id": resume_id, "success": True, "analysis": done}
+            else:
+                pending_indexes.append(index)
         
-        await self.complete_job(job_id, {"message": "Skill gap batch analysis completed"}, 1, 0)
+        pending_ids = [resume_ids[index] for index in pending_indexes]
+        batch = await self.skill_gap_service.prepare_batch(job_description_id, pending_ids)
+        logger.info(
+            f"Processing skill gap batch job {job_id}: {len(pending_ids)} of {total_resumes} resumes, "
+            f"{batch.llm_items} need the LLM ({len(batch.keywords)} job keywords, {len(batch.unchecked)} requirements "
+            f"the keywords can't check, {concurrency} at a time)"
+        )
+        
+        async with JobProgressAggregator(
+            self.db_service, self.send_progress_update, job_id, total_resumes, already_processed=len(checkpointed)
+        ) as progress:
+            
+            async def analyze(resume_id: str) -> Dict[str, Any]:
+                started = time.monotonic()
+                try:
+                    result = await self.skill_gap_service.analyze_batch_item(
+                        batch, resume_id, user_id, plan_type, llm_slot=self.llm_slot
+                    )
+                    await progress.record(resume_id, "completed", result)
+                    return {
+                        "resume_id": resume_id,
+                        "success": True,
+                        "analysis": result
+                    }
+                    
+                except Exception as e:
+                    logger.error(f"Failed to analyze skill gaps of resume {resume_id}: {e}")
+                    await progress.record(resume_id, "failed", error=str(e))
+                    return {
+                        "resume_id": resume_id,
+                        "success": False,
+                        "error": str(e)
+                    }
+                finally:
+                    self.record_item(started)
+            
+            pending_results = await self.run_sliding_window(job_id, pending_ids, analyze, concurrency)
+        
+        if pending_results is None:
+            logger.info(f"Skill gap batch job {job_id} cancelled after {progress.processed + progress.failed}/{total_resumes} items")
+            return
+        
+        for index, result in zip(pending_indexes, pending_results):
+            results[index] = result
+        
+        await self.complete_job(job_id, results, progress.processed, progress.failed)
     
     async def update_job_status(self, job_id: str, status: str):
         """Update job status in database"""
         try:
-            query = """
-                UPDATE processing_jobs 
-                SET status = %s, 
-                    started_at = CASE WHEN %s = 'processing' THEN NOW() ELSE started_at END,
-                    completed_at = CASE WHEN %s IN ('completed', 'failed', 'cancelled') THEN NOW() ELSE completed_at END,
-                    updated_at = NOW()
-                WHERE id = %s
-            """
-            await self.db_service.execute(query, (status, status, status, job_id))
+            query = "processing_jobs.update_status"
+            await self.db_service.execute(query, (status, job_id))
         except Exception as e:
             logger.error(f"Failed to update job status for {job_id}: {e}")
     
+    async def get_job_status(self, job_id: str) -> Optional[str]:
+        """Current job status (e.g. 'cancelled' when the user cancelled it)"""
+        try:
+            row = await self.db_service.fetch_one("processing_jobs.get_status", (job_id,))
+            return row["status"] if row else None
+        except Exception as e:
+            logger.error(f"Failed to get job status for {job_id}: {e}")
+            return None
+    
     async def update_job_progress(self, job_id: str, processed: int, failed: int, progress: float, current_item: str = None):
         """Update job progress in database"""
         try:
-            query = """
-                UPDATE processing_jobs 
-                SET processed_items = %s,
-                    failed_items = %s,
-                    progress_percentage = %s,
-                    updated_at = NOW()
-                WHERE id = %s
-            """
+            query = "processing_jobs.update_progress"
             await self.db_service.execute(query, (processed, failed, progress, job_id))
             
             # Send real-time update
@@ -318,18 +766,8 @@ class QueueWorker:
     async def update_job_item_status(self, job_id: str, item_id: str, status: str, result_data: Any = None, error_message: str = None):
         """Update job item status in database"""
         try:
-            query = """
-                UPDATE processing_job_items 
-                SET status = %s,
-                    result_data = %s,
-                    error_message = %s,
-                    started_at = CASE WHEN %s = 'processing' THEN NOW() ELSE started_at END,
-                    completed_at = CASE WHEN %s IN ('completed', 'failed') THEN NOW() ELSE completed_at END
-                WHERE job_id = %s AND item_id = %s
-            """
-            
-            result_json = json.dumps(result_data) if result_data else None
-            await self.db_service.execute(query, (status, result_json, error_message, status, status, job_id, item_id))
+            query = "processing_job_items.update_status"
+            await self.db_service.execute(query, (status, result_data or None, error_message, job_id, item_id))
             
         except Exception as e:
             logger.error(f"Failed to update job item status for {job_id}/{item_id}: {e}")
@@ -337,66 +775,141 @@ class QueueWorker:
     async def complete_job(self, job_id: str, results: Any, processed: int, failed: int):
         """Mark job as completed"""
         try:
-            query = """
-                UPDATE processing_jobs 
-                SET status = 'completed',
-                    result_data = %s,
-                    completed_at = NOW(),
-                    updated_at = NOW()
-                WHERE id = %s
-            """
+            query = "processing_jobs.complete"
             
-            await self.db_service.execute(query, (json.dumps(results), job_id))
+            # Large results go to the result store; the row and message then carry a reference and summary
+            try:
+                result_data = await self.result_store.save(job_id, results)
+            except Exception as e:
+                logger.error(f"Failed to store results of job {job_id} externally, keeping them inline: {e}")
+                result_data = results
             
-            # Send completion notification
-            await self.send_completion_notification(job_id, {
+            completion = {
                 "status": "completed",
                 "total_processed": processed,
-                "total_failed": failed,
-                "results": results
-            })
+                "total_failed": failed
+            }
+            if is_result_reference(result_data):
+                completion["result_ref"] = {key: value for key, value in result_data.items() if key != "summary"}
+                completion["summary"] = result_data["summary"]
+            else:
+                completion["results"] = results
+            
+            await self.db_service.execute(query, (result_data, job_id))
+            
+            # Duplicates that followed this job complete with the same results (before the
+            # claim is released, so the monitor never sees them with a lapsed leader)
+            followers = await self.db_service.fetch_all("processing_jobs.complete_followers", (job_id, result_data))
+            await self.coalescer.release(job_id)
+            
+            # Send completion notification
+            await self.send_completion_notification(job_id, completion)
+            for follower in followers:
+                await self.send_completion_notification(str(follower["id"]), {**completion, "coalesced_with": job_id})
             
         except Exception as e:
             logger.error(f"Failed to complete job {job_id}: {e}")
     
+    async def follow_job(self, job_id: str, leader_id: str, queue_item: Dict[str, Any]):
+        """Attach a duplicate job to the running job it duplicates, on the job row so it survives restarts"""
+        logger.info(f"Job {job_id} duplicates running job {leader_id}, following it")
+        await self.db_service.execute("processing_jobs.follow", (job_id, leader_id, queue_item))
+        # A redelivered former leader passes the jobs that followed it on to the new leader
+        await self.db_service.execute("processing_jobs.move_followers", (job_id, leader_id))
+        try:
+            await self.queue_backend.publish(f"job_updates:{job_id}", {
+                "job_id": job_id,
+                "type": "job_coalesced",
+                "data": {"leader_job_id": leader_id},
+                "timestamp": datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            logger.error(f"Failed to send coalescing notice for {job_id}: {e}")
+    
+    async def requeue_followers(self, job_id: str):
+        """A led job stopped without results (cancelled, or its claim lapsed): its followers run on their own"""
+        followers = await self.db_service.fetch_all("processing_jobs.detach_followers", (job_id,))
+        await self.coalescer.release(job_id)
+        for follower in followers:
+            await self.queue_backend.enqueue(follower["coalesced_payload"])
+            logger.info(f"Requeued job {follower['id']} that followed job {job_id}")
+    
+    async def requeue_lapsed_followers(self):
+        """Requeue followers whose leader no longer holds its claim (died without being redelivered)"""
+        for row in await self.db_service.fetch_all("processing_jobs.list_followed_leaders", pool="maintenance"):
+            leader_id = str(row["leader_id"])
+            if not await self.coalescer.leads(row["coalesced_payload"], leader_id):
+                logger.warning(f"Coalescing claim of job {leader_id} lapsed, requeueing its followers")
+                await self.requeue_followers(leader_id)
+    
     async def handle_job_failure(self, job_id: str, error_message: str, queue_item: Dict[str, Any]):
         """Handle job failure with retry logic"""
         try:
             retry_count = queue_item.get("retry_count", 0)
-            max_retries = 3
             
-            if retry_count < max_retries and "permanent" not in error_message.lower():
-                # Retry the job
+            if retry_count < self.max_retries and "permanent" not in error_message.lower():
+                # Schedule the retry instead of sleeping on it, so the worker slot is freed right away
                 queue_item["retry_count"] = retry_count + 1
-                job_type = queue_item["job_type"]
-                priority = queue_item.get("priority", 0)
+                delay = self.get_retry_delay(retry_count)
+                queue_item["enqueued_at"] = time.time() + delay
                 
-                queue_key = f"queue:{job_type}:high" if priority > 0 else f"queue:{job_type}:normal"
+                await self.queue_backend.schedule_retry(queue_item, time.time() + delay)
                 
-                # Add delay before retry
-                await asyncio.sleep(30 * (retry_count + 1))  # Exponential backoff
-                await self.redis_client.lpush(queue_key, json.dumps(queue_item))
+                # Followers stay attached until the retry runs
+                await self.coalescer.defer(job_id, delay)
                 
-                logger.info(f"Retrying job {job_id} (attempt {retry_count + 1}/{max_retries})")
+                self.stats["jobs_retried"] += 1
+                logger.info(f"Retrying job {job_id} in {delay:.0f}s (attempt {retry_count + 1}/{self.max_retries})")
             else:
-                # Mark as permanently failed
-                query = """
-                    UPDATE processing_jobs 
-                    SET status = 'failed',
-                        error_message = %s,
-                        completed_at = NOW(),
-                        updated_at = NOW()
-                    WHERE id = %s
-                """
+                # Keep the payload for replay, then mark as permanently failed
+                await self.dead_letter(queue_item, error_message)
+                
+                query = "processing_jobs.fail"
                 
                 await self.db_service.execute(query, (error_message, job_id))
+                followers = await self.db_service.fetch_all("processing_jobs.fail_followers", (job_id, error_message))
+                await self.coalescer.release(job_id)
                 
                 # Send failure notification
                 await self.send_failure_notification(job_id, error_message)
                 
+                for follower in followers:
+                    await self.dead_letter(follower["coalesced_payload"], error_message)
+                    await self.send_failure_notification(str(follower["id"]), error_message)
+                
         except Exception as e:
             logger.error(f"Failed to handle job failure for {job_id}: {e}")
     
+    async def dead_letter(self, queue_item: Dict[str, Any], error_message: str):
+        """Store a job that exhausted its retries in the dead-letter stream"""
+        try:
+            await self.queue_backend.dead_letter(build_dead_letter(queue_item, error_message))
+            self.stats["jobs_dead_lettered"] += 1
+        except Exception as e:
+            logger.error(f"Failed to dead-letter job {queue_item.get('job_id')}: {e}")
+    
+    def get_retry_delay(self, retry_count: int) -> float:
+        """Exponential backoff with equal jitter so retries of a failed burst spread out"""
+        backoff = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** retry_count))
+        return backoff / 2 + random.uniform(0, backoff / 2)
+    
+    async def promote_due_retries(self):
+        """Move retries whose due time has passed back onto their priority queue"""
+        while self.running:
+            try:
+                promoted = await self.queue_backend.promote_due_retries(100)
+                if promoted:
+                    logger.info(f"Promoted {promoted} due job retries")
+                    continue
+                
+                await asyncio.sleep(self.retry_promote_interval)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error promoting job retries: {e}")
+                await asyncio.sleep(5)
+    
     async def send_progress_update(self, job_id: str, update_data: Dict[str, Any]):
         """Send real-time progress update via Redis pub/sub"""
         try:
@@ -407,7 +920,9 @@ class QueueWorker:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            await self.redis_client.publish(f"job_updates:{job_id}", json.dumps(message))
+            # Duplicates following this job get its progress on their own channel
+            for channel_job_id in [job_id, *await self.coalescer.followers(job_id)]:
+                await self.queue_backend.publish(f"job_updates:{channel_job_id}", {**message, "job_id": channel_job_id})
         except Exception as e:
             logger.error(f"Failed to send progress update for {job_id}: {e}")
     
@@ -421,7 +936,7 @@ class QueueWorker:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            await self.redis_client.publish(f"job_updates:{job_id}", json.dumps(message))
+            await self.queue_backend.publish(f"job_updates:{job_id}", message)
         except Exception as e:
             logger.error(f"Failed to send completion notification for {job_id}: {e}")
     
@@ -435,7 +950,7 @@ class QueueWorker:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            await self.redis_client.publish(f"job_updates:{job_id}", json.dumps(message))
+            await self.queue_backend.publish(f"job_updates:{job_id}", message)
         except Exception as e:
             logger.error(f"Failed to send failure notification for {job_id}: {e}")
     
@@ -444,26 +959,20 @@ class QueueWorker:
         while self.running:
             try:
                 # Handle job timeouts
-                timeout_query = """
-                    UPDATE processing_jobs 
-                    SET status = 'failed',
-                        error_message = 'Job timed out',
-                        completed_at = NOW(),
-                        updated_at = NOW()
-                    WHERE status = 'processing' 
-                    AND started_at < NOW() - INTERVAL '30 minutes'
-                """
+                timeout_query = "processing_jobs.fail_timed_out"
                 
-                await self.db_service.execute(timeout_query)
+                await self.db_service.execute(timeout_query, pool="maintenance")
                 
                 # Cleanup expired jobs
-                cleanup_query = """
-                    DELETE FROM processing_jobs 
-                    WHERE expires_at < NOW() 
-                    AND status IN ('completed', 'failed', 'cancelled')
-                """
+                cleanup_query = "processing_jobs.delete_expired"
                 
-                await self.db_service.execute(cleanup_query)
+                await self.db_service.execute(cleanup_query, pool="maintenance")
+                
+                await self.requeue_lapsed_followers()
+                
+                pickup = self.pickup_latency.snapshot()
+                if pickup["count"]:
+                    logger.info(f"Job pickup latency ms: p50={pickup['p50']} p95={pickup['p95']} max={pickup['max']} (n={pickup['count']})")
                 
                 # Wait before next check
                 await asyncio.sleep(60)  # Check every minute
@@ -474,13 +983,51 @@ class QueueWorker:
                 logger.error(f"Error in job monitoring: {e}")
                 await asyncio.sleep(60)
     
+    async def publish_metrics(self):
+        """
+        Write this worker's metrics snapshot to the backend every
+        WORKER_METRICS_PUBLISH_SECONDS, with throughput over the last interval
+        """
+        last_at = time.monotonic()
+        last_jobs = self.stats["jobs_succeeded"]
+        last_items = self.stats["items_processed"]
+        
+        while self.running:
+            try:
+                await asyncio.sleep(self.metrics_publish_interval)
+                
+                elapsed = time.monotonic() - last_at
+                self.throughput = {
+                    "jobs_per_minute": round((self.stats["jobs_succeeded"] - last_jobs) * 60 / elapsed, 3),
+                    "items_per_minute": round((self.stats["items_processed"] - last_items) * 60 / elapsed, 3)
+                }
+                last_at = time.monotonic()
+                last_jobs = self.stats["jobs_succeeded"]
+                last_items = self.stats["items_processed"]
+                
+                await self.queue_backend.write_worker_metrics(self.worker_id, {**self.get_metrics(), "reported_at": time.time()})
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Failed to publish worker metrics: {e}")
+    
     async def shutdown(self):
         """Graceful shutdown"""
         logger.info("Shutting down Queue Worker...")
         self.running = False
         
+        if self.queue_backend:
+            try:
+                await self.queue_backend.remove_worker_metrics(self.worker_id)
+            except Exception as e:
+                logger.error(f"Failed to remove worker metrics: {e}")
+            await self.queue_backend.stop()
+            self.queue_backend = None
+        
         if self.redis_client:
             await self.redis_client.close()
+            self.redis_client = None
         
         if self.db_service:
             await self.db_service.close()
@@ -488,34 +1035,39 @@ class QueueWorker:
         logger.info("Queue Worker shutdown complete")
 
 # Signal handlers for graceful shutdown
-def signal_handler(worker):
-    def handler(signum, frame):
-        logger.info(f"Received signal {signum}")
-        asyncio.create_task(worker.shutdown())
-        sys.exit(0)
-    return handler
+def install_signal_handlers(worker: QueueWorker):
+    """Drain the worker on SIGINT/SIGTERM instead of exiting mid-job"""
+    loop = asyncio.get_running_loop()
+    
+    def handler(signum, frame=None):
+        logger.info(f"Received signal {signum}, draining")
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(worker.drain()))
+    
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, handler, signum)
+        except NotImplementedError:
+            # Windows event loops don't support add_signal_handler
+            signal.signal(signum, handler)
 
 async def main():
     """Main entry point"""
-    import os
-    
     # Configuration from environment variables
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
     max_concurrent = int(os.getenv("MAX_CONCURRENT_JOBS", "5"))
     
     # Create and start worker
     worker = QueueWorker(redis_url, max_concurrent)
+    install_signal_handlers(worker)
     
-    # Setup signal handlers
-    signal.signal(signal.SIGINT, signal_handler(worker))
-    signal.signal(signal.SIGTERM, signal_handler(worker))
-    
-    try:
-        await worker.start()
-    except KeyboardInterrupt:
-        logger.info("Received keyboard interrupt")
-    finally:
-        await worker.shutdown()
+    await worker.start()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    from worker_supervisor import resolve_worker_processes, WorkerSupervisor
+    
+    # WORKER_PROCESSES=N|auto runs N worker processes under a supervisor
+    processes = resolve_worker_processes()
+    if processes > 1:
+        WorkerSupervisor(processes).run()
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+List or replay dead-lettered jobs (see services/dead_letter.py)
+
+    python replay_dead_letters.py list --error-class rate_limit --since 6h
+    python replay_dead_letters.py replay --error-class rate_limit,llm_unavailable --since 2024-12-01T08:00 --rate 5
+    python replay_dead_letters.py replay --user-id <uuid> --job-type bulk_analysis --limit 100 --dry-run
+
+--since/--until take an ISO timestamp (UTC) or an age like 30m, 6h, 2d.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import redis.asyncio as redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from services.dead_letter import DeadLetterReplayer  # noqa: E402
+from services.queue_backend import create_queue_backend  # noqa: E402
+from utils.database import DatabaseService  # noqa: E402
+
+AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Unix time from an ISO timestamp (UTC if naive) or an age such as '6h'"""
+    if not value:
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if match:
+        return time.time() - float(match.group(1)) * AGE_UNITS[match.group(2)]
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+async def run(args):
+    redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+    db_service = None
+    try:
+        # Any Redis backend works: the dead-letter stream is shared
+        queue_backend = create_queue_backend(redis_client, [], name="list")
+
+        filters = {
+            "error_classes": args.error_class.split(",") if args.error_class else None,
+            "user_id": args.user_id,
+            "job_type": args.job_type,
+            "since": parse_time(args.since),
+            "until": parse_time(args.until)
+        }
+
+        if args.command == "list":
+            replayer = DeadLetterReplayer(queue_backend)
+            entries = await replayer.list(limit=args.limit or 100, **filters)
+            for entry in entries:
+                print(json.dumps(entry))
+            print(f"{len(entries)} matching entries ({await queue_backend.dead_letter_count()} dead-lettered in total)", file=sys.stderr)
+            return
+
+        if not args.dry_run:
+            db_service = DatabaseService(workload="maintenance", pools=("maintenance",))
+            await db_service.initialize()
+        replayer = DeadLetterReplayer(queue_backend, db_service)
+        summary = await replayer.replay(limit=args.limit, rate=args.rate, dry_run=args.dry_run, **filters)
+        print(json.dumps(summary, indent=2))
+
+    finally:
+        if db_service:
+            await db_service.close()
+        await redis_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["list", "replay"])
+    parser.add_argument("--error-class", help="Comma-separated error classes (rate_limit, timeout, llm_unavailable, ...)")
+    parser.add_argument("--user-id")
+    parser.add_argument("--job-type")
+    parser.add_argument("--since", help="Failed at or after (ISO time or age, e.g. 6h)")
+    parser.add_argument("--until", help="Failed at or before (ISO time or age)")
+    parser.add_argument("--limit", type=int, help="Max entries to list/replay")
+    parser.add_argument("--rate", type=float, help="Replayed jobs per second (DEAD_LETTER_REPLAY_RATE, default 5)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be replayed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
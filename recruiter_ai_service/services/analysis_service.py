@@ -5,9 +5,10 @@ Handles AI-powered resume analysis against job descriptions
 
 import logging
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from utils.openai_utils import call_openai_with_cache, create_analysis_prompt
+from utils.database import to_text_array
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,8 @@ class AnalysisService:
         resume_id: str,
         job_description_id: str,
         user_id: str,
-        plan_type: str = "free"
+        plan_type: str = "free",
+        processing_job_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Analyze resume against job description using AI
@@ -32,6 +34,8 @@ class AnalysisService:
             job_description_id: Job description identifier
             user_id: User identifier
             plan_type: Subscription plan
+            processing_job_id: Bulk job this analysis belongs to; a rerun of the
+                job reuses the stored analysis instead of inserting a duplicate
             
         Returns:
             Analysis results with scores and recommendations
@@ -67,7 +71,8 @@ class AnalysisService:
                 "vector_similarity": similarity_score,
                 **ai_analysis,
                 "analysis_date": str(datetime.utcnow()),
-                "plan_type": plan_type
+                "plan_type": plan_type,
+                "processing_job_id": processing_job_id
             }
             
             # Store analysis in database
@@ -80,22 +85,43 @@ class AnalysisService:
             logger.error(f"Error analyzing resume: {str(e)}")
             raise Exception(f"Failed to analyze resume: {str(e)}")
     
+    def result_from_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rebuild analyze_resume's result from a stored resume_analysis row (a bulk
+        job's recovered or reused item), so a job's results share one shape
+        """
+        metadata = row.get("analysis_metadata") or {}
+        plan_type = metadata.get("plan_type", "free")
+        analysis = {
+            field: row.get(field) if row.get(field) is not None else default
+            for field, default in self._get_default_analysis().items()
+        }
+        analysis = self._validate_analysis_data(analysis, plan_type)
+        
+        return {
+            "resume_id": str(row["resume_id"]),
+            "job_description_id": str(row["job_description_id"]),
+            "user_id": str(row["user_id"]),
+            "vector_similarity": metadata.get("vector_similarity", 0.0),
+            **analysis,
+            "ai_model_used": metadata.get("ai_model_used"),
+            "tokens_used": metadata.get("tokens_used", 0),
+            "analysis_cost": metadata.get("analysis_cost", 0.0),
+            "analysis_date": str(row["created_at"]),
+            "plan_type": plan_type,
+            "processing_job_id": metadata.get("processing_job_id"),
+            "analysis_id": row["id"]
+        }
+    
     async def _get_resume_data(self, resume_id: str) -> Dict[str, Any]:
         """Get resume data from database"""
         try:
-            query = """
-                SELECT file_name, parsed_text, extracted_data
-                FROM resumes 
-                WHERE id = %s
-            """
-            
-            result = await self.db.fetch_one(query, (resume_id,))
+            result = await self.db.load("resume", resume_id)
             
             if not result:
                 return None
             
-            # Parse extracted data
-            extracted_data = result["extracted_data"] if result["extracted_data"] else {}
+            extracted_data = result["extracted_data"] or {}
             
             return {
                 "file_name": result["file_name"],
@@ -110,13 +136,7 @@ class AnalysisService:
     async def _get_job_description(self, job_description_id: str) -> str:
         """Get job description text from database"""
         try:
-            query = """
-                SELECT title, description, requirements
-                FROM job_descriptions 
-                WHERE id = %s
-            """
-            
-            result = await self.db.fetch_one(query, (job_description_id,))
+            result = await self.db.load("job", job_description_id)
             
             if not result:
                 return None
@@ -290,17 +310,7 @@ class AnalysisService:
     async def _store_analysis(self, analysis_data: Dict[str, Any]) -> str:
         """Store analysis results in database"""
         try:
-            query = """
-                INSERT INTO resume_analysis (
-                    user_id, job_description_id, resume_id,
-                    match_score, skill_match_score, experience_score,
-                    education_score, ats_compliance_score,
-                    missing_skills, matching_skills, ai_summary,
-                    ai_feedback, strengths, weaknesses, recommendations,
-                    analysis_metadata
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """
+            query = "resume_analysis.insert"
             
             metadata = {
                 "vector_similarity": analysis_data.get("vector_similarity", 0.0),
@@ -310,6 +320,17 @@ class AnalysisService:
                 "plan_type": analysis_data.get("plan_type", "free")
             }
             
+            processing_job_id = analysis_data.get("processing_job_id")
+            if processing_job_id:
+                # Idempotent per (bulk job, resume): a rerun after a crash keeps the first row
+                metadata["processing_job_id"] = str(processing_job_id)
+                existing = await self.db.fetch_one(
+                    "resume_analysis.get_for_processing_job",
+                    (analysis_data["resume_id"], str(processing_job_id))
+                )
+                if existing:
+                    return existing["id"]
+            
             result = await self.db.fetch_one(
                 query,
                 (
@@ -321,18 +342,21 @@ class AnalysisService:
                     analysis_data["experience_score"],
                     analysis_data["education_score"],
                     analysis_data["ats_compliance_score"],
-                    analysis_data["missing_skills"],
-                    analysis_data["matching_skills"],
+                    to_text_array(analysis_data["missing_skills"]),
+                    to_text_array(analysis_data["matching_skills"]),
                     analysis_data["ai_summary"],
                     analysis_data.get("ai_feedback", ""),
-                    analysis_data["strengths"],
-                    analysis_data["weaknesses"],
-                    analysis_data["recommendations"],
-                    json.dumps(metadata)
+                    to_text_array(analysis_data["strengths"]),
+                    to_text_array(analysis_data["weaknesses"]),
+                    to_text_array(analysis_data["recommendations"]),
+                    metadata
                 )
             )
             
-            return result["id"] if result else None
+            if not result:
+                return None
+            self.db.forget("analysis", result["id"])
+            return result["id"]
             
         except Exception as e:
             logger.error(f"Error storing analysis: {str(e)}")
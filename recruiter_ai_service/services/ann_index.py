@@ -0,0 +1,661 @@
+"""
+In-process approximate nearest-neighbour index over resume chunk embeddings
+An IVF (inverted file) index in NumPy: chunks are grouped under the nearest of
+`nlist` spherical k-means centroids and a query only scores the chunks of its
+`nprobe` closest groups. VectorService serves it as the "local" vector
+provider (VECTOR_PROVIDER=local): it is built from resume_embeddings at
+startup and updated whenever embeddings are stored, so a candidate search is
+a matrix product in this process instead of a round-trip.
+
+Search is exact until an index holds ANN_MIN_TRAIN_VECTORS chunks, while it
+holds at most ANN_EXACT_SEARCH_MAX live chunks, and for filters that leave at
+most that many (e.g. one user's pool).
+
+With EMBEDDING_STORE_DIR set, every index is backed by a memory-mapped
+EmbeddingStore (services/embedding_store.py): chunks are appended to it as
+they are indexed, each retrain compacts it in list order with the centroids,
+and a restart maps it back in without touching Postgres.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.embedding_store import STORE_SUPPORTED, STORED_METADATA, EmbeddingStore, discover, lock_directory
+
+logger = logging.getLogger(__name__)
+
+# Retrain once an index has grown this much since it was trained
+RETRAIN_GROWTH = 2.0
+# Retrain (which drops removed chunks) once they are this share of the rows
+COMPACT_DEAD_SHARE = 0.25
+# Rows scored per matrix product while assigning chunks to lists
+ASSIGN_BATCH_ROWS = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Unit-length float32 rows (zero rows stay zero)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest (highest cosine) centroid for every unit row"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BATCH_ROWS):
+        block = vectors[start:start + ASSIGN_BATCH_ROWS]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _grown(array: np.ndarray, used: int, capacity: int) -> np.ndarray:
+    """Copy of the first `used` entries in a buffer of `capacity` (zero-filled)"""
+    grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+    grown[:used] = array[:used]
+    return grown
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means on unit rows; empty lists are reseeded with random rows"""
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = vectors[rng.choice(len(vectors), empty.size, replace=False)]
+        centroids = normalize(centroids)
+    return centroids
+
+
+class IvfIndex:
+    """
+    Chunk vectors of one embedding model, their resumes' metadata and an
+    optional IVF partition. Training lays the rows out list by list, so a
+    probed list is scored as one contiguous slice; chunks added since sit
+    after them and are gathered per list. Mutated only from the event loop:
+    `train` works on a snapshot in a thread and `install` swaps it in.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        nlist: Optional[int] = None,
+        nprobe: int = 192,
+        min_train: int = 1000,
+        train_sample: int = 20000,
+        train_iterations: int = 10,
+        exact_search_max: int = 20000,
+        seed: int = 0,
+        store: Optional[EmbeddingStore] = None
+    ):
+        """
+        Args:
+            dimensions: Embedding size
+            nlist: Lists to partition into (default about sqrt(rows))
+            nprobe: Lists scanned per query
+            min_train: Rows before the index is partitioned at all
+            train_sample: Rows k-means is trained on
+            train_iterations: k-means iterations
+            exact_search_max: Searches over at most this many rows (all live rows, or
+                              those matching the filters) are exact
+            seed: k-means seed
+            store: Persist rows here (row i of the store is row i of the index);
+                   a float32 store is searched in place through its mapping
+        """
+        self.dimensions = dimensions
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.train_sample = train_sample
+        self.train_iterations = train_iterations
+        self.exact_search_max = exact_search_max
+        self.rng = np.random.default_rng(seed)
+        self.store = store
+        self.zero_copy = store is not None and store.dtype == np.float32
+
+        # Rows [0, size) are used; capacity grows as chunks are added
+        self.size = 0
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.row_resume = np.zeros(0, dtype=np.int32)
+        self.row_chunk = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.chunk_texts: List[str] = []
+        self.dead = 0
+
+        # Resume slots (row_resume values): id, metadata, and value -> slots per metadata key
+        self.resume_ids: List[str] = []
+        self.resume_meta: List[Dict[str, Any]] = []
+        self.resume_slots: Dict[str, int] = {}
+        self.facets: Dict[str, Dict[str, set]] = {}
+
+        # IVF partition: list l owns rows [offsets[l], offsets[l + 1]) plus pending[l]
+        self.centroids: Optional[np.ndarray] = None
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.pending: Dict[int, List[int]] = {}
+        self.trained_size = 0
+        self.training = False
+
+    @property
+    def live_rows(self) -> int:
+        return self.size - self.dead
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self) -> bool:
+        """Untrained but big enough, outgrown its partition, or carrying many removed rows"""
+        if self.training or self.live_rows < self.min_train:
+            return False
+        return (
+            not self.trained
+            or self.live_rows >= self.trained_size * RETRAIN_GROWTH
+            or self.dead > self.size * COMPACT_DEAD_SHARE
+        )
+
+    def _reserve(self, rows: int):
+        needed = self.size + rows
+        if needed <= len(self.row_resume):
+            return
+        capacity = max(needed, 2 * len(self.row_resume), 1024)
+        # New buffers: a training thread may still be reading the old ones
+        if not self.zero_copy:
+            self.vectors = _grown(self.vectors, self.size, capacity)
+        self.row_resume = _grown(self.row_resume, self.size, capacity)
+        self.row_chunk = _grown(self.row_chunk, self.size, capacity)
+        self.alive = _grown(self.alive, self.size, capacity)
+
+    def _slot(self, resume_id: str, metadata: Dict[str, Any]) -> int:
+        slot = self.resume_slots.get(resume_id)
+        if slot is None:
+            slot = len(self.resume_ids)
+            self.resume_slots[resume_id] = slot
+            self.resume_ids.append(resume_id)
+            self.resume_meta.append({})
+        else:
+            self._unindex_facets(slot)
+        self.resume_meta[slot] = {"resume_id": resume_id, **metadata}
+        for key, value in self.resume_meta[slot].items():
+            if value is not None:
+                self.facets.setdefault(key, {}).setdefault(str(value), set()).add(slot)
+        return slot
+
+    def _unindex_facets(self, slot: int):
+        for key, value in self.resume_meta[slot].items():
+            if value is not None:
+                self.facets.get(key, {}).get(str(value), set()).discard(slot)
+
+    def add(
+        self,
+        resume_id: str,
+        vectors: np.ndarray,
+        chunk_indexes: Iterable[int],
+        chunk_texts: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Add chunks of a resume (appending to any it already has; use replace to swap them)"""
+        vectors = normalize(vectors)
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dimensional vectors, got {vectors.shape[1]}")
+
+        slot = self._slot(resume_id, metadata or {})
+        chunk_indexes, chunk_texts = list(chunk_indexes), list(chunk_texts)
+        if self.store is not None:
+            self.store.append(resume_id, vectors, chunk_indexes, chunk_texts, self.resume_meta[slot])
+
+        rows = np.arange(self.size, self.size + len(vectors))
+        self._reserve(len(vectors))
+        if not self.zero_copy:
+            # Rounded like the stored copy, so a reload ranks the same
+            self.vectors[rows] = vectors if self.store is None else vectors.astype(self.store.dtype)
+        # (a store-backed index maps the appended rows in on its next search)
+        self.row_resume[rows] = slot
+        self.row_chunk[rows] = chunk_indexes
+        self.alive[rows] = True
+        if self.store is None:
+            self.chunk_texts.extend(chunk_texts)
+        self.size += len(vectors)
+
+        if self.trained:
+            for row, list_id in zip(rows.tolist(), assign_lists(vectors, self.centroids).tolist()):
+                self.pending.setdefault(list_id, []).append(row)
+
+    def remove(self, resume_id: str) -> int:
+        """Drop every chunk of a resume; returns how many were removed"""
+        slot = self.resume_slots.get(resume_id)
+        if slot is None:
+            return 0
+        rows = np.flatnonzero((self.row_resume[:self.size] == slot) & self.alive[:self.size])
+        self.alive[rows] = False
+        if self.store is not None:
+            self.store.delete(rows)
+        self.dead += len(rows)
+        self._unindex_facets(slot)
+        self.resume_meta[slot] = {"resume_id": resume_id}
+        return len(rows)
+
+    def replace(self, resume_id: str, vectors: np.ndarray, chunk_indexes, chunk_texts, metadata=None):
+        """Swap a resume's chunks for new ones (re-uploads, re-embedding)"""
+        self.remove(resume_id)
+        self.add(resume_id, vectors, chunk_indexes, chunk_texts, metadata)
+
+    def chunk_text(self, row: int) -> str:
+        return self.store.text(row) if self.store is not None else self.chunk_texts[row]
+
+    def _sync_mapping(self):
+        if self.zero_copy and len(self.vectors) < self.size:
+            self.vectors = self.store.vectors
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Vector buffer, live rows and size, for training off the event loop"""
+        if self.store is not None:
+            # Map on the event loop; the training thread reads these mappings
+            self.store.refresh()
+        self._sync_mapping()
+        return self.vectors, np.flatnonzero(self.alive[:self.size]), self.size
+
+    def train(self, vectors: np.ndarray, rows: np.ndarray, size: int) -> Dict[str, Any]:
+        """
+        k-means on a sample of `rows`, and those rows' vectors laid out list by
+        list; CPU-bound and safe to run in a thread while the index keeps
+        taking adds and removals (rows are never rewritten in place)
+        """
+        started = time.perf_counter()
+        nlist = min(self.nlist or int(np.clip(np.sqrt(len(rows)), 16, 4096)), len(rows))
+        sample = rows if len(rows) <= self.train_sample else self.rng.choice(rows, self.train_sample, replace=False)
+        centroids = train_centroids(vectors[np.sort(sample)], nlist, self.train_iterations, self.rng)
+
+        assignments = assign_lists(vectors[rows], centroids)
+        order = rows[np.argsort(assignments, kind="stable")]
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=nlist)))).astype(np.int64)
+        trained = {"centroids": centroids, "order": order, "offsets": offsets, "size": size}
+
+        if self.store is not None:
+            # Compaction: the store's next generation in the same order
+            trained["compaction"] = self.store.write_compacted(order)
+        if not self.zero_copy:
+            # Headroom for the chunks stored while this ran and after
+            laid_out = np.empty((len(order) + max(len(order) // 4, 1024), self.dimensions), dtype=np.float32)
+            laid_out[:len(order)] = vectors[order]
+            trained["vectors"] = laid_out
+        trained["seconds"] = time.perf_counter() - started
+        return trained
+
+    def install(self, trained: Dict[str, Any]):
+        """
+        Switch to a trained layout: the trained rows in list order, then the
+        rows added while it was trained (pending); rows removed meanwhile stay
+        flagged, rows removed before are gone
+        """
+        order = trained["order"]
+        tail = np.arange(trained["size"], self.size)
+        tail = tail[self.alive[tail]]
+        old_rows = np.concatenate((order, tail))
+        size = len(old_rows)
+        alive = self.alive[old_rows]
+
+        if self.store is not None:
+            try:
+                self.store.finish_compaction(
+                    trained["compaction"], tail, alive, {"centroids": trained["centroids"], "offsets": trained["offsets"]}
+                )
+            except Exception:
+                self.store.discard_compaction(trained["compaction"])
+                raise
+
+        if self.zero_copy:
+            self.vectors = self.store.vectors
+            capacity = size + max(size // 4, 1024)
+        else:
+            vectors = trained["vectors"]
+            if len(vectors) < size:
+                vectors = _grown(vectors, len(order), size)
+            vectors[len(order):size] = self.vectors[tail]
+            self.vectors = vectors
+            capacity = len(vectors)
+
+        self.row_resume = _grown(self.row_resume[old_rows], size, capacity)
+        self.row_chunk = _grown(self.row_chunk[old_rows], size, capacity)
+        self.alive = _grown(alive, size, capacity)
+        if self.store is None:
+            self.chunk_texts = [self.chunk_texts[row] for row in old_rows.tolist()]
+        self.size = size
+        self.dead = size - int(self.alive[:size].sum())
+
+        self.centroids = trained["centroids"]
+        self.offsets = trained["offsets"]
+        self.pending = {}
+        if tail.size:
+            for row, list_id in zip(range(len(order), size), assign_lists(self.vectors[len(order):size], self.centroids).tolist()):
+                self.pending.setdefault(list_id, []).append(row)
+        self.trained_size = len(order)
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore, **settings) -> "IvfIndex":
+        """
+        An index over everything in a store: float32 vectors stay mapped (no
+        read until searched), metadata comes from the row records, and the
+        saved IVF layout is reused so no k-means runs at startup
+        """
+        index = cls(store.dimensions, store=store, **settings)
+        count = store.count
+        if not count:
+            return index
+        records = np.asarray(store.rows)
+
+        resume_ids, slots = np.unique(records["resume_id"], return_inverse=True)
+        alive = records["alive"].astype(bool)
+        capacity = count + max(count // 4, 1024)
+        if index.zero_copy:
+            index.vectors = store.vectors
+        else:
+            index.vectors = np.empty((capacity, store.dimensions), dtype=np.float32)
+            index.vectors[:count] = store.vectors
+        index.row_resume = _grown(slots.astype(np.int32), count, capacity)
+        index.row_chunk = _grown(records["chunk_index"], count, capacity)
+        index.alive = _grown(alive, count, capacity)
+        index.size = count
+        index.dead = count - int(alive.sum())
+
+        # Metadata (and facets) from each resume's last live row, a column at a time
+        index.resume_ids = [resume_id.decode() for resume_id in resume_ids.tolist()]
+        index.resume_slots = {resume_id: slot for slot, resume_id in enumerate(index.resume_ids)}
+        index.resume_meta = [{"resume_id": resume_id} for resume_id in index.resume_ids]
+        last_live = np.full(len(resume_ids), -1, dtype=np.int64)
+        live_rows = np.flatnonzero(alive)
+        last_live[slots[live_rows]] = live_rows
+        live_slots = np.flatnonzero(last_live >= 0)
+        live_records = records[last_live[live_slots]]
+
+        index.facets = {"resume_id": {index.resume_ids[slot]: {slot} for slot in live_slots.tolist()}}
+        if live_slots.size:
+            index.facets["model_version"] = {store.model_version: set(live_slots.tolist())}
+        columns = {}
+        for key in STORED_METADATA:
+            values, groups = np.unique(live_records[key], return_inverse=True)
+            columns[key] = [value.decode() or None for value in values.tolist()]
+            order = np.argsort(groups, kind="stable")
+            bounds = np.cumsum(np.bincount(groups, minlength=len(values)))[:-1]
+            index.facets[key] = {
+                value: set(members.tolist())
+                for value, members in zip(columns[key], np.split(live_slots[order], bounds))
+                if value is not None
+            }
+            columns[key] = [columns[key][group] for group in groups.tolist()]
+        for position, slot in enumerate(live_slots.tolist()):
+            meta = index.resume_meta[slot]
+            for key in STORED_METADATA:
+                meta[key] = columns[key][position]
+            meta["model_version"] = store.model_version
+
+        layout = store.load_layout()
+        if layout is not None and int(layout["offsets"][-1]) <= count:
+            index.centroids = layout["centroids"]
+            index.offsets = layout["offsets"]
+            index.trained_size = int(layout["offsets"][-1])
+            tail = np.arange(index.trained_size, count)
+            if tail.size:
+                for row, list_id in zip(tail.tolist(), assign_lists(index.vectors[tail], index.centroids).tolist()):
+                    index.pending.setdefault(list_id, []).append(row)
+        return index
+
+    def _filtered_slots(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Mask of resume slots matching every filter (equality), or None without filters"""
+        if not filters:
+            return None
+        allowed: Optional[set] = None
+        for key, value in filters.items():
+            slots = self.facets.get(key, {}).get(str(value), set())
+            allowed = set(slots) if allowed is None else allowed & slots
+            if not allowed:
+                break
+        mask = np.zeros(len(self.resume_ids), dtype=bool)
+        if allowed:
+            mask[list(allowed)] = True
+        return mask
+
+    def _score(self, query: np.ndarray, filters: Optional[Dict[str, Any]], nprobe: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate rows and their similarities: the probed lists, or every row when few enough are searched"""
+        self._sync_mapping()
+        slot_mask = self._filtered_slots(filters)
+        if slot_mask is not None:
+            rows = np.flatnonzero(slot_mask[self.row_resume[:self.size]] & self.alive[:self.size])
+            if len(rows) <= self.exact_search_max or not self.trained:
+                return rows, self.vectors[rows] @ query
+
+        if not self.trained or self.live_rows <= self.exact_search_max:
+            rows = np.arange(self.size)
+            similarities = self.vectors[:self.size] @ query
+        else:
+            probes = min(nprobe or self.nprobe, len(self.centroids))
+            closest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes].tolist()
+            spans = [(self.offsets[list_id], self.offsets[list_id + 1]) for list_id in closest]
+            pending = np.asarray([row for list_id in closest for row in self.pending.get(list_id, ())], dtype=np.int64)
+            rows = np.concatenate([np.arange(start, end) for start, end in spans] + [pending])
+            similarities = np.concatenate([self.vectors[start:end] @ query for start, end in spans] + [self.vectors[pending] @ query])
+
+        keep = self.alive[rows]
+        if slot_mask is not None:
+            keep &= slot_mask[self.row_resume[rows]]
+        return rows[keep], similarities[keep]
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int = 10,
+        threshold: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[str, int, float]]:
+        """
+        Best `limit` resumes by their closest chunk with cosine >= threshold
+        Returns:
+            (resume_id, row, similarity) best first
+        """
+        rows, similarities = self._score(normalize(query)[0], filters, nprobe)
+        keep = similarities >= threshold
+        rows, similarities = rows[keep], similarities[keep]
+        if not rows.size:
+            return []
+
+        # Best chunk per resume, then the best resumes
+        order = np.argsort(-similarities, kind="stable")
+        _, first = np.unique(self.row_resume[rows[order]], return_index=True)
+        best = order[first]
+        best = best[np.argsort(-similarities[best], kind="stable")][:limit]
+        return [
+            (self.resume_ids[self.row_resume[row]], int(row), float(similarities[index]))
+            for index, row in zip(best.tolist(), rows[best].tolist())
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dimensions": self.dimensions,
+            "rows": self.live_rows,
+            "removed_rows": self.dead,
+            "resumes": len(np.unique(self.row_resume[:self.size][self.alive[:self.size]])),
+            "trained": self.trained,
+            "lists": len(self.centroids) if self.trained else 0,
+            "trained_rows": self.trained_size,
+            "pending_rows": sum(len(rows) for rows in self.pending.values()),
+            "memory_mb": 0.0 if self.zero_copy else round(self.vectors.nbytes / 1e6, 1),
+            "store": self.store.stats() if self.store is not None else None
+        }
+
+
+class LocalVectorIndex:
+    """One IvfIndex per embedding model, with background (re)training and optional on-disk stores"""
+
+    def __init__(self):
+        self.nlist = int(os.getenv("ANN_NLIST", "0")) or None
+        # recall@15 0.95 on 100k chunks / 316 lists (benchmarks/bench_ann_index.py); raise it for bigger indexes
+        self.nprobe = int(os.getenv("ANN_NPROBE", "192"))
+        self.min_train = int(os.getenv("ANN_MIN_TRAIN_VECTORS", "1000"))
+        self.train_sample = int(os.getenv("ANN_TRAIN_SAMPLE", "20000"))
+        self.train_iterations = int(os.getenv("ANN_TRAIN_ITERATIONS", "10"))
+        self.exact_search_max = int(os.getenv("ANN_EXACT_SEARCH_MAX", "20000"))
+        self.indexes: Dict[str, IvfIndex] = {}
+        self.ready = False
+        self._training_tasks: Dict[str, asyncio.Task] = {}
+
+        self.store_dir = os.getenv("EMBEDDING_STORE_DIR") or None
+        self.store_dtype = os.getenv("EMBEDDING_STORE_DTYPE", "float32").lower()
+        self._store_lock = None
+        if self.store_dir and not STORE_SUPPORTED:
+            logger.warning(f"Embedding store {self.store_dir} needs a POSIX system; indexing in memory only")
+            self.store_dir = None
+        if self.store_dir:
+            self._store_lock = lock_directory(self.store_dir)
+            if self._store_lock is None:
+                logger.warning(f"Embedding store {self.store_dir} is in use by another process; indexing in memory only")
+                self.store_dir = None
+
+    def _settings(self) -> Dict[str, Any]:
+        return {
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "min_train": self.min_train,
+            "train_sample": self.train_sample,
+            "train_iterations": self.train_iterations,
+            "exact_search_max": self.exact_search_max
+        }
+
+    def index_for(self, model_version: str, dimensions: int) -> IvfIndex:
+        index = self.indexes.get(model_version)
+        if index is None:
+            store = EmbeddingStore(self.store_dir, model_version, dimensions, self.store_dtype) if self.store_dir else None
+            index = IvfIndex(dimensions, store=store, **self._settings())
+            self.indexes[model_version] = index
+        return index
+
+    def load_stores(self) -> int:
+        """Map every on-disk store into an index; returns the live chunks restored"""
+        restored = 0
+        for model_version in discover(self.store_dir) if self.store_dir else []:
+            started = time.perf_counter()
+            try:
+                index = IvfIndex.from_store(EmbeddingStore(self.store_dir, model_version), **self._settings())
+            except Exception as e:
+                logger.error(f"Could not load embedding store for {model_version}, it will be rebuilt: {str(e)}")
+                manifest = os.path.join(self.store_dir, EmbeddingStore.manifest_name(model_version))
+                os.replace(manifest, f"{manifest}.broken")
+                continue
+            self.indexes[model_version] = index
+            restored += index.live_rows
+            logger.info(
+                f"Mapped embedding store for {model_version}: {index.live_rows} chunks, "
+                f"{'trained' if index.trained else 'untrained'} ({(time.perf_counter() - started) * 1000:.0f} ms)"
+            )
+            self.schedule_training(model_version)
+        return restored
+
+    def synced_at(self) -> Optional[float]:
+        """Oldest sync time across the stores (None if any store never finished one)"""
+        times = [index.store.synced_at for index in self.indexes.values() if index.store is not None]
+        if not times or any(value is None for value in times):
+            return None
+        return min(times)
+
+    def mark_synced(self, synced_at: float):
+        for index in self.indexes.values():
+            if index.store is not None:
+                index.store.mark_synced(synced_at)
+
+    def close(self):
+        for index in self.indexes.values():
+            if index.store is not None:
+                index.store.close()
+        if self._store_lock is not None:
+            self._store_lock.close()
+            self._store_lock = None
+
+    def replace(
+        self,
+        model_version: str,
+        resume_id: str,
+        embeddings: List[List[float]],
+        chunks: List[str],
+        metadata: Dict[str, Any]
+    ):
+        """Index a resume's freshly stored chunks, dropping what it had before"""
+        if not embeddings:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        for other_model, index in self.indexes.items():
+            if other_model != model_version:
+                index.remove(resume_id)
+        index = self.index_for(model_version, vectors.shape[1])
+        index.replace(resume_id, vectors, range(len(vectors)), (chunk[:1000] for chunk in chunks), metadata)
+        self.schedule_training(model_version)
+
+    def search(
+        self,
+        model_version: str,
+        query: List[float],
+        limit: int,
+        threshold: float,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Best chunk of the closest resumes, shaped like pgvector search rows"""
+        index = self.indexes.get(model_version)
+        if index is None:
+            return []
+        return [
+            {
+                "resume_id": resume_id,
+                "similarity": similarity,
+                "chunk_text": index.chunk_text(row),
+                "model_version": model_version,
+                "metadata": {**index.resume_meta[index.row_resume[row]], "chunk_index": int(index.row_chunk[row])}
+            }
+            for resume_id, row, similarity in index.search(np.asarray(query, dtype=np.float32), limit, threshold, filters)
+        ]
+
+    def schedule_training(self, model_version: str):
+        """(Re)train an index in a thread once it is big enough or has outgrown its partition"""
+        index = self.indexes[model_version]
+        if not index.needs_training():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            index.install(index.train(*index.snapshot()))
+            return
+        index.training = True
+        self._training_tasks[model_version] = loop.create_task(self._train(model_version, index))
+
+    async def _train(self, model_version: str, index: IvfIndex):
+        try:
+            trained = await asyncio.to_thread(index.train, *index.snapshot())
+            index.install(trained)
+            logger.info(
+                f"Trained local ANN index for {model_version}: {len(trained['order'])} chunks in "
+                f"{len(trained['centroids'])} lists ({trained['seconds']:.1f}s)"
+            )
+        except Exception as e:
+            logger.error(f"Training local ANN index for {model_version} failed: {str(e)}")
+        finally:
+            index.training = False
+            self._training_tasks.pop(model_version, None)
+
+    async def wait_for_training(self):
+        if self._training_tasks:
+            await asyncio.gather(*self._training_tasks.values(), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "nprobe": self.nprobe,
+            "store_dir": self.store_dir,
+            "models": {model_version: index.stats() for model_version, index in self.indexes.items()}
+        }
@@ -28,11 +28,7 @@ class CacheService:
             Cached result or None if not found/expired
         """
         try:
-            query = """
-                SELECT output_data, model_used, tokens_used, cost_usd, expires_at
-                FROM ai_cache 
-                WHERE cache_key = %s AND cache_type = %s AND expires_at > NOW()
-            """
+            query = "ai_cache.get"
             
             result = await self.db.fetch_one(query, (cache_key, cache_type))
             
@@ -86,24 +82,12 @@ class CacheService:
             
             expires_at = datetime.utcnow() + timedelta(hours=ttl_hours)
             
-            query = """
-                INSERT INTO ai_cache (
-                    cache_key, cache_type, input_hash, output_data, 
-                    model_used, tokens_used, cost_usd, expires_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (cache_key) DO UPDATE SET
-                    output_data = EXCLUDED.output_data,
-                    model_used = EXCLUDED.model_used,
-                    tokens_used = EXCLUDED.tokens_used,
-                    cost_usd = EXCLUDED.cost_usd,
-                    expires_at = EXCLUDED.expires_at,
-                    updated_at = NOW()
-            """
+            query = "ai_cache.upsert"
             
             await self.db.execute(
                 query,
                 (
-                    cache_key, cache_type, input_hash, json.dumps(output_data),
+                    cache_key, cache_type, input_hash, output_data,
                     model_used, tokens_used, cost_usd, expires_at
                 )
             )
@@ -118,17 +102,7 @@ class CacheService:
     async def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics for monitoring"""
         try:
-            stats_query = """
-                SELECT 
-                    cache_type,
-                    COUNT(*) as total_entries,
-                    COUNT(CASE WHEN expires_at > NOW() THEN 1 END) as active_entries,
-                    SUM(tokens_used) as total_tokens,
-                    SUM(cost_usd) as total_cost_saved,
-                    AVG(cost_usd) as avg_cost_per_entry
-                FROM ai_cache 
-                GROUP BY cache_type
-            """
+            stats_query = "ai_cache.stats"
             
             results = await self.db.fetch_all(stats_query)
             
@@ -164,8 +138,8 @@ class CacheService:
     async def clear_expired_cache(self) -> int:
         """Clear expired cache entries"""
         try:
-            delete_query = "DELETE FROM ai_cache WHERE expires_at <= NOW()"
-            result = await self.db.execute(delete_query)
+            delete_query = "ai_cache.delete_expired"
+            result = await self.db.execute(delete_query, pool="maintenance")
             
             # Get count of deleted rows (implementation depends on your DB driver)
             count_query = "SELECT changes()" # SQLite syntax, adjust for PostgreSQL
@@ -181,7 +155,7 @@ class CacheService:
     async def invalidate_cache_by_type(self, cache_type: str) -> bool:
         """Invalidate all cache entries of a specific type"""
         try:
-            query = "DELETE FROM ai_cache WHERE cache_type = %s"
+            query = "ai_cache.delete_by_type"
             await self.db.execute(query, (cache_type,))
             
             logger.info(f"Invalidated all {cache_type} cache entries")
@@ -54,13 +54,10 @@ class ComparisonService:
             if not job_description:
                 raise Exception("Job description not found")
             
-            # Calculate vector similarities
-            similarity_scores = {}
-            for resume_id in resume_ids:
-                similarity = await self.vector_service.calculate_similarity_score(
-                    resume_id, job_description_id, plan_type
-                )
-                similarity_scores[resume_id] = similarity
+            # Vector similarities of every candidate in one batched pass
+            similarity_scores = await self.vector_service.calculate_similarity_scores(
+                job_description_id, resume_ids, plan_type
+            )
             
             # Generate AI comparison
             ai_comparison = await self._generate_ai_comparison(
@@ -91,26 +88,14 @@ class ComparisonService:
     async def _get_candidate_data(self, resume_id: str) -> Dict[str, Any]:
         """Get candidate data for comparison"""
         try:
-            query = """
-                SELECT r.file_name, r.extracted_data, ra.match_score,
-                       ra.skill_match_score, ra.experience_score, ra.education_score
-                FROM resumes r
-                LEFT JOIN resume_analysis ra ON r.id = ra.resume_id
-                WHERE r.id = %s
-            """
+            query = "resumes.get_candidate_with_scores"
             
             result = await self.db.fetch_one(query, (resume_id,))
             
             if not result:
                 return None
             
-            # Parse extracted data
-            extracted_data = result["extracted_data"] if result["extracted_data"] else {}
-            if isinstance(extracted_data, str):
-                try:
-                    extracted_data = json.loads(extracted_data)
-                except json.JSONDecodeError:
-                    extracted_data = {}
+            extracted_data = result["extracted_data"] or {}
             
             return {
                 "resume_id": resume_id,
@@ -129,13 +114,7 @@ class ComparisonService:
     async def _get_job_description(self, job_description_id: str) -> str:
         """Get job description text"""
         try:
-            query = """
-                SELECT title, description, requirements
-                FROM job_descriptions 
-                WHERE id = %s
-            """
-            
-            result = await self.db.fetch_one(query, (job_description_id,))
+            result = await self.db.load("job", job_description_id)
             
             if not result:
                 return None
@@ -301,13 +280,7 @@ class ComparisonService:
     async def _store_comparison(self, comparison_data: Dict[str, Any]) -> str:
         """Store comparison results in database"""
         try:
-            query = """
-                INSERT INTO candidate_comparisons (
-                    user_id, job_description_id, resume_ids,
-                    comparison_result, ranking, ai_insights, comparison_metadata
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """
+            query = "candidate_comparisons.insert_with_metadata"
             
             resume_ids = [candidate["resume_id"] for candidate in comparison_data.get("ranking", [])]
             
@@ -326,14 +299,14 @@ class ComparisonService:
                     comparison_data["user_id"],
                     comparison_data["job_description_id"],
                     resume_ids,
-                    json.dumps({
+                    {
                         "comparison_matrix": comparison_data.get("comparison_matrix", []),
                         "key_differentiators": comparison_data.get("key_differentiators", []),
                         "hiring_recommendations": comparison_data.get("hiring_recommendations", [])
-                    }),
-                    json.dumps(comparison_data.get("ranking", [])),
+                    },
+                    comparison_data.get("ranking", []),
                     comparison_data.get("ai_insights", ""),
-                    json.dumps(metadata)
+                    metadata
                 )
             )
             
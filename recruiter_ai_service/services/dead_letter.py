@@ -0,0 +1,168 @@
+"""
+Dead-letter queue for jobs that exhausted their retries
+The worker stores the original queue payload with its failure reason and an
+error class in the backend's dead-letter stream; DeadLetterReplayer lists and
+re-enqueues them in bulk (by error class, time range, user and job type) at a
+controlled rate, e.g. after an OpenAI outage.
+
+    python replay_dead_letters.py replay --error-class rate_limit,llm_unavailable --since 6h --rate 5
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+
+from services.fair_scheduler import describe_job
+
+logger = logging.getLogger(__name__)
+
+# First matching class wins; matched against the lower-cased error message
+ERROR_CLASSES = (
+    ("rate_limit", ("rate limit", "ratelimit", "429", "too many requests", "quota")),
+    ("timeout", ("timeout", "timed out")),
+    ("llm_unavailable", ("openai", "api connection", "service unavailable", "bad gateway", "502", "503", "overloaded")),
+    ("not_found", ("not found",)),
+    ("database", ("asyncpg", "postgres", "database", "connection")),
+    ("invalid_input", ("permanent", "invalid", "unknown job type", "keyerror", "jsondecodeerror"))
+)
+
+
+def classify_error(error_message: str) -> str:
+    """Coarse error class of a failure message, used to filter replays"""
+    message = (error_message or "").lower()
+    for error_class, patterns in ERROR_CLASSES:
+        if any(pattern in message for pattern in patterns):
+            return error_class
+    return "other"
+
+
+def build_dead_letter(queue_item: Dict[str, Any], error_message: str) -> Dict[str, str]:
+    """Dead-letter entry for a failed payload (all string fields, stream-friendly)"""
+    user_id, _, _ = describe_job(queue_item)
+    return {
+        "job_id": str(queue_item.get("job_id", "")),
+        "job_type": str(queue_item.get("job_type", "")),
+        "user_id": user_id,
+        "error": (error_message or "")[:2000],
+        "error_class": classify_error(error_message),
+        "retry_count": str(queue_item.get("retry_count", 0)),
+        "failed_at": datetime.utcnow().isoformat(),
+        "payload": json.dumps(queue_item)
+    }
+
+
+class DeadLetterReplayer:
+    """Filtered listing and rate-controlled bulk replay of dead-lettered jobs"""
+
+    def __init__(self, queue_backend, db_service=None, page_size: int = 200):
+        """
+        Args:
+            queue_backend: QueueBackend holding the dead-letter stream
+            db_service: DatabaseService used to put replayed jobs back to 'queued'
+            page_size: Entries read per backend call while scanning
+        """
+        self.queue_backend = queue_backend
+        self.db = db_service
+        self.page_size = page_size
+        self.default_rate = float(os.getenv("DEAD_LETTER_REPLAY_RATE", "5"))
+
+    @staticmethod
+    def _matches(
+        entry: Dict[str, str],
+        error_classes: Optional[Sequence[str]],
+        user_id: Optional[str],
+        job_type: Optional[str]
+    ) -> bool:
+        if error_classes and entry.get("error_class") not in error_classes:
+            return False
+        if user_id and entry.get("user_id") != user_id:
+            return False
+        if job_type and entry.get("job_type") != job_type:
+            return False
+        return True
+
+    async def scan(
+        self,
+        error_classes: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None,
+        job_type: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None
+    ):
+        """Async generator over matching entries, oldest first"""
+        after_id = None
+        found = 0
+        while True:
+            page = await self.queue_backend.dead_letters(since=since, until=until, after_id=after_id, count=self.page_size)
+            for entry in page:
+                if self._matches(entry, error_classes, user_id, job_type):
+                    yield entry
+                    found += 1
+                    if limit and found >= limit:
+                        return
+            if len(page) < self.page_size:
+                return
+            after_id = page[-1]["id"]
+
+    async def list(self, limit: int = 100, **filters) -> List[Dict[str, Any]]:
+        """Matching entries without their payloads"""
+        return [
+            {key: value for key, value in entry.items() if key != "payload"}
+            async for entry in self.scan(limit=limit, **filters)
+        ]
+
+    async def replay(
+        self,
+        error_classes: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None,
+        job_type: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+        rate: Optional[float] = None,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Re-enqueue matching jobs with a fresh retry budget, at most `rate` jobs
+        per second, removing each from the dead-letter stream once it is back
+        on its queue. dry_run only counts what would be replayed.
+        """
+        rate = rate or self.default_rate
+        interval = 1.0 / rate if rate > 0 else 0.0
+        summary: Dict[str, Any] = {"matched": 0, "replayed": 0, "failed": 0, "by_error_class": {}, "dry_run": dry_run}
+        next_at = time.monotonic()
+
+        async for entry in self.scan(error_classes, user_id, job_type, since, until, limit):
+            summary["matched"] += 1
+            error_class = entry.get("error_class", "other")
+            summary["by_error_class"][error_class] = summary["by_error_class"].get(error_class, 0) + 1
+            if dry_run:
+                continue
+
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_at = max(next_at, time.monotonic()) + interval
+
+            try:
+                payload = json.loads(entry["payload"])
+                payload["retry_count"] = 0
+                payload["enqueued_at"] = time.time()
+                payload["replayed_from"] = entry["id"]
+
+                if self.db:
+                    await self.db.execute("processing_jobs.requeue", (payload["job_id"],))
+                await self.queue_backend.enqueue(payload)
+                await self.queue_backend.remove_dead_letter(entry["id"])
+                summary["replayed"] += 1
+            except Exception as e:
+                summary["failed"] += 1
+                logger.error(f"Failed to replay dead-lettered job {entry.get('job_id')} ({entry['id']}): {e}")
+
+        logger.info(f"Dead-letter replay: {summary}")
+        return summary
@@ -0,0 +1,428 @@
+"""
+Memory-mapped on-disk store for resume chunk embeddings
+One store per embedding model in EMBEDDING_STORE_DIR, so the local ANN index
+(services/ann_index.py) is mapped back in at startup instead of re-read from
+Postgres. A generation of a store is three append-only files plus an
+optional saved IVF layout:
+
+    <model>.<gen>.vectors   header (magic + JSON: model_version, dimensions,
+                            dtype) then one float32/float16 row per chunk
+    <model>.<gen>.rows      fixed-width records in the same order: resume,
+                            owner, chunk index, text span, alive flag
+    <model>.<gen>.text      chunk texts (utf-8) the records point into
+    <model>.<gen>.ivf.npz   centroids and list offsets of the rows it covers
+
+<model>.json names the current generation. Removing a resume only clears the
+alive flag of its rows; compaction writes the live rows (in IVF list order)
+as the next generation and switches the manifest atomically. Row i of the
+store is always row i of the index.
+
+One process writes a directory at a time (an exclusive lock file). POSIX
+only: on other systems (Windows) the index is kept in memory.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RAIEMB01"
+FORMAT_VERSION = 1
+HEADER_BYTES = 4096
+DTYPES = {"float32": np.float32, "float16": np.float16}
+ROW_DTYPE = np.dtype([
+    ("resume_id", "S36"),
+    ("user_id", "S36"),
+    ("job_description_id", "S36"),
+    ("plan_type", "S16"),
+    ("chunk_index", "<i4"),
+    ("text_offset", "<i8"),
+    ("text_length", "<i4"),
+    ("alive", "u1")
+])
+# Resume metadata kept in the row records (filterable in the index)
+STORED_METADATA = ("user_id", "job_description_id", "plan_type")
+# Rows copied per write while compacting
+COPY_BATCH_ROWS = 16384
+# Locking (fcntl) and text reads (os.pread) are POSIX-only; elsewhere the index stays in memory
+STORE_SUPPORTED = os.name == "posix"
+
+
+def model_slug(model_version: str) -> str:
+    """File-name-safe form of a model version"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", model_version)
+
+
+def _text(value: Any) -> bytes:
+    return b"" if value is None else str(value).encode()
+
+
+def lock_directory(directory: str):
+    """Exclusive writer lock on a store directory; returns the held file, or None if another process has it"""
+    os.makedirs(directory, exist_ok=True)
+    handle = open(os.path.join(directory, ".lock"), "w")
+    try:
+        import fcntl
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def discover(directory: str) -> List[str]:
+    """Model versions with a store in `directory`"""
+    if not os.path.isdir(directory):
+        return []
+    models = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as manifest:
+                    models.append(json.load(manifest)["model_version"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable embedding store manifest {name}: {str(e)}")
+    return models
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped embedding matrix and ID map of one embedding model"""
+
+    def __init__(self, directory: str, model_version: str, dimensions: Optional[int] = None, dtype: str = "float32"):
+        """
+        Open the model's store in `directory`, creating it if missing
+
+        Args:
+            directory: Store directory (EMBEDDING_STORE_DIR)
+            model_version: Embedding model the vectors come from
+            dimensions: Embedding size; required to create, checked on open
+            dtype: float32 or float16 for a new store (EMBEDDING_STORE_DTYPE);
+                   an existing store keeps its own
+        """
+        self.directory = directory
+        self.model_version = model_version
+        self.slug = model_slug(model_version)
+        self.manifest_path = os.path.join(directory, self.manifest_name(model_version))
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifest:
+                self.manifest = json.load(manifest)
+        else:
+            if not dimensions:
+                raise ValueError(f"No embedding store for {model_version} in {directory} and no dimensions to create one")
+            if dtype not in DTYPES:
+                raise ValueError(f"Unsupported embedding store dtype '{dtype}' (float32 or float16)")
+            self.manifest = {
+                "model_version": model_version,
+                "dimensions": dimensions,
+                "dtype": dtype,
+                "generation": 0,
+                "created_at": time.time(),
+                "compacted_at": None,
+                "synced_at": None
+            }
+            self._write_generation_header(0)
+            self._write_manifest()
+
+        if dimensions and dimensions != self.dimensions:
+            raise ValueError(f"Embedding store for {model_version} holds {self.dimensions}-dimensional vectors, not {dimensions}")
+        self._open_generation()
+
+    @staticmethod
+    def manifest_name(model_version: str) -> str:
+        return f"{model_slug(model_version)}.json"
+
+    @property
+    def dimensions(self) -> int:
+        return self.manifest["dimensions"]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(DTYPES[self.manifest["dtype"]])
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dimensions * self.dtype.itemsize
+
+    @property
+    def generation(self) -> int:
+        return self.manifest["generation"]
+
+    @property
+    def synced_at(self) -> Optional[float]:
+        return self.manifest.get("synced_at")
+
+    def _path(self, generation: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.slug}.{generation}.{suffix}")
+
+    def _write_manifest(self):
+        temporary = f"{self.manifest_path}.tmp"
+        with open(temporary, "w") as manifest:
+            json.dump(self.manifest, manifest)
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        os.replace(temporary, self.manifest_path)
+
+    def _write_generation_header(self, generation: int):
+        """Empty files of a generation, the vectors file starting with its header"""
+        header = json.dumps({
+            "format": FORMAT_VERSION,
+            "model_version": self.model_version,
+            "dimensions": self.manifest["dimensions"],
+            "dtype": self.manifest["dtype"],
+            "generation": generation
+        }).encode()
+        with open(self._path(generation, "vectors"), "wb") as vectors:
+            vectors.write((MAGIC + len(header).to_bytes(4, "little") + header).ljust(HEADER_BYTES, b"\0"))
+        for suffix in ("rows", "text"):
+            open(self._path(generation, suffix), "wb").close()
+
+    def _read_header(self, path: str) -> Dict[str, Any]:
+        with open(path, "rb") as vectors:
+            prefix = vectors.read(HEADER_BYTES)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an embedding store file")
+        length = int.from_bytes(prefix[len(MAGIC):len(MAGIC) + 4], "little")
+        header = json.loads(prefix[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+        if header.get("format") != FORMAT_VERSION or header.get("model_version") != self.model_version:
+            raise ValueError(f"{path} holds format {header.get('format')} of {header.get('model_version')}")
+        return header
+
+    def _open_generation(self):
+        generation = self.generation
+        self._read_header(self._path(generation, "vectors"))
+
+        # A torn append leaves at most a partial row behind; keep whole rows present in both files
+        vectors_path, rows_path = self._path(generation, "vectors"), self._path(generation, "rows")
+        count = min(
+            (os.path.getsize(vectors_path) - HEADER_BYTES) // self.row_bytes,
+            os.path.getsize(rows_path) // ROW_DTYPE.itemsize
+        )
+        os.truncate(vectors_path, HEADER_BYTES + count * self.row_bytes)
+        os.truncate(rows_path, count * ROW_DTYPE.itemsize)
+
+        self._vectors_file = open(vectors_path, "ab")
+        self._rows_file = open(rows_path, "ab")
+        self._text_file = open(self._path(generation, "text"), "ab")
+        self._text_fd = os.open(self._path(generation, "text"), os.O_RDONLY)
+        self.count = count
+        self._mapped = -1
+        self._map()
+
+    def _map(self):
+        """(Re)map the files after they grew; rows stay writable for the alive flag"""
+        if self.count:
+            self._vectors = np.memmap(
+                self._path(self.generation, "vectors"), dtype=self.dtype, mode="r",
+                offset=HEADER_BYTES, shape=(self.count, self.dimensions)
+            )
+            self._rows = np.memmap(self._path(self.generation, "rows"), dtype=ROW_DTYPE, mode="r+", shape=(self.count,))
+        else:
+            self._vectors = np.zeros((0, self.dimensions), dtype=self.dtype)
+            self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._mapped = self.count
+
+    def refresh(self):
+        """Map rows appended since the last access (mapping is lazy, appends are frequent)"""
+        if self._mapped != self.count:
+            self._map()
+
+    @property
+    def vectors(self) -> np.ndarray:
+        self.refresh()
+        return self._vectors
+
+    @property
+    def rows(self) -> np.ndarray:
+        self.refresh()
+        return self._rows
+
+    def close(self):
+        for handle in (self._vectors_file, self._rows_file, self._text_file):
+            handle.close()
+        os.close(self._text_fd)
+        if isinstance(self._rows, np.memmap):
+            self._rows.flush()
+
+    @staticmethod
+    def _records(
+        resume_id: str,
+        chunk_indexes: Iterable[int],
+        text_spans: List[Tuple[int, int]],
+        metadata: Dict[str, Any]
+    ) -> np.ndarray:
+        records = np.zeros(len(text_spans), dtype=ROW_DTYPE)
+        records["resume_id"] = _text(resume_id)
+        for key in STORED_METADATA:
+            records[key] = _text(metadata.get(key))
+        records["chunk_index"] = np.fromiter(chunk_indexes, dtype=np.int32, count=len(text_spans))
+        records["text_offset"] = [offset for offset, _ in text_spans]
+        records["text_length"] = [length for _, length in text_spans]
+        records["alive"] = 1
+        return records
+
+    def append(
+        self,
+        resume_id: str,
+        vectors: np.ndarray,
+        chunk_indexes: Iterable[int],
+        chunk_texts: Iterable[str],
+        metadata: Dict[str, Any]
+    ) -> int:
+        """
+        Append a resume's (unit) chunk vectors; returns the first new row
+        Texts go first and records last, so a crash mid-append leaves rows
+        that are trimmed on the next open rather than records without data.
+        """
+        texts = [text.encode() for text in chunk_texts]
+        offset = self._text_file.tell()
+        spans = []
+        for text in texts:
+            spans.append((offset, len(text)))
+            offset += len(text)
+        self._text_file.write(b"".join(texts))
+        self._text_file.flush()
+
+        self._vectors_file.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+        self._vectors_file.flush()
+        self._rows_file.write(self._records(resume_id, chunk_indexes, spans, metadata).tobytes())
+        self._rows_file.flush()
+
+        first_row = self.count
+        self.count += len(texts)
+        return first_row
+
+    def delete(self, rows: np.ndarray):
+        """Clear the alive flag of rows (a removed or replaced resume)"""
+        if len(rows):
+            self.rows["alive"][rows] = 0
+
+    def text(self, row: int) -> str:
+        record = self.rows[row]
+        return os.pread(self._text_fd, int(record["text_length"]), int(record["text_offset"])).decode(errors="replace")
+
+    def load_layout(self) -> Optional[Dict[str, np.ndarray]]:
+        """Saved IVF centroids and list offsets of this generation, if any"""
+        path = self._path(self.generation, "ivf.npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as layout:
+            return {"centroids": layout["centroids"], "offsets": layout["offsets"]}
+
+    def mark_synced(self, synced_at: float):
+        """Record that every embedding stored in Postgres before `synced_at` is here"""
+        self.manifest["synced_at"] = synced_at
+        self._write_manifest()
+
+    def write_compacted(self, order: np.ndarray) -> Dict[str, Any]:
+        """
+        Write rows `order` (a snapshot's live rows, in their new order) as the
+        next generation; CPU/IO-bound and safe to run in a thread while rows
+        are appended to the current one. Returns a plan for finish_compaction.
+        """
+        generation = self.generation + 1
+        self._write_generation_header(generation)
+        vectors, rows = self.vectors, self.rows
+        text_offset = 0
+
+        with open(self._path(generation, "vectors"), "ab") as vectors_out, \
+                open(self._path(generation, "rows"), "ab") as rows_out, \
+                open(self._path(generation, "text"), "ab") as text_out:
+            for start in range(0, len(order), COPY_BATCH_ROWS):
+                batch = order[start:start + COPY_BATCH_ROWS]
+                records = np.array(rows[batch])
+                texts = [
+                    os.pread(self._text_fd, int(length), int(offset))
+                    for offset, length in zip(records["text_offset"].tolist(), records["text_length"].tolist())
+                ]
+                records["text_offset"] = text_offset + np.concatenate(([0], np.cumsum(records["text_length"][:-1], dtype=np.int64)))
+                text_offset += int(records["text_length"].sum())
+
+                vectors_out.write(np.ascontiguousarray(vectors[batch]).tobytes())
+                rows_out.write(records.tobytes())
+                text_out.write(b"".join(texts))
+
+        return {"generation": generation, "rows": len(order), "text_bytes": text_offset}
+
+    def finish_compaction(
+        self,
+        plan: Dict[str, Any],
+        tail: np.ndarray,
+        alive: np.ndarray,
+        layout: Optional[Dict[str, np.ndarray]] = None
+    ):
+        """
+        Append the rows stored since write_compacted started (`tail`), apply
+        the alive flags of the new order, save the IVF layout and switch to
+        the new generation
+        """
+        generation = plan["generation"]
+        old_generation = self.generation
+        if len(tail):
+            records = np.array(self.rows[tail])
+            texts = [
+                os.pread(self._text_fd, int(length), int(offset))
+                for offset, length in zip(records["text_offset"].tolist(), records["text_length"].tolist())
+            ]
+            records["text_offset"] = plan["text_bytes"] + np.concatenate(([0], np.cumsum(records["text_length"][:-1], dtype=np.int64)))
+            with open(self._path(generation, "vectors"), "ab") as vectors_out:
+                vectors_out.write(np.ascontiguousarray(self.vectors[tail]).tobytes())
+            with open(self._path(generation, "rows"), "ab") as rows_out:
+                rows_out.write(records.tobytes())
+            with open(self._path(generation, "text"), "ab") as text_out:
+                text_out.write(b"".join(texts))
+
+        count = plan["rows"] + len(tail)
+        if count:
+            new_rows = np.memmap(self._path(generation, "rows"), dtype=ROW_DTYPE, mode="r+", shape=(count,))
+            new_rows["alive"] = alive[:count]
+            new_rows.flush()
+            del new_rows
+        if layout is not None:
+            np.savez(self._path(generation, "ivf.npz"), centroids=layout["centroids"], offsets=layout["offsets"])
+
+        # The new generation is durable before the manifest points at it
+        for suffix in ("vectors", "rows", "text"):
+            descriptor = os.open(self._path(generation, suffix), os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+        self.close()
+        self.manifest["generation"] = generation
+        self.manifest["compacted_at"] = time.time()
+        self._write_manifest()
+        self._open_generation()
+
+        for suffix in ("vectors", "rows", "text", "ivf.npz"):
+            try:
+                os.remove(self._path(old_generation, suffix))
+            except FileNotFoundError:
+                pass
+        logger.info(f"Compacted embedding store for {self.model_version} to generation {generation}: {count} rows")
+
+    def discard_compaction(self, plan: Dict[str, Any]):
+        """Remove the files of a compaction that will not be finished"""
+        for suffix in ("vectors", "rows", "text", "ivf.npz"):
+            try:
+                os.remove(self._path(plan["generation"], suffix))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        alive = int(np.count_nonzero(self.rows["alive"])) if self.count else 0
+        return {
+            "generation": self.generation,
+            "dtype": self.manifest["dtype"],
+            "rows": alive,
+            "removed_rows": self.count - alive,
+            "file_mb": round((HEADER_BYTES + self.count * (self.row_bytes + ROW_DTYPE.itemsize)) / 1e6, 1),
+            "synced_at": self.synced_at,
+            "compacted_at": self.manifest.get("compacted_at")
+        }
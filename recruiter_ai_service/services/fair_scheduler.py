@@ -0,0 +1,185 @@
+"""
+Tenant-fair job scheduling for the queue worker
+Jobs popped from the shared queues go into a small lookahead buffer; the
+worker starts them in weighted-fair order across tenants (users) instead of
+FIFO, so one tenant submitting many large jobs can't block everyone else.
+
+Weighted fair queueing: each job gets a virtual finish tag
+    start  = max(virtual_time, tenant's previous finish)
+    finish = start + cost / weight
+where cost is the job's item count and weight comes from the plan (high
+priority jobs get an extra boost). The runnable job with the smallest finish
+tag goes next; tenants at their in-flight cap are skipped.
+
+Each tenant may only hold a few jobs in the buffer. add() refuses the rest so
+the caller can park them per tenant (see QueueWorker.park_job); otherwise a
+noisy tenant's capped jobs would fill the lookahead and block everyone else.
+"""
+
+import json
+import os
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Tuple
+
+# Share of worker capacity per plan relative to free
+PLAN_WEIGHTS = {
+    "free": 1.0,
+    "basic": 2.0,
+    "premium": 4.0,
+    "recruiter": 4.0
+}
+
+# Max jobs of one tenant running at once in this worker, by plan
+TENANT_CAPS = {
+    "free": 1,
+    "basic": 2,
+    "premium": 3,
+    "recruiter": 3
+}
+
+# Weight multiplier for jobs enqueued with priority > 0
+PRIORITY_BOOST = 4.0
+
+
+def describe_job(payload: Dict[str, Any]) -> Tuple[str, str, float]:
+    """(tenant, plan, cost) of a queue payload; cost is the number of items it will process"""
+    data = payload.get("data") or {}
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            data = {}
+
+    tenant = str(data.get("UserId") or payload.get("user_id") or "anonymous")
+    plan = str(data.get("PlanType") or "free").lower()
+    items = data.get("ResumeIds") or data.get("ResumeAnalysisIds") or []
+    return tenant, plan, float(max(1, len(items)))
+
+
+class FairScheduler:
+    """Lookahead buffer ordered by weighted fair queueing with per-tenant caps"""
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        caps: Optional[Dict[str, int]] = None,
+        max_tenant_in_flight: Optional[int] = None,
+        max_buffered_per_tenant: Optional[int] = None
+    ):
+        """
+        Args:
+            weights: Plan weights (defaults to PLAN_WEIGHTS)
+            caps: Per-tenant in-flight caps by plan (defaults to TENANT_CAPS)
+            max_tenant_in_flight: Hard cap for any tenant (TENANT_MAX_IN_FLIGHT)
+            max_buffered_per_tenant: Jobs of one tenant held in the buffer (TENANT_MAX_BUFFERED)
+        """
+        self.weights = weights or PLAN_WEIGHTS
+        self.caps = caps or TENANT_CAPS
+        self.max_tenant_in_flight = max_tenant_in_flight or int(os.getenv("TENANT_MAX_IN_FLIGHT", "0")) or None
+        self.max_buffered_per_tenant = max_buffered_per_tenant or int(os.getenv("TENANT_MAX_BUFFERED", "2"))
+
+        self.virtual_time = 0.0
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._running: Dict[int, Dict[str, Any]] = {}
+        self.in_flight_by_tenant: Dict[str, int] = {}
+        self.in_flight_by_plan: Dict[str, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def can_buffer(self, tenant: str) -> bool:
+        """Whether add() would accept another job of this tenant"""
+        return len(self._queues.get(tenant, ())) < self.max_buffered_per_tenant
+
+    def add(self, message) -> bool:
+        """Buffer a popped QueueMessage; False (not buffered) if its tenant's share of the buffer is full"""
+        tenant, plan, cost = describe_job(message.payload)
+        if not self.can_buffer(tenant):
+            return False
+
+        weight = self.weights.get(plan, 1.0)
+        if (message.payload.get("priority") or 0) > 0:
+            weight *= PRIORITY_BOOST
+
+        start = max(self.virtual_time, self._last_finish.get(tenant, 0.0))
+        finish = start + cost / weight
+        self._last_finish[tenant] = finish
+
+        self._queues.setdefault(tenant, deque()).append({
+            "message": message, "tenant": tenant, "plan": plan, "start": start, "finish": finish
+        })
+        self._size += 1
+        return True
+
+    def _cap(self, plan: str) -> int:
+        cap = self.caps.get(plan, 1)
+        if self.max_tenant_in_flight:
+            cap = min(cap, self.max_tenant_in_flight)
+        return cap
+
+    def has_runnable(self) -> bool:
+        """Whether next() would return a job"""
+        return any(
+            queue and self.in_flight_by_tenant.get(tenant, 0) < self._cap(queue[0]["plan"])
+            for tenant, queue in self._queues.items()
+        )
+
+    def next(self):
+        """Pop the runnable job with the smallest finish tag and mark it in flight (None if none)"""
+        best = None
+        for tenant, queue in self._queues.items():
+            if not queue:
+                continue
+            head = queue[0]
+            if self.in_flight_by_tenant.get(tenant, 0) >= self._cap(head["plan"]):
+                continue
+            if best is None or head["finish"] < best["finish"]:
+                best = head
+
+        if best is None:
+            return None
+
+        queue = self._queues[best["tenant"]]
+        queue.popleft()
+        if not queue:
+            del self._queues[best["tenant"]]
+        self._size -= 1
+
+        self.virtual_time = max(self.virtual_time, best["start"])
+        self.in_flight_by_tenant[best["tenant"]] = self.in_flight_by_tenant.get(best["tenant"], 0) + 1
+        self.in_flight_by_plan[best["plan"]] = self.in_flight_by_plan.get(best["plan"], 0) + 1
+        self._running[id(best["message"])] = best
+        return best["message"]
+
+    def release(self, message):
+        """A job started through next() has finished"""
+        entry = self._running.pop(id(message), None)
+        if entry is None:
+            return
+
+        for counts, key in ((self.in_flight_by_tenant, entry["tenant"]), (self.in_flight_by_plan, entry["plan"])):
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
+
+        # Forget finish tags of idle tenants so the map doesn't grow without bound
+        if entry["tenant"] not in self._queues and entry["tenant"] not in self.in_flight_by_tenant:
+            self._last_finish.pop(entry["tenant"], None)
+
+    def drain_buffered(self):
+        """Remove and return every buffered (not started) message"""
+        messages = [entry["message"] for queue in self._queues.values() for entry in queue]
+        self._queues.clear()
+        self._size = 0
+        return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": self._size,
+            "buffered_tenants": len(self._queues),
+            "in_flight_by_tenant": dict(self.in_flight_by_tenant),
+            "in_flight_by_plan": dict(self.in_flight_by_plan),
+            "virtual_time": round(self.virtual_time, 3)
+        }
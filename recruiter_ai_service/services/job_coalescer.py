@@ -0,0 +1,349 @@
+"""
+Duplicate job coalescing for the queue worker
+A bulk job is identified by a fingerprint of its payload (job type, user, job
+description, plan and the sorted resume ids). The API sets job:dedup:{fingerprint}
+to the job id with SET NX when it enqueues, and hands back the existing job id
+for a duplicate submission. Duplicates that still reach the worker (different
+job id, another producer) are attached to the running job as followers: they get
+its progress and completion on their own job_updates channel instead of running.
+The worker records a follower on its own job row (processing_jobs.coalesced_with),
+which is what completes, fails or requeues it; the Redis follower set only fans
+out progress. Followers of a leader whose claim lapsed (the leader died and was
+not redelivered in time) are requeued by the worker's monitor loop.
+
+Items shared by overlapping jobs (same resume and job description) are guarded
+by a short cross-worker lock so only one runs at a time; the other waits and
+then reuses the result the first run published.
+
+LocalJobCoalescer does the same within one process (in-memory queue backend).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job types whose duplicates are coalesced
+COALESCED_JOB_TYPES = ("bulk_analysis",)
+
+DEDUP_PREFIX = "job:dedup:"
+FOLLOWERS_PREFIX = "job:followers:"
+ITEM_LOCK_PREFIX = "job:item:"
+ITEM_RESULT_PREFIX = "job:item:result:"
+
+# Become the running job for a fingerprint, or attach to the job already holding it.
+# Returns the leader's job id ('' when this job is the leader).
+CLAIM_OR_FOLLOW = """
+local leader = redis.call('GET', KEYS[1])
+if (not leader) or leader == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+    return ''
+end
+redis.call('HSET', KEYS[2] .. leader, ARGV[1], ARGV[2])
+redis.call('PEXPIRE', KEYS[2] .. leader, ARGV[3])
+return leader
+"""
+
+# Give up the fingerprint (if still ours) and drop the progress fan-out set
+RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+redis.call('DEL', KEYS[2])
+"""
+
+RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    redis.call('PEXPIRE', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+UNLOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def job_fingerprint(queue_item: Dict[str, Any]) -> Optional[str]:
+    """Idempotency key of a queue payload (None for job types that aren't coalesced)"""
+    job_type = queue_item.get("job_type")
+    if job_type not in COALESCED_JOB_TYPES:
+        return None
+
+    data = queue_item.get("data") or {}
+    if isinstance(data, str):
+        data = json.loads(data)
+
+    # Must match RedisQueueService.GetJobFingerprint in the API
+    resume_ids = sorted(str(resume_id).lower() for resume_id in data.get("ResumeIds") or [])
+    canonical = "|".join([
+        job_type,
+        str(data.get("UserId", "")).lower(),
+        str(data.get("JobDescriptionId", "")).lower(),
+        str(data.get("PlanType") or "free").lower(),
+        ",".join(resume_ids)
+    ])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SharedItem:
+    """
+    Yielded by item(): `result` is what an overlapping job's run of the same item
+    published while we waited (None if we run it); publish() shares ours.
+    """
+
+    def __init__(self, result: Optional[Dict[str, Any]] = None):
+        self.result = result
+        self.published: Optional[Dict[str, Any]] = None
+
+    def publish(self, result: Dict[str, Any]):
+        self.published = result
+
+
+class JobCoalescer:
+    """Leader/follower bookkeeping for duplicate jobs and cross-job item locks"""
+
+    def __init__(self, redis_client, ttl_seconds: Optional[float] = None, item_wait_seconds: Optional[float] = None):
+        """
+        Args:
+            redis_client: Shared redis.asyncio client (decode_responses=True)
+            ttl_seconds: Lifetime of a running job's claim, renewed while it runs (JOB_COALESCE_TTL_SECONDS);
+                at least a minute past QUEUE_VISIBILITY_TIMEOUT_SECONDS, so a crashed leader's claim
+                outlives the stream's redelivery of it
+            item_wait_seconds: Max wait for another job's run of a shared item (JOB_ITEM_LOCK_WAIT_SECONDS)
+        """
+        self.redis = redis_client
+        ttl_seconds = ttl_seconds or float(os.getenv("JOB_COALESCE_TTL_SECONDS", "120"))
+        visibility_seconds = float(os.getenv("QUEUE_VISIBILITY_TIMEOUT_SECONDS", "300"))
+        self.ttl_ms = int(1000 * max(ttl_seconds, visibility_seconds + 60))
+        self.item_wait_seconds = item_wait_seconds or float(os.getenv("JOB_ITEM_LOCK_WAIT_SECONDS", "180"))
+
+        self._claim = redis_client.register_script(CLAIM_OR_FOLLOW)
+        self._release = redis_client.register_script(RELEASE)
+        self._renew = redis_client.register_script(RENEW)
+        self._unlock = redis_client.register_script(UNLOCK)
+
+        # Jobs this process is running as leader -> fingerprint
+        self._leading: Dict[str, str] = {}
+        self.stats = {"coalesced_jobs": 0, "coalesced_items": 0}
+
+    async def claim(self, queue_item: Dict[str, Any]) -> Optional[str]:
+        """Lead the job's fingerprint; returns the leader's job id if the job was attached as a follower instead"""
+        fingerprint = job_fingerprint(queue_item)
+        if fingerprint is None:
+            return None
+
+        job_id = queue_item["job_id"]
+        leader = await self._claim(
+            keys=[f"{DEDUP_PREFIX}{fingerprint}", FOLLOWERS_PREFIX],
+            args=[job_id, json.dumps(queue_item), self.ttl_ms]
+        )
+        if leader:
+            self.stats["coalesced_jobs"] += 1
+            return leader
+
+        self._leading[job_id] = fingerprint
+        return None
+
+    @asynccontextmanager
+    async def hold(self, job_id: str):
+        """Keep a led job's claim alive while the block runs"""
+        fingerprint = self._leading.get(job_id)
+        if fingerprint is None:
+            yield
+            return
+
+        async def renew():
+            while True:
+                await asyncio.sleep(self.ttl_ms / 3000)
+                try:
+                    await self._renew(
+                        keys=[f"{DEDUP_PREFIX}{fingerprint}", f"{FOLLOWERS_PREFIX}{job_id}"],
+                        args=[job_id, self.ttl_ms]
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to renew coalescing claim of job {job_id}: {e}")
+
+        task = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def forget(self, job_id: str):
+        """Drop a led job locally, keeping its claim and followers in Redis (redelivery or retry)"""
+        self._leading.pop(job_id, None)
+
+    async def defer(self, job_id: str, delay_seconds: float):
+        """Keep a led job's claim and followers until a retry due in delay_seconds has had time to start"""
+        fingerprint = self._leading.get(job_id)
+        if fingerprint is None:
+            return
+        await self._renew(
+            keys=[f"{DEDUP_PREFIX}{fingerprint}", f"{FOLLOWERS_PREFIX}{job_id}"],
+            args=[job_id, self.ttl_ms + int(delay_seconds * 1000)]
+        )
+
+    async def followers(self, job_id: str) -> List[str]:
+        """Job ids currently attached to a led job"""
+        if job_id not in self._leading:
+            return []
+        return await self.redis.hkeys(f"{FOLLOWERS_PREFIX}{job_id}")
+
+    async def release(self, job_id: str):
+        """Stop leading a job (finished, failed or cancelled); settle its followers' rows first"""
+        fingerprint = self._leading.pop(job_id, None)
+        if fingerprint is None:
+            return
+
+        await self._release(keys=[f"{DEDUP_PREFIX}{fingerprint}", f"{FOLLOWERS_PREFIX}{job_id}"], args=[job_id])
+
+    async def leads(self, queue_item: Dict[str, Any], leader_id: str) -> bool:
+        """Whether leader_id still holds the claim on the fingerprint of queue_item (a follower's payload)"""
+        fingerprint = job_fingerprint(queue_item)
+        if fingerprint is None:
+            return False
+        return await self.redis.get(f"{DEDUP_PREFIX}{fingerprint}") == str(leader_id)
+
+    @asynccontextmanager
+    async def item(self, *parts: str):
+        """
+        Run one item of several overlapping jobs at a time across workers. A
+        waiter proceeds once the holder is done (or after item_wait_seconds)
+        and gets the holder's published result, if any, as SharedItem.result.
+        """
+        digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+        key = ITEM_LOCK_PREFIX + digest
+        result_key = ITEM_RESULT_PREFIX + digest
+        token = uuid.uuid4().hex
+        deadline = asyncio.get_running_loop().time() + self.item_wait_seconds
+        waited = False
+
+        acquired = False
+        while True:
+            acquired = await self.redis.set(key, token, nx=True, px=int(self.item_wait_seconds * 1000))
+            if acquired or asyncio.get_running_loop().time() >= deadline:
+                break
+            waited = True
+            await asyncio.sleep(0.25)
+
+        shared = SharedItem()
+        if waited:
+            self.stats["coalesced_items"] += 1
+            cached = await self.redis.get(result_key)
+            if cached:
+                shared.result = json.loads(cached)
+
+        try:
+            yield shared
+        finally:
+            try:
+                if shared.published is not None:
+                    # Kept as long as anyone may still be waiting on the lock
+                    await self.redis.set(
+                        result_key, json.dumps(shared.published, default=str), px=int(self.item_wait_seconds * 1000)
+                    )
+                if acquired:
+                    await self._unlock(keys=[key], args=[token])
+            except Exception as e:
+                logger.error(f"Failed to release item lock {key}: {e}")
+
+
+class LocalJobCoalescer:
+    """JobCoalescer for a single process: claims, followers and item locks kept in memory"""
+
+    def __init__(self, item_wait_seconds: Optional[float] = None):
+        self.item_wait_seconds = item_wait_seconds or float(os.getenv("JOB_ITEM_LOCK_WAIT_SECONDS", "180"))
+        self._claims: Dict[str, str] = {}
+        self._followers: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._leading: Dict[str, str] = {}
+        # key -> [lock, tasks using it, published result]; dropped when the last user leaves
+        self._item_locks: Dict[str, List] = {}
+        self.stats = {"coalesced_jobs": 0, "coalesced_items": 0}
+
+    async def claim(self, queue_item: Dict[str, Any]) -> Optional[str]:
+        fingerprint = job_fingerprint(queue_item)
+        if fingerprint is None:
+            return None
+
+        job_id = queue_item["job_id"]
+        leader = self._claims.get(fingerprint)
+        if leader and leader != job_id:
+            self._followers.setdefault(leader, {})[job_id] = queue_item
+            self.stats["coalesced_jobs"] += 1
+            return leader
+
+        self._claims[fingerprint] = job_id
+        self._leading[job_id] = fingerprint
+        return None
+
+    @asynccontextmanager
+    async def hold(self, job_id: str):
+        yield
+
+    def forget(self, job_id: str):
+        self._leading.pop(job_id, None)
+
+    async def defer(self, job_id: str, delay_seconds: float):
+        """Claims don't expire in memory"""
+
+    async def followers(self, job_id: str) -> List[str]:
+        return list(self._followers.get(job_id, ()))
+
+    async def release(self, job_id: str):
+        fingerprint = self._leading.pop(job_id, None)
+        if fingerprint is None:
+            return
+        if self._claims.get(fingerprint) == job_id:
+            del self._claims[fingerprint]
+        self._followers.pop(job_id, None)
+
+    async def leads(self, queue_item: Dict[str, Any], leader_id: str) -> bool:
+        fingerprint = job_fingerprint(queue_item)
+        return fingerprint is not None and self._claims.get(fingerprint) == str(leader_id)
+
+    @asynccontextmanager
+    async def item(self, *parts: str):
+        key = "|".join(str(part) for part in parts)
+        entry = self._item_locks.setdefault(key, [asyncio.Lock(), 0, None])
+        entry[1] += 1
+        lock = entry[0]
+
+        acquired = False
+        shared = SharedItem()
+        if lock.locked():
+            self.stats["coalesced_items"] += 1
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout=self.item_wait_seconds)
+                acquired = True
+            except asyncio.TimeoutError:
+                pass
+            shared.result = entry[2]
+        else:
+            acquired = await lock.acquire()
+
+        try:
+            yield shared
+        finally:
+            if shared.published is not None:
+                entry[2] = shared.published
+            if acquired:
+                lock.release()
+            entry[1] -= 1
+            if not entry[1]:
+                del self._item_locks[key]
@@ -0,0 +1,188 @@
+"""
+Job progress aggregation for the queue worker
+Coalesces per-item status changes of a processing job into one multi-row
+UPDATE plus one pub/sub message per flush instead of several round-trips
+per item.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from utils.database import dumps_json
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgressAggregator:
+    """
+    Buffers item status changes for a single job and flushes them when
+    `flush_items` changes are pending or `flush_interval` seconds have passed,
+    whichever comes first. close() always flushes, so the final counters and
+    every item's terminal status are persisted exactly; if that flush keeps
+    failing, close() raises so the job fails instead of completing with
+    unsaved progress.
+    """
+
+    def __init__(
+        self,
+        db_service,
+        publish: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        job_id: str,
+        total_items: int,
+        flush_interval: Optional[float] = None,
+        flush_items: Optional[int] = None,
+        already_processed: int = 0,
+        close_retries: Optional[int] = None
+    ):
+        """
+        Args:
+            db_service: DatabaseService used for the batched UPDATE
+            publish: Coroutine sending a progress_update payload for the job
+            job_id: Processing job being tracked
+            total_items: Item count used for progress_percentage
+            flush_interval: Max seconds between flushes (JOB_PROGRESS_FLUSH_SECONDS)
+            flush_items: Pending changes that force a flush (JOB_PROGRESS_FLUSH_ITEMS)
+            already_processed: Items completed by an earlier run of a resumed job
+            close_retries: Retries of the final flush before close() raises (JOB_PROGRESS_CLOSE_RETRIES)
+        """
+        self.db = db_service
+        self.publish = publish
+        self.job_id = job_id
+        self.total_items = total_items
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("JOB_PROGRESS_FLUSH_SECONDS", "2"))
+        self.flush_items = flush_items or int(os.getenv("JOB_PROGRESS_FLUSH_ITEMS", "25"))
+        self.close_retries = close_retries if close_retries is not None else int(os.getenv("JOB_PROGRESS_CLOSE_RETRIES", "3"))
+
+        self.processed = already_processed
+        self.failed = 0
+        self.flushes = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._ticker: Optional[asyncio.Task] = None
+
+    @property
+    def progress(self) -> float:
+        """Completed share of the job in percent"""
+        if not self.total_items:
+            return 100.0
+        return round((self.processed + self.failed) / self.total_items * 100, 2)
+
+    async def __aenter__(self):
+        self._ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is None:
+            await self.close()
+            return
+
+        # The block already failed: save what we can, but let its exception propagate
+        try:
+            await self.close()
+        except Exception as e:
+            logger.error(f"Failed to save progress of failing job {self.job_id}: {e}")
+
+    async def record(
+        self,
+        item_id: str,
+        status: str,
+        result: Any = None,
+        error: Optional[str] = None
+    ):
+        """Record an item status change; terminal statuses update the counters"""
+        previous = self._pending.get(item_id)
+        if previous is None or previous["status"] not in ("completed", "failed"):
+            if status == "completed":
+                self.processed += 1
+            elif status == "failed":
+                self.failed += 1
+
+        # Latest change per item wins; earlier pending states are never persisted
+        self._pending[item_id] = {"status": status, "result": result, "error": error}
+
+        if len(self._pending) >= self.flush_items or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self, raise_errors: bool = False):
+        """
+        Persist pending item changes and counters in one statement and publish one update.
+        On a database error the changes are kept for the next flush; the error is logged,
+        or raised with raise_errors.
+        """
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+            item_ids = list(pending)
+            params = (
+                self.job_id,
+                item_ids,
+                [pending[item_id]["status"] for item_id in item_ids],
+                [dumps_json(pending[item_id]["result"]) if pending[item_id]["result"] is not None else None for item_id in item_ids],
+                [pending[item_id]["error"] for item_id in item_ids],
+                self.processed,
+                self.failed,
+                self.progress
+            )
+
+            try:
+                await self.db.execute("processing_jobs.flush_progress", params)
+            except Exception as e:
+                # Put the changes back (newer ones take precedence) so the next flush retries them
+                self._pending = {**pending, **self._pending}
+                if raise_errors:
+                    raise
+                logger.error(f"Failed to flush progress for job {self.job_id}: {e}")
+                return
+
+            self.flushes += 1
+            await self.publish(self.job_id, {
+                "processed_items": self.processed,
+                "failed_items": self.failed,
+                "progress_percentage": self.progress,
+                "items": [
+                    {
+                        "resume_id": item_id,
+                        "status": change["status"],
+                        **({"result": change["result"]} if change["result"] is not None else {}),
+                        **({"error": change["error"]} if change["error"] else {})
+                    }
+                    for item_id, change in pending.items()
+                ]
+            })
+
+    async def close(self):
+        """
+        Stop the interval ticker and flush whatever is left, retrying with backoff.
+        Raises the last error once close_retries retries have failed.
+        """
+        if self._ticker:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+
+        for attempt in range(self.close_retries + 1):
+            try:
+                await self.flush(raise_errors=True)
+                return
+            except Exception as e:
+                if attempt == self.close_retries:
+                    logger.error(f"Giving up on the final progress flush of job {self.job_id}: {e}")
+                    raise
+                delay = 0.5 * 2 ** attempt
+                logger.warning(f"Final progress flush of job {self.job_id} failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _tick(self):
+        """Flush on the interval even while a slow item is still running"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                await self.flush()
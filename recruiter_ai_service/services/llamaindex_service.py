@@ -6,7 +6,7 @@ Advanced AI-powered candidate analysis using LlamaIndex
 import os
 import logging
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from datetime import datetime
 
 # LlamaIndex imports
@@ -35,9 +35,11 @@ class LlamaIndexService:
     - Premium Plan: Full LlamaIndex capabilities
     """
     
-    def __init__(self, db_service, cache_service):
+    def __init__(self, db_service, cache_service, vector_service=None):
         self.db = db_service
         self.cache_service = cache_service
+        # Stored chunk embeddings and batched similarity scoring
+        self.vector_service = vector_service
         
         # Initialize LlamaIndex settings
         self._initialize_llamaindex()
@@ -286,11 +288,12 @@ class LlamaIndexService:
                 response, candidates_data, job_data
             )
             
-            # Add semantic similarity scores
+            # Add semantic similarity scores, all candidates in one batched pass
+            similarities = await self._calculate_semantic_similarities(
+                job_data["id"], [candidate["resume_id"] for candidate in structured_results["candidates"]], plan_type
+            )
             for candidate in structured_results["candidates"]:
-                candidate["semantic_similarity"] = await self._calculate_semantic_similarity(
-                    candidate["resume_id"], job_data["id"]
-                )
+                candidate["semantic_similarity"] = similarities.get(str(candidate["resume_id"]), 0.0)
             
             # Sort by combined score
             structured_results["candidates"].sort(
@@ -522,29 +525,25 @@ class LlamaIndexService:
         
         return base_prompt
     
-    async def _calculate_semantic_similarity(self, resume_id: str, job_id: str) -> float:
+    async def _calculate_semantic_similarities(
+        self,
+        job_id: str,
+        resume_ids: List[str],
+        plan_type: str
+    ) -> Dict[str, float]:
         """
-        Calculate semantic similarity using LlamaIndex embeddings
+        Semantic similarity (0-100) of each resume to the job from the stored
+        chunk embeddings, scored together in one query and one matrix product
         """
+        if not self.vector_service or not resume_ids:
+            return {}
         try:
-            # Get embeddings from both indexes
-            resume_embedding = await self._get_resume_embedding_llamaindex(resume_id)
-            job_embedding = await self._get_job_embedding_llamaindex(job_id)
-            
-            if resume_embedding is None or job_embedding is None:
-                return 0.0
-            
-            # Calculate cosine similarity
-            import numpy as np
-            similarity = np.dot(resume_embedding, job_embedding) / (
-                np.linalg.norm(resume_embedding) * np.linalg.norm(job_embedding)
-            )
-            
-            return float(similarity * 100)
+            scores = await self.vector_service.calculate_similarity_scores(job_id, resume_ids, plan_type)
+            return {resume_id: score * 100 for resume_id, score in scores.items()}
             
         except Exception as e:
             logger.error(f"Error calculating semantic similarity: {str(e)}")
-            return 0.0
+            return {}
     
     async def _apply_plan_enhancements(
         self,
@@ -734,44 +733,16 @@ class LlamaIndexService:
                 "analysis_summary": "Analysis failed"
             }
     
-    async def _get_candidate_pool(self, user_id: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _get_candidate_pool(self, user_id: str, filters: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
         """
         Get candidate pool from database with filters
         """
         try:
-            # Build query based on filters
-            base_query = """
-                SELECT r.id, r.file_name, r.extracted_data, r.parsed_text, r.created_at
-                FROM resumes r
-                WHERE r.user_id = %s
-            """
-            
-            params = [user_id]
-            
-            # Add filters
-            if filters.get("skills"):
-                base_query += " AND r.extracted_data::jsonb ? %s"
-                params.append(filters["skills"])
-            
-            if filters.get("experience_years"):
-                base_query += " AND jsonb_array_length(r.extracted_data->'experience') >= %s"
-                params.append(filters["experience_years"])
-            
-            base_query += " ORDER BY r.created_at DESC LIMIT 100"
-            
-            results = await self.db.fetch_all(base_query, tuple(params))
-            
-            # Parse extracted data
             candidates = []
-            for result in results:
-                candidate = dict(result)
-                if candidate["extracted_data"]:
-                    try:
-                        extracted_data = json.loads(candidate["extracted_data"])
-                        candidate.update(extracted_data)
-                    except json.JSONDecodeError:
-                        pass
+            async for candidate in self.iter_candidate_pool(user_id, filters, include_text=True, page_size=limit):
                 candidates.append(candidate)
+                if len(candidates) >= limit:
+                    break
             
             return candidates
             
@@ -779,12 +750,30 @@ class LlamaIndexService:
             logger.error(f"Error getting candidate pool: {str(e)}")
             return []
     
-    async def _get_resume_embedding_llamaindex(self, resume_id: str):
-        """Get resume embedding from LlamaIndex"""
-        # Implementation would retrieve embedding from the vector store
-        pass
-    
-    async def _get_job_embedding_llamaindex(self, job_id: str):
-        """Get job embedding from LlamaIndex"""
-        # Implementation would retrieve embedding from the vector store
-        pass
\ No newline at end of file
+    async def iter_candidate_pool(
+        self,
+        user_id: str,
+        filters: Dict[str, Any],
+        include_text: bool = False,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the whole filtered candidate pool (newest first) page by page,
+        without the 100-row cap. parsed_text is only fetched when include_text.
+        """
+        # Optional filters are bound as NULL so one prepared statement covers every combination
+        skills = filters.get("skills")
+        if isinstance(skills, str):
+            skills = [skills]
+        
+        params = (
+            user_id,
+            list(skills) if skills else None,
+            int(filters["experience_years"]) if filters.get("experience_years") else None,
+            include_text
+        )
+        
+        async for candidate in self.db.stream("resumes.candidate_pool_page", params, page_size):
+            if candidate["extracted_data"]:
+                candidate.update(candidate["extracted_data"])
+            yield candidate
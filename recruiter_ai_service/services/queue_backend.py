@@ -0,0 +1,1023 @@
+"""
+Queue backends for the queue worker
+- RedisListQueueBackend: the original BRPOP on queue:{type}:{high|normal} lists
+  (at-most-once: a crashed worker loses what it popped)
+- RedisStreamQueueBackend: Redis Streams consumer groups with explicit acks,
+  heartbeated leases on every entry a worker holds (running, buffered or
+  parked) and reclaim of entries idle past a visibility timeout
+  (at-least-once, load shared by every worker in the group)
+- InMemoryQueueBackend: asyncio structures in the current process, for
+  single-node deployments (the API hosts the worker) and tests; no Redis
+
+Besides jobs, a backend owns the retry schedule, per-tenant parking, the
+dead-letter stream, the job_updates pub/sub channels and the hash of worker
+metrics snapshots, so the worker never talks to Redis directly.
+
+The .NET producer keeps LPUSHing to the lists; the stream backend moves them
+into streams atomically, so producers don't need to change.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import socket
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Deque, AsyncIterator
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LANES = ("high", "normal")
+
+# Move up to ARGV[1] entries from the producer list (KEYS[1]) into the stream (KEYS[2])
+BRIDGE_LIST_TO_STREAM = """
+local moved = 0
+for i = 1, tonumber(ARGV[1]) do
+    local payload = redis.call('RPOP', KEYS[1])
+    if not payload then
+        break
+    end
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'payload', payload)
+    moved = moved + 1
+end
+return moved
+"""
+
+# Renew (reset the idle time of) the entries ARGV[3..] of stream KEYS[1] that
+# consumer ARGV[2] of group ARGV[1] still owns; returns the ids renewed.
+# An entry reclaimed by another worker in the meantime is left alone.
+RENEW_OWNED_ENTRIES = """
+local renewed = {}
+for i = 3, #ARGV do
+    local owned = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[i], ARGV[i], 1, ARGV[2])
+    if #owned > 0 then
+        redis.call('XCLAIM', KEYS[1], ARGV[1], ARGV[2], 0, ARGV[i], 'JUSTID')
+        table.insert(renewed, ARGV[i])
+    end
+end
+return renewed
+"""
+
+# Claim for consumer ARGV[2] the first entry of stream KEYS[1] idle for at least
+# ARGV[3] ms, scanning ARGV[6] pending entries from cursor ARGV[4] and skipping
+# those held by the parked consumer ARGV[5]. Returns {next cursor, id, payload}
+# or {next cursor}; the cursor is '-' once the scan has reached the end.
+RECLAIM_IDLE_ENTRY = """
+local pending = redis.call('XPENDING', KEYS[1], ARGV[1], 'IDLE', ARGV[3], ARGV[4], '+', ARGV[6])
+for _, entry in ipairs(pending) do
+    if entry[2] ~= ARGV[5] then
+        local claimed = redis.call('XCLAIM', KEYS[1], ARGV[1], ARGV[2], ARGV[3], entry[1])
+        local item = claimed[1]
+        if item and item[2] then
+            for i = 1, #item[2], 2 do
+                if item[2][i] == 'payload' then
+                    return {'(' .. entry[1], entry[1], item[2][i + 1]}
+                end
+            end
+        end
+        -- Deleted while pending: nothing to redeliver
+        redis.call('XACK', KEYS[1], ARGV[1], entry[1])
+    end
+end
+if #pending < tonumber(ARGV[6]) then
+    return {'-'}
+end
+return {'(' .. pending[#pending][1]}
+"""
+
+# Park entry ARGV[3] of stream KEYS[1]: hand it from consumer ARGV[2] to the
+# parked consumer ARGV[4] of group ARGV[1] and push a reference (ARGV[6]) to the
+# tenant's parked list KEYS[2] (to the consuming end when ARGV[7] is '1'). The
+# entry stays in the stream until a worker unparks and finishes it. Returns 0 if
+# the entry is no longer ours (reclaimed by another worker).
+PARK_STREAM_ENTRY = """
+local owned = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[3], ARGV[3], 1, ARGV[2])
+if #owned == 0 then
+    return 0
+end
+redis.call('XCLAIM', KEYS[1], ARGV[1], ARGV[4], 0, ARGV[3], 'JUSTID')
+if ARGV[7] == '1' then
+    redis.call('RPUSH', KEYS[2], ARGV[6])
+else
+    redis.call('LPUSH', KEYS[2], ARGV[6])
+end
+redis.call('SADD', KEYS[3], ARGV[5])
+return 1
+"""
+
+# Take the oldest parked reference of tenant ARGV[1] (list KEYS[1]) and claim its
+# stream entry from the parked consumer ARGV[3] for consumer ARGV[4] of group
+# ARGV[2]; references to entries already gone are skipped. Returns
+# {stream, id, payload} or nil.
+UNPARK_STREAM_ENTRY = """
+local result = nil
+while not result do
+    local reference = redis.call('RPOP', KEYS[1])
+    if not reference then
+        break
+    end
+    local entry = cjson.decode(reference)
+    local parked = redis.call('XPENDING', entry['stream'], ARGV[2], entry['id'], entry['id'], 1, ARGV[3])
+    if #parked > 0 then
+        local claimed = redis.call('XCLAIM', entry['stream'], ARGV[2], ARGV[4], 0, entry['id'])
+        local item = claimed[1]
+        if item and item[2] then
+            for i = 1, #item[2], 2 do
+                if item[2][i] == 'payload' then
+                    result = {entry['stream'], entry['id'], item[2][i + 1]}
+                end
+            end
+        end
+    end
+end
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return result
+"""
+
+
+# Failed jobs waiting for their retry, scored by due time (unix seconds)
+RETRY_SET = "queue:retry"
+
+# Atomically move due retries back to the tail of their priority queue
+PROMOTE_DUE_RETRIES = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, member in ipairs(due) do
+    local item = cjson.decode(member)
+    local lane = 'normal'
+    if (tonumber(item['priority']) or 0) > 0 then
+        lane = 'high'
+    end
+    redis.call('LPUSH', 'queue:' .. item['job_type'] .. ':' .. lane, member)
+    redis.call('ZREM', KEYS[1], member)
+end
+return #due
+"""
+
+# Jobs of tenants whose share of the worker's lookahead buffer is full wait in
+# queue:parked:{tenant}; tenants with parked jobs are tracked in this set
+PARKED_TENANTS = "queue:parked:tenants"
+PARKED_PREFIX = "queue:parked:"
+
+# Take the oldest parked job of a tenant, dropping the tenant from the set once its list is empty
+UNPARK_JOB = """
+local payload = redis.call('RPOP', KEYS[1])
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return payload
+"""
+
+
+# Jobs that exhausted their retries, with the failure reason (see services/dead_letter.py)
+DEAD_LETTER_STREAM = "queue:dead"
+
+# Latest metrics snapshot of every worker process: field = worker id, value = JSON
+# (see QueueWorker.publish_metrics and services/queue_telemetry.py)
+WORKER_METRICS_HASH = "queue:metrics:workers"
+
+
+def list_key(job_type: str, lane: str) -> str:
+    """Producer-facing list for a job type and priority lane"""
+    return f"queue:{job_type}:{lane}"
+
+
+def lane_for(payload: Dict[str, Any]) -> str:
+    """Priority lane a payload is enqueued on"""
+    return "high" if (payload.get("priority") or 0) > 0 else "normal"
+
+
+def parked_key(tenant: str) -> str:
+    return f"{PARKED_PREFIX}{tenant}"
+
+
+def lane_order(normal_first: bool = False):
+    """Priority lanes in the order they should be served"""
+    return tuple(reversed(PRIORITY_LANES)) if normal_first else PRIORITY_LANES
+
+
+def parse_enqueued_at(queue_item: Dict[str, Any]) -> Optional[float]:
+    """Unix time a job was (re)queued: retry due time, else the producer's CreatedAt"""
+    if queue_item.get("enqueued_at"):
+        return float(queue_item["enqueued_at"])
+
+    created_at = queue_item.get("created_at") or queue_item.get("CreatedAt")
+    if not created_at:
+        return None
+    try:
+        # .NET writes 7 fractional digits; fromisoformat accepts at most 6
+        created_at = re.sub(r"(\.\d{6})\d+", r"\1", str(created_at)).replace("Z", "+00:00")
+        parsed = datetime.fromisoformat(created_at)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    except ValueError:
+        return None
+
+
+def payload_age(payload: Optional[str], now: float) -> Optional[float]:
+    """Seconds a raw (JSON) queued payload has been waiting, if it says when it was enqueued"""
+    if not payload:
+        return None
+    try:
+        enqueued_at = parse_enqueued_at(json.loads(payload))
+    except ValueError:
+        return None
+    return round(max(0.0, now - enqueued_at), 3) if enqueued_at is not None else None
+
+
+def live_worker_metrics(raw: Dict[str, str], max_age: float, now: float):
+    """(snapshots reported within max_age seconds, ids of stale ones) from stored JSON snapshots"""
+    live, stale = {}, []
+    for worker_id, value in raw.items():
+        try:
+            snapshot = json.loads(value)
+        except ValueError:
+            stale.append(worker_id)
+            continue
+        if now - snapshot.get("reported_at", 0) > max_age:
+            stale.append(worker_id)
+        else:
+            live[worker_id] = snapshot
+    return live, stale
+
+
+class QueueMessage:
+    """A job popped from a backend; pass it back to ack() once handled"""
+
+    def __init__(
+        self,
+        payload: Dict[str, Any],
+        queue: str,
+        message_id: Optional[str] = None,
+        redelivered: bool = False,
+        parked_tenant: Optional[str] = None
+    ):
+        self.payload = payload
+        self.queue = queue
+        self.message_id = message_id
+        self.redelivered = redelivered
+        # Set on jobs taken back from a tenant's parked list (see unpark)
+        self.parked_tenant = parked_tenant
+
+
+class QueueBackend:
+    """Interface used by QueueWorker"""
+
+    name = "base"
+
+    async def start(self):
+        """Prepare server-side structures (groups, scripts)"""
+
+    async def pop(
+        self,
+        job_types: List[str],
+        count: int = 1,
+        timeout: float = 1,
+        normal_first: bool = False
+    ) -> List[QueueMessage]:
+        """
+        Up to `count` jobs across all job types in one blocking call, served
+        lane by lane (high first unless normal_first) and in job_types order
+        within a lane. Empty list after `timeout` seconds.
+        """
+        raise NotImplementedError
+
+    async def ack(self, message: QueueMessage):
+        """Mark a job as handled (completed, failed or rescheduled)"""
+
+    async def requeue(self, message: QueueMessage):
+        """Give back a popped job that was never started (e.g. buffered at shutdown)"""
+
+    @asynccontextmanager
+    async def lease(self, message: QueueMessage):
+        """Keep the message claimed while the block runs"""
+        yield
+
+    async def stop(self):
+        """Stop background tasks"""
+
+    async def enqueue(self, payload: Dict[str, Any]):
+        """Add a job at the back of its priority lane (what the producer does)"""
+        raise NotImplementedError
+
+    async def schedule_retry(self, payload: Dict[str, Any], due_at: float):
+        """Re-enqueue a job at unix time due_at (see promote_due_retries)"""
+        raise NotImplementedError
+
+    async def promote_due_retries(self, limit: int = 100) -> int:
+        """Move retries that are due onto their priority lane; returns how many"""
+        raise NotImplementedError
+
+    async def park(self, tenant: str, message: QueueMessage, front: bool = False):
+        """Hold a popped job for a tenant until unpark(); front puts it back first in line"""
+        raise NotImplementedError
+
+    async def unpark(self, tenant: str) -> Optional[QueueMessage]:
+        """Oldest parked job of a tenant (None if none)"""
+        raise NotImplementedError
+
+    async def parked_tenants(self) -> List[str]:
+        """Tenants that have parked jobs"""
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        """Send a job update to the channel's subscribers"""
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async iterator over messages published to a channel from now on"""
+        raise NotImplementedError
+
+    async def dead_letter(self, entry: Dict[str, str]):
+        """Append a dead-letter entry (string fields, including the JSON payload)"""
+        raise NotImplementedError
+
+    async def dead_letters(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after_id: Optional[str] = None,
+        count: int = 100
+    ) -> List[Dict[str, str]]:
+        """
+        Up to `count` dead-letter entries, oldest first, failed between the unix
+        times since/until and after entry id `after_id` (for paging). Each
+        entry carries its `id`.
+        """
+        raise NotImplementedError
+
+    async def remove_dead_letter(self, entry_id: str):
+        raise NotImplementedError
+
+    async def dead_letter_count(self) -> int:
+        raise NotImplementedError
+
+    async def queue_depths(self, job_types: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Waiting jobs per job type and lane:
+        {job_type: {lane: {"depth": n, "oldest_age_seconds": age of the next job to run or None}}}
+        """
+        raise NotImplementedError
+
+    async def backlog_counts(self) -> Dict[str, int]:
+        """Jobs held outside the priority queues: retry_scheduled, parked, dead_lettered"""
+        raise NotImplementedError
+
+    async def write_worker_metrics(self, worker_id: str, snapshot: Dict[str, Any]):
+        """Store a worker's latest metrics snapshot (it should carry `reported_at`)"""
+        raise NotImplementedError
+
+    async def worker_metrics(self, max_age: float = 60) -> Dict[str, Dict[str, Any]]:
+        """Snapshots of workers that reported within max_age seconds, by worker id; older ones are dropped"""
+        raise NotImplementedError
+
+    async def remove_worker_metrics(self, worker_id: str):
+        raise NotImplementedError
+
+
+class RedisQueueBackend(QueueBackend):
+    """Retry schedule, parking and pub/sub shared by the Redis backends"""
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self._promote = redis_client.register_script(PROMOTE_DUE_RETRIES)
+        self._unpark = redis_client.register_script(UNPARK_JOB)
+
+    async def enqueue(self, payload: Dict[str, Any]):
+        await self.redis.lpush(list_key(payload["job_type"], lane_for(payload)), json.dumps(payload))
+
+    async def schedule_retry(self, payload: Dict[str, Any], due_at: float):
+        await self.redis.zadd(RETRY_SET, {json.dumps(payload): due_at})
+
+    async def promote_due_retries(self, limit: int = 100) -> int:
+        return await self._promote(keys=[RETRY_SET], args=[time.time(), limit])
+
+    async def park(self, tenant: str, message: QueueMessage, front: bool = False):
+        pipe = self.redis.pipeline(transaction=True)
+        if front:
+            pipe.rpush(parked_key(tenant), json.dumps(message.payload))
+        else:
+            pipe.lpush(parked_key(tenant), json.dumps(message.payload))
+        pipe.sadd(PARKED_TENANTS, tenant)
+        await pipe.execute()
+        await self.ack(message)
+
+    async def unpark(self, tenant: str) -> Optional[QueueMessage]:
+        payload = await self._unpark(keys=[parked_key(tenant), PARKED_TENANTS], args=[tenant])
+        return QueueMessage(json.loads(payload), parked_key(tenant), parked_tenant=tenant) if payload else None
+
+    async def parked_tenants(self) -> List[str]:
+        return list(await self.redis.smembers(PARKED_TENANTS))
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        await self.redis.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Dict[str, Any]]:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def dead_letter(self, entry: Dict[str, str]):
+        await self.redis.xadd(
+            DEAD_LETTER_STREAM, entry,
+            maxlen=int(os.getenv("QUEUE_DEAD_LETTER_MAXLEN", "100000")), approximate=True
+        )
+
+    async def dead_letters(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after_id: Optional[str] = None,
+        count: int = 100
+    ) -> List[Dict[str, str]]:
+        # Stream ids start with the entry's millisecond timestamp, so the time range is an id range
+        # A page continues after the last id of the previous one (exclusive)
+        start = f"({after_id}" if after_id else (f"{int(since * 1000)}-0" if since else "-")
+        end = f"{int(until * 1000)}-18446744073709551615" if until else "+"
+        entries = await self.redis.xrange(DEAD_LETTER_STREAM, min=start, max=end, count=count)
+        return [{"id": entry_id, **fields} for entry_id, fields in entries]
+
+    async def remove_dead_letter(self, entry_id: str):
+        await self.redis.xdel(DEAD_LETTER_STREAM, entry_id)
+
+    async def dead_letter_count(self) -> int:
+        return await self.redis.xlen(DEAD_LETTER_STREAM)
+
+    async def queue_depths(self, job_types: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        # Producers LPUSH and workers pop from the right, so index -1 is the next job to run
+        keys = [(job_type, lane) for job_type in job_types for lane in PRIORITY_LANES]
+        pipe = self.redis.pipeline(transaction=False)
+        for job_type, lane in keys:
+            pipe.llen(list_key(job_type, lane))
+            pipe.lindex(list_key(job_type, lane), -1)
+        replies = await pipe.execute()
+
+        now = time.time()
+        depths: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for index, (job_type, lane) in enumerate(keys):
+            depths.setdefault(job_type, {})[lane] = {
+                "depth": replies[2 * index],
+                "oldest_age_seconds": payload_age(replies[2 * index + 1], now)
+            }
+        return depths
+
+    async def backlog_counts(self) -> Dict[str, int]:
+        tenants = await self.parked_tenants()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard(RETRY_SET)
+        pipe.xlen(DEAD_LETTER_STREAM)
+        for tenant in tenants:
+            pipe.llen(parked_key(tenant))
+        retry_scheduled, dead_lettered, *parked = await pipe.execute()
+        return {"retry_scheduled": retry_scheduled, "parked": sum(parked), "dead_lettered": dead_lettered}
+
+    async def write_worker_metrics(self, worker_id: str, snapshot: Dict[str, Any]):
+        await self.redis.hset(WORKER_METRICS_HASH, worker_id, json.dumps(snapshot))
+
+    async def worker_metrics(self, max_age: float = 60) -> Dict[str, Dict[str, Any]]:
+        live, stale = live_worker_metrics(await self.redis.hgetall(WORKER_METRICS_HASH), max_age, time.time())
+        if stale:
+            # Workers that died without removing their entry
+            await self.redis.hdel(WORKER_METRICS_HASH, *stale)
+        return live
+
+    async def remove_worker_metrics(self, worker_id: str):
+        await self.redis.hdel(WORKER_METRICS_HASH, worker_id)
+
+
+class RedisListQueueBackend(RedisQueueBackend):
+    """Blocking multi-key pop over the priority lists; acks are no-ops"""
+
+    name = "list"
+
+    def __init__(self, redis_client: redis.Redis):
+        super().__init__(redis_client)
+        # BLMPOP (Redis >= 7) pops a whole batch; older servers fall back to BRPOP
+        self._use_blmpop = True
+
+    async def pop(
+        self,
+        job_types: List[str],
+        count: int = 1,
+        timeout: float = 1,
+        normal_first: bool = False
+    ) -> List[QueueMessage]:
+        # Both commands serve the first non-empty key in the given order
+        keys = [list_key(job_type, lane) for lane in lane_order(normal_first) for job_type in job_types]
+
+        if self._use_blmpop:
+            try:
+                item = await self.redis.blmpop(timeout, len(keys), *keys, direction="RIGHT", count=count)
+            except redis.ResponseError as e:
+                if "unknown command" not in str(e).lower():
+                    raise
+                logger.info("BLMPOP not supported by this Redis, falling back to BRPOP")
+                self._use_blmpop = False
+            else:
+                if not item:
+                    return []
+                queue, payloads = item
+                return [QueueMessage(json.loads(payload), queue) for payload in payloads]
+
+        item = await self.redis.brpop(keys, timeout=timeout)
+        if not item:
+            return []
+
+        queue, payload = item
+        return [QueueMessage(json.loads(payload), queue)]
+
+    async def requeue(self, message: QueueMessage):
+        # Back onto the consuming end so it keeps its place in line
+        await self.redis.rpush(message.queue, json.dumps(message.payload))
+
+
+class RedisStreamQueueBackend(RedisQueueBackend):
+    """
+    Consumer-group streams stream:{type}:{lane} fed from the producer lists.
+    Every entry this worker holds - running, waiting in the lookahead buffer or
+    in pop()'s own buffer - has its lease renewed by one heartbeat loop until it
+    is acked, requeued or parked, so only a dead worker's entries are reclaimed.
+    Parked entries stay pending in the stream under a shared parked consumer,
+    which reclaim skips, and the tenant's parked list holds references to them.
+    """
+
+    name = "stream"
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        job_types: List[str],
+        group: Optional[str] = None,
+        consumer: Optional[str] = None
+    ):
+        """
+        Args:
+            redis_client: Client created with decode_responses=True
+            job_types: Job types this worker consumes
+            group: Consumer group shared by all workers (QUEUE_STREAM_GROUP)
+            consumer: Unique name of this worker within the group
+        """
+        super().__init__(redis_client)
+        self.job_types = list(job_types)
+        self.group = group or os.getenv("QUEUE_STREAM_GROUP", "recruiter-ai-workers")
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.visibility_timeout_ms = int(float(os.getenv("QUEUE_VISIBILITY_TIMEOUT_SECONDS", "300")) * 1000)
+        self.max_stream_length = int(os.getenv("QUEUE_STREAM_MAXLEN", "100000"))
+        self.bridge_batch = int(os.getenv("QUEUE_BRIDGE_BATCH", "100"))
+        self.bridge_interval = float(os.getenv("QUEUE_BRIDGE_INTERVAL_SECONDS", "0.05"))
+        self.reclaim_interval = float(os.getenv("QUEUE_RECLAIM_INTERVAL_SECONDS", "5"))
+        self.reclaim_scan = int(os.getenv("QUEUE_RECLAIM_SCAN", "100"))
+        self.parked_consumer = f"{self.group}:parked"
+        self._bridge = None
+        self._bridge_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._renew = redis_client.register_script(RENEW_OWNED_ENTRIES)
+        self._reclaim_idle = redis_client.register_script(RECLAIM_IDLE_ENTRY)
+        self._park_entry = redis_client.register_script(PARK_STREAM_ENTRY)
+        self._unpark_entry = redis_client.register_script(UNPARK_STREAM_ENTRY)
+        self._reclaim_cursors: Dict[str, str] = {}
+        self._last_reclaim: Dict[str, float] = {}
+        self._buffered: List[QueueMessage] = []
+        # Entry ids delivered to this worker and not yet acked, requeued or parked, by stream
+        self._held: Dict[str, set] = {}
+        self.stats = {"bridged": 0, "delivered": 0, "reclaimed": 0, "acked": 0, "parked": 0, "unparked": 0, "leases_lost": 0}
+
+    @staticmethod
+    def stream_key(job_type: str, lane: str) -> str:
+        return f"stream:{job_type}:{lane}"
+
+    async def start(self):
+        for job_type in self.job_types:
+            for lane in PRIORITY_LANES:
+                try:
+                    await self.redis.xgroup_create(self.stream_key(job_type, lane), self.group, id="0", mkstream=True)
+                except redis.ResponseError as e:
+                    if "BUSYGROUP" not in str(e):
+                        raise
+
+        self._bridge = self.redis.register_script(BRIDGE_LIST_TO_STREAM)
+        self._bridge_task = asyncio.create_task(self._run_bridge())
+        self._heartbeat_task = asyncio.create_task(self._run_heartbeat())
+
+    async def stop(self):
+        # Read but not handed to the worker yet: give them back instead of waiting for a reclaim
+        for message in self._buffered:
+            try:
+                await self.requeue(message)
+            except Exception as e:
+                logger.error(f"Failed to requeue buffered entry {message.message_id}: {e}")
+        self._buffered = []
+
+        # Without the heartbeat, entries still held (jobs cancelled by drain) are reclaimed by other workers
+        for task in (self._bridge_task, self._heartbeat_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._bridge_task = None
+        self._heartbeat_task = None
+
+    async def _run_bridge(self):
+        """Continuously drain producer lists into the streams"""
+        while True:
+            try:
+                moved = 0
+                for job_type in self.job_types:
+                    for lane in PRIORITY_LANES:
+                        moved += await self._bridge(
+                            keys=[list_key(job_type, lane), self.stream_key(job_type, lane)],
+                            args=[self.bridge_batch, self.max_stream_length]
+                        )
+                self.stats["bridged"] += moved
+                if not moved:
+                    await asyncio.sleep(self.bridge_interval)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error bridging queue lists to streams: {e}")
+                await asyncio.sleep(1)
+
+    async def _run_heartbeat(self):
+        """Renew the lease on every held entry three times per visibility timeout"""
+        while True:
+            try:
+                await asyncio.sleep(self.visibility_timeout_ms / 3000)
+                for stream, ids in list(self._held.items()):
+                    if not ids:
+                        continue
+                    held = list(ids)
+                    renewed = set(await self._renew(keys=[stream], args=[self.group, self.consumer, *held]))
+                    lost = [message_id for message_id in held if message_id not in renewed]
+                    if lost:
+                        # Reclaimed by another worker after a stall; that worker runs them now
+                        self.stats["leases_lost"] += len(lost)
+                        logger.error(f"Lost the lease on {len(lost)} {stream} entries: {', '.join(lost)}")
+                        ids.difference_update(lost)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Failed to extend leases: {e}")
+
+    def _hold(self, message: QueueMessage) -> QueueMessage:
+        self._held.setdefault(message.queue, set()).add(message.message_id)
+        return message
+
+    def _release(self, message: QueueMessage):
+        self._held.get(message.queue, set()).discard(message.message_id)
+
+    async def pop(
+        self,
+        job_types: List[str],
+        count: int = 1,
+        timeout: float = 1,
+        normal_first: bool = False
+    ) -> List[QueueMessage]:
+        streams = [self.stream_key(job_type, lane) for lane in lane_order(normal_first) for job_type in job_types]
+
+        # Entries left pending by a dead (or stalled) consumer come first; stop once
+        # `count` are held so no reclaimed entry sits leased without a taker
+        messages = []
+        for stream in streams:
+            if len(messages) >= count:
+                break
+            message = await self._reclaim(stream)
+            if message:
+                messages.append(message)
+        if messages:
+            return messages
+
+        if not self._buffered:
+            # One blocking read across every stream; count applies per stream, so
+            # entries beyond `count` stay claimed by us in the buffer until their turn
+            response = await self.redis.xreadgroup(
+                self.group, self.consumer, {stream: ">" for stream in streams},
+                count=count, block=int(timeout * 1000)
+            )
+            for stream, entries in response or []:
+                for message_id, fields in entries:
+                    self.stats["delivered"] += 1
+                    self._buffered.append(self._hold(QueueMessage(json.loads(fields["payload"]), stream, message_id)))
+
+        rank = {stream: index for index, stream in enumerate(streams)}
+        self._buffered.sort(key=lambda message: rank.get(message.queue, len(rank)))
+        messages, self._buffered = self._buffered[:count], self._buffered[count:]
+        return messages
+
+    async def _reclaim(self, stream: str) -> Optional[QueueMessage]:
+        """Take over one entry idle longer than the visibility timeout (parked entries excepted)"""
+        if time.monotonic() - self._last_reclaim.get(stream, 0) < self.reclaim_interval:
+            return None
+
+        cursor = self._reclaim_cursors.get(stream, "-")
+        response = await self._reclaim_idle(
+            keys=[stream],
+            args=[self.group, self.consumer, self.visibility_timeout_ms, cursor, self.parked_consumer, self.reclaim_scan]
+        )
+        next_cursor = response[0]
+        self._reclaim_cursors[stream] = next_cursor
+        if len(response) == 1 or next_cursor == "-":
+            # Scan finished: wait an interval before scanning again
+            self._last_reclaim[stream] = time.monotonic()
+
+        if len(response) == 1:
+            return None
+        _, message_id, payload = response
+        self.stats["reclaimed"] += 1
+        logger.warning(f"Reclaimed {stream} entry {message_id} after visibility timeout")
+        return self._hold(QueueMessage(json.loads(payload), stream, message_id, redelivered=True))
+
+    async def ack(self, message: QueueMessage):
+        if message.message_id is None:
+            return
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xack(message.queue, self.group, message.message_id)
+        pipe.xdel(message.queue, message.message_id)
+        await pipe.execute()
+        self._release(message)
+        self.stats["acked"] += 1
+
+    async def requeue(self, message: QueueMessage):
+        # Unacked entries stay pending and are reclaimed after the visibility timeout;
+        # hand it back right away by re-adding it and acking the claimed copy
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(message.queue, {"payload": json.dumps(message.payload)}, maxlen=self.max_stream_length, approximate=True)
+        pipe.xack(message.queue, self.group, message.message_id)
+        pipe.xdel(message.queue, message.message_id)
+        await pipe.execute()
+        self._release(message)
+
+    async def park(self, tenant: str, message: QueueMessage, front: bool = False):
+        # The entry itself stays in the stream (pending under the parked consumer) until
+        # a worker unparks and finishes it, so a crash in between can't lose the job
+        reference = json.dumps({"stream": message.queue, "id": message.message_id})
+        parked = await self._park_entry(
+            keys=[message.queue, parked_key(tenant), PARKED_TENANTS],
+            args=[
+                self.group, self.consumer, message.message_id, self.parked_consumer,
+                tenant, reference, "1" if front else "0"
+            ]
+        )
+        self._release(message)
+        if parked:
+            self.stats["parked"] += 1
+        else:
+            self.stats["leases_lost"] += 1
+            logger.error(f"Could not park {message.queue} entry {message.message_id}: it was reclaimed by another worker")
+
+    async def unpark(self, tenant: str) -> Optional[QueueMessage]:
+        result = await self._unpark_entry(
+            keys=[parked_key(tenant), PARKED_TENANTS],
+            args=[tenant, self.group, self.parked_consumer, self.consumer]
+        )
+        if not result:
+            return None
+        stream, message_id, payload = result
+        self.stats["unparked"] += 1
+        return self._hold(QueueMessage(json.loads(payload), stream, message_id, parked_tenant=tenant))
+
+    async def queue_depths(self, job_types: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        # Producer lists hold what the bridge hasn't moved yet; streams hold the rest
+        depths = await super().queue_depths(job_types)
+        now = time.time()
+        for job_type in job_types:
+            for lane in PRIORITY_LANES:
+                stream = self.stream_key(job_type, lane)
+                try:
+                    groups = await self.redis.xinfo_groups(stream)
+                except redis.ResponseError:
+                    # Stream not created yet
+                    continue
+                group = next((group for group in groups if group["name"] == self.group), None)
+                pending = group["pending"] if group else 0
+                last_delivered = group["last-delivered-id"] if group else "0-0"
+                parked = 0
+                if group:
+                    consumers = await self.redis.xinfo_consumers(stream, self.group)
+                    parked = sum(consumer["pending"] for consumer in consumers if consumer["name"] == self.parked_consumer)
+
+                # Acked entries are deleted, so whatever isn't pending was never delivered;
+                # parked entries are pending too but counted by backlog_counts()
+                entry = depths[job_type][lane]
+                entry["depth"] += max(0, await self.redis.xlen(stream) - pending)
+                entry["in_flight"] = pending - parked
+
+                waiting = await self.redis.xrange(stream, min=f"({last_delivered}", count=1)
+                if waiting:
+                    entry_id, fields = waiting[0]
+                    age = payload_age(fields.get("payload"), now)
+                    if age is None:
+                        # Stream ids start with the unix ms the entry was bridged
+                        age = round(max(0.0, now - int(entry_id.split("-")[0]) / 1000), 3)
+                    entry["oldest_age_seconds"] = age
+        return depths
+
+
+class InMemoryQueueBackend(QueueBackend):
+    """
+    Everything in the current process: lists per type/lane, a retry heap,
+    parked jobs and pub/sub fan-out to asyncio queues. Payloads are stored as
+    JSON like in Redis, so producers and the worker never share dicts.
+    Jobs don't survive a restart.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._lists: Dict[str, Deque[str]] = {}
+        self._pushed = asyncio.Event()
+        self._retries: List = []
+        self._retry_sequence = itertools.count()
+        self._parked: Dict[str, Deque[str]] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._dead_letters: Dict[str, Dict[str, str]] = {}
+        self._dead_letter_sequence = itertools.count()
+        self._worker_metrics: Dict[str, str] = {}
+        self.stats = {"enqueued": 0, "delivered": 0, "published": 0}
+
+    def _push(self, key: str, payload: str, front: bool = False):
+        queue = self._lists.setdefault(key, deque())
+        if front:
+            queue.appendleft(payload)
+        else:
+            queue.append(payload)
+        self._pushed.set()
+
+    async def pop(
+        self,
+        job_types: List[str],
+        count: int = 1,
+        timeout: float = 1,
+        normal_first: bool = False
+    ) -> List[QueueMessage]:
+        keys = [list_key(job_type, lane) for lane in lane_order(normal_first) for job_type in job_types]
+        deadline = time.monotonic() + timeout
+
+        while True:
+            # Like BLMPOP: a batch comes from the first non-empty list
+            for key in keys:
+                queue = self._lists.get(key)
+                if queue:
+                    batch = [queue.popleft() for _ in range(min(count, len(queue)))]
+                    self.stats["delivered"] += len(batch)
+                    return [QueueMessage(json.loads(payload), key) for payload in batch]
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            self._pushed.clear()
+            try:
+                await asyncio.wait_for(self._pushed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return []
+
+    async def requeue(self, message: QueueMessage):
+        self._push(message.queue, json.dumps(message.payload), front=True)
+
+    async def enqueue(self, payload: Dict[str, Any]):
+        self.stats["enqueued"] += 1
+        self._push(list_key(payload["job_type"], lane_for(payload)), json.dumps(payload))
+
+    async def schedule_retry(self, payload: Dict[str, Any], due_at: float):
+        heapq.heappush(self._retries, (due_at, next(self._retry_sequence), json.dumps(payload)))
+
+    async def promote_due_retries(self, limit: int = 100) -> int:
+        promoted = 0
+        now = time.time()
+        while self._retries and self._retries[0][0] <= now and promoted < limit:
+            _, _, payload = heapq.heappop(self._retries)
+            await self.enqueue(json.loads(payload))
+            promoted += 1
+        return promoted
+
+    async def park(self, tenant: str, message: QueueMessage, front: bool = False):
+        queue = self._parked.setdefault(tenant, deque())
+        if front:
+            queue.appendleft(json.dumps(message.payload))
+        else:
+            queue.append(json.dumps(message.payload))
+
+    async def unpark(self, tenant: str) -> Optional[QueueMessage]:
+        queue = self._parked.get(tenant)
+        if not queue:
+            return None
+        payload = queue.popleft()
+        if not queue:
+            del self._parked[tenant]
+        return QueueMessage(json.loads(payload), parked_key(tenant), parked_tenant=tenant)
+
+    async def parked_tenants(self) -> List[str]:
+        return list(self._parked)
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        self.stats["published"] += 1
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(json.loads(json.dumps(message)))
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].remove(queue)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    async def dead_letter(self, entry: Dict[str, str]):
+        # Same id shape as a stream entry: <unix ms>-<sequence>
+        entry_id = f"{int(time.time() * 1000)}-{next(self._dead_letter_sequence)}"
+        self._dead_letters[entry_id] = dict(entry)
+
+    async def dead_letters(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after_id: Optional[str] = None,
+        count: int = 100
+    ) -> List[Dict[str, str]]:
+        def order(entry_id: str):
+            milliseconds, sequence = entry_id.split("-")
+            return int(milliseconds), int(sequence)
+
+        after = order(after_id) if after_id else None
+        entries = []
+        for entry_id, fields in self._dead_letters.items():
+            failed_at = order(entry_id)[0] / 1000
+            if (after and order(entry_id) <= after) or (since and failed_at < since):
+                continue
+            if until and failed_at > until:
+                break
+            entries.append({"id": entry_id, **fields})
+            if len(entries) >= count:
+                break
+        return entries
+
+    async def remove_dead_letter(self, entry_id: str):
+        self._dead_letters.pop(entry_id, None)
+
+    async def dead_letter_count(self) -> int:
+        return len(self._dead_letters)
+
+    async def queue_depths(self, job_types: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        now = time.time()
+        depths: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for job_type in job_types:
+            for lane in PRIORITY_LANES:
+                queue = self._lists.get(list_key(job_type, lane))
+                depths.setdefault(job_type, {})[lane] = {
+                    "depth": len(queue) if queue else 0,
+                    "oldest_age_seconds": payload_age(queue[0], now) if queue else None
+                }
+        return depths
+
+    async def backlog_counts(self) -> Dict[str, int]:
+        return {
+            "retry_scheduled": len(self._retries),
+            "parked": sum(len(queue) for queue in self._parked.values()),
+            "dead_lettered": len(self._dead_letters)
+        }
+
+    async def write_worker_metrics(self, worker_id: str, snapshot: Dict[str, Any]):
+        self._worker_metrics[worker_id] = json.dumps(snapshot)
+
+    async def worker_metrics(self, max_age: float = 60) -> Dict[str, Dict[str, Any]]:
+        live, stale = live_worker_metrics(self._worker_metrics, max_age, time.time())
+        for worker_id in stale:
+            del self._worker_metrics[worker_id]
+        return live
+
+    async def remove_worker_metrics(self, worker_id: str):
+        self._worker_metrics.pop(worker_id, None)
+
+
+def create_queue_backend(redis_client: Optional[redis.Redis], job_types: List[str], name: Optional[str] = None) -> QueueBackend:
+    """Backend selected by QUEUE_BACKEND (list | stream | memory)"""
+    name = (name or os.getenv("QUEUE_BACKEND", "list")).lower()
+    if name == "memory":
+        return InMemoryQueueBackend()
+    if name == "stream":
+        return RedisStreamQueueBackend(redis_client, job_types)
+    if name == "list":
+        return RedisListQueueBackend(redis_client)
+    raise ValueError(f"Unknown queue backend: {name}")
@@ -0,0 +1,244 @@
+"""
+Queue and worker telemetry with a scaling hint
+Every worker process writes a metrics snapshot (counters, occupancy, lag and
+duration histograms, recent throughput) to the backend's worker metrics hash
+every WORKER_METRICS_PUBLISH_SECONDS. collect_queue_telemetry() combines those
+with the queue depths and backlog counts read from the backend, and
+render_prometheus() turns the result into the text exposition format served by
+GET /queue/metrics.
+
+The scaling hint sizes the worker pool so the waiting work drains within
+QUEUE_TARGET_DRAIN_SECONDS on top of what is running now:
+
+    backlog_seconds = sum(waiting jobs of a type * average run time of that type)
+    required_slots  = busy slots + backlog_seconds / target_drain_seconds
+    workers         = ceil(required_slots / slots per worker)
+
+Busy slots stand in for arrival rate x run time (Little's law), so a steady
+load with an empty queue keeps the current size.
+"""
+
+import math
+import os
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from utils.metrics import merge_snapshots
+
+# Snapshots older than this belong to workers that are gone
+WORKER_METRICS_MAX_AGE_SECONDS = float(os.getenv("WORKER_METRICS_MAX_AGE_SECONDS", "60"))
+
+COUNTERS = ("jobs_started", "jobs_succeeded", "jobs_failed", "jobs_retried", "jobs_dead_lettered", "items_processed")
+
+
+def aggregate_workers(workers: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals across worker snapshots; histograms are merged bucket by bucket"""
+    totals: Dict[str, Any] = {key: sum(worker.get(key, 0) for worker in workers.values()) for key in COUNTERS}
+    totals.update({
+        "workers": len(workers),
+        "slots": sum(worker.get("max_concurrent", 0) for worker in workers.values()),
+        "active_jobs": sum(worker.get("active_jobs", 0) for worker in workers.values()),
+        "buffered_jobs": sum(worker.get("scheduler", {}).get("buffered", 0) for worker in workers.values()),
+        "llm_slots": sum(worker.get("llm_slots", 0) for worker in workers.values()),
+        "llm_slots_in_use": sum(worker.get("llm_slots_in_use", 0) for worker in workers.values()),
+        "jobs_per_minute": round(sum(worker.get("throughput", {}).get("jobs_per_minute", 0.0) for worker in workers.values()), 3),
+        "items_per_minute": round(sum(worker.get("throughput", {}).get("items_per_minute", 0.0) for worker in workers.values()), 3)
+    })
+
+    completed_by_type: Dict[str, int] = {}
+    for worker in workers.values():
+        for job_type, count in worker.get("completed_by_type", {}).items():
+            completed_by_type[job_type] = completed_by_type.get(job_type, 0) + count
+    totals["completed_by_type"] = completed_by_type
+
+    job_types = sorted({job_type for worker in workers.values() for job_type in worker.get("job_duration_seconds", {})})
+    totals["job_duration_seconds"] = {
+        job_type: merge_snapshots([worker.get("job_duration_seconds", {}).get(job_type) for worker in workers.values()])
+        for job_type in job_types
+    }
+    for key in ("start_lag_seconds", "item_duration_seconds"):
+        totals[key] = merge_snapshots([worker.get(key) for worker in workers.values()])
+    return totals
+
+
+def scaling_hint(
+    telemetry: Dict[str, Any],
+    target_drain_seconds: Optional[float] = None,
+    lag_target_seconds: Optional[float] = None,
+    min_workers: Optional[int] = None,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Recommended number of worker processes from depths, run times and occupancy
+    (see the module docstring for the formula)
+
+    Args:
+        telemetry: Output of collect_queue_telemetry (depths, backlog, totals)
+        target_drain_seconds: Time the backlog should take to drain (QUEUE_TARGET_DRAIN_SECONDS)
+        lag_target_seconds: Oldest job wait considered too long (QUEUE_LAG_TARGET_SECONDS)
+        min_workers / max_workers: Bounds of the recommendation (QUEUE_MIN_WORKERS / QUEUE_MAX_WORKERS)
+    """
+    target_drain_seconds = target_drain_seconds or float(os.getenv("QUEUE_TARGET_DRAIN_SECONDS", "300"))
+    lag_target_seconds = lag_target_seconds or float(os.getenv("QUEUE_LAG_TARGET_SECONDS", "120"))
+    min_workers = min_workers if min_workers is not None else int(os.getenv("QUEUE_MIN_WORKERS", "1"))
+    max_workers = max_workers if max_workers is not None else int(os.getenv("QUEUE_MAX_WORKERS", "0"))
+
+    totals = telemetry["totals"]
+    workers = totals["workers"]
+    slots_per_worker = totals["slots"] / workers if workers else float(os.getenv("MAX_CONCURRENT_JOBS", "5"))
+
+    # Types never run yet are assumed to take as long as the average job
+    durations = totals["job_duration_seconds"]
+    ran = [snapshot for snapshot in durations.values() if snapshot["count"]]
+    overall_avg = (
+        sum(snapshot["sum"] for snapshot in ran) / sum(snapshot["count"] for snapshot in ran)
+        if ran else float(os.getenv("QUEUE_DEFAULT_JOB_SECONDS", "60"))
+    )
+
+    waiting_jobs = 0
+    backlog_seconds = 0.0
+    max_lag = 0.0
+    for job_type, lanes in telemetry["depths"].items():
+        avg = durations.get(job_type, {}).get("avg") or overall_avg
+        for lane in lanes.values():
+            waiting_jobs += lane["depth"]
+            backlog_seconds += lane["depth"] * avg
+            max_lag = max(max_lag, lane.get("oldest_age_seconds") or 0.0)
+
+    # Parked and buffered jobs have been popped but are still waiting to start
+    held = telemetry["backlog"].get("parked", 0) + totals["buffered_jobs"]
+    waiting_jobs += held
+    backlog_seconds += held * overall_avg
+
+    required_slots = totals["active_jobs"] + backlog_seconds / target_drain_seconds
+    recommended = math.ceil(required_slots / slots_per_worker) if slots_per_worker else workers
+
+    reasons: List[str] = []
+    if max_lag > lag_target_seconds:
+        reasons.append(f"oldest waiting job is {max_lag:.0f}s old (target {lag_target_seconds:.0f}s)")
+        recommended = max(recommended, workers + 1)
+    if recommended > workers and waiting_jobs:
+        reasons.append(
+            f"{waiting_jobs} waiting jobs (~{backlog_seconds:.0f} job-seconds) won't drain within {target_drain_seconds:.0f}s"
+        )
+
+    slot_occupancy = totals["active_jobs"] / totals["slots"] if totals["slots"] else 0.0
+    llm_occupancy = totals["llm_slots_in_use"] / totals["llm_slots"] if totals["llm_slots"] else 0.0
+    if llm_occupancy >= 0.9:
+        reasons.append("LLM slots are saturated: more workers only help if the provider quota allows more concurrency")
+
+    recommended = max(recommended, min_workers)
+    if max_workers:
+        recommended = min(recommended, max_workers)
+    if recommended < workers:
+        reasons.append(f"job slots are {slot_occupancy:.0%} busy with no backlog to drain")
+
+    jobs_per_second = totals["jobs_per_minute"] / 60
+    return {
+        "current_workers": workers,
+        "recommended_workers": recommended,
+        "action": "scale_up" if recommended > workers else ("scale_down" if recommended < workers else "hold"),
+        "waiting_jobs": waiting_jobs,
+        "backlog_job_seconds": round(backlog_seconds, 1),
+        "required_slots": round(required_slots, 2),
+        "slot_occupancy": round(slot_occupancy, 3),
+        "llm_occupancy": round(llm_occupancy, 3),
+        "max_lag_seconds": round(max_lag, 1),
+        "drain_eta_seconds": round(waiting_jobs / jobs_per_second, 1) if jobs_per_second else None,
+        "reasons": reasons
+    }
+
+
+async def collect_queue_telemetry(queue_backend, job_types: Sequence[str], max_age: Optional[float] = None) -> Dict[str, Any]:
+    """Queue depths, backlog counts, live worker snapshots, their totals and the scaling hint"""
+    workers = await queue_backend.worker_metrics(max_age or WORKER_METRICS_MAX_AGE_SECONDS)
+    telemetry = {
+        "collected_at": time.time(),
+        "depths": await queue_backend.queue_depths(list(job_types)),
+        "backlog": await queue_backend.backlog_counts(),
+        "workers": workers,
+        "totals": aggregate_workers(workers)
+    }
+    telemetry["scaling"] = scaling_hint(telemetry)
+    return telemetry
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str, samples: Sequence[Tuple[Dict[str, Any], Any]]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {0 if value is None else value}")
+
+
+def _histogram(lines: List[str], name: str, help_text: str, snapshots: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]):
+    """Non-cumulative snapshot buckets as a Prometheus (cumulative) histogram"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, snapshot in snapshots:
+        cumulative = 0
+        for bound, count in snapshot["buckets"].items():
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+
+def render_prometheus(telemetry: Dict[str, Any]) -> str:
+    """Telemetry in the Prometheus text exposition format"""
+    lines: List[str] = []
+    depths = telemetry["depths"]
+    totals = telemetry["totals"]
+    scaling = telemetry["scaling"]
+
+    _family(lines, "recruiter_queue_depth", "gauge", "Jobs waiting in a priority queue", [
+        ({"job_type": job_type, "lane": lane}, entry["depth"])
+        for job_type, lanes in depths.items() for lane, entry in lanes.items()
+    ])
+    _family(lines, "recruiter_queue_oldest_age_seconds", "gauge", "Age of the next job to run in a priority queue", [
+        ({"job_type": job_type, "lane": lane}, entry["oldest_age_seconds"])
+        for job_type, lanes in depths.items() for lane, entry in lanes.items()
+    ])
+    _family(lines, "recruiter_queue_held_jobs", "gauge", "Jobs held outside the priority queues", [
+        ({"state": state}, count) for state, count in telemetry["backlog"].items()
+    ])
+
+    _family(lines, "recruiter_workers", "gauge", "Worker processes that reported recently", [({}, totals["workers"])])
+    _family(lines, "recruiter_worker_slots", "gauge", "Job slots across workers", [
+        ({"state": "total"}, totals["slots"]), ({"state": "busy"}, totals["active_jobs"])
+    ])
+    _family(lines, "recruiter_worker_llm_slots", "gauge", "LLM call slots across workers", [
+        ({"state": "total"}, totals["llm_slots"]), ({"state": "busy"}, totals["llm_slots_in_use"])
+    ])
+    _family(lines, "recruiter_worker_buffered_jobs", "gauge", "Jobs popped into worker lookahead buffers", [
+        ({}, totals["buffered_jobs"])
+    ])
+    _family(lines, "recruiter_worker_jobs_total", "counter", "Job events since the workers started", [
+        ({"event": key[len("jobs_"):]}, totals[key]) for key in COUNTERS if key.startswith("jobs_")
+    ])
+    _family(lines, "recruiter_worker_completed_jobs_total", "counter", "Successfully completed jobs by type", [
+        ({"job_type": job_type}, count) for job_type, count in totals["completed_by_type"].items()
+    ])
+    _family(lines, "recruiter_worker_items_total", "counter", "Job items processed", [({}, totals["items_processed"])])
+    _family(lines, "recruiter_worker_throughput_per_minute", "gauge", "Recent completions per minute", [
+        ({"unit": "jobs"}, totals["jobs_per_minute"]), ({"unit": "items"}, totals["items_per_minute"])
+    ])
+
+    _histogram(lines, "recruiter_job_start_lag_seconds", "Enqueue to start of a job", [({}, totals["start_lag_seconds"])])
+    _histogram(lines, "recruiter_job_duration_seconds", "Run time of successful jobs", [
+        ({"job_type": job_type}, snapshot) for job_type, snapshot in totals["job_duration_seconds"].items()
+    ])
+    _histogram(lines, "recruiter_job_item_duration_seconds", "Run time of one job item", [({}, totals["item_duration_seconds"])])
+
+    _family(lines, "recruiter_scaling_recommended_workers", "gauge", "Worker processes needed to drain the backlog in time", [
+        ({"action": scaling["action"]}, scaling["recommended_workers"])
+    ])
+    _family(lines, "recruiter_scaling_backlog_job_seconds", "gauge", "Estimated run time of all waiting jobs", [
+        ({}, scaling["backlog_job_seconds"])
+    ])
+    return "\n".join(lines) + "\n"
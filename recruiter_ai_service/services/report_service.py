@@ -96,13 +96,7 @@ class ReportService:
     async def _get_job_description(self, job_description_id: str) -> Dict[str, Any]:
         """Get job description data"""
         try:
-            query = """
-                SELECT id, title, description, requirements, company_name, location
-                FROM job_descriptions 
-                WHERE id = %s
-            """
-            
-            return await self.db.fetch_one(query, (job_description_id,))
+            return await self.db.load("job", job_description_id)
             
         except Exception as e:
             logger.error(f"Error getting job description: {str(e)}")
@@ -111,21 +105,16 @@ class ReportService:
     async def _get_analysis_data(self, analysis_id: str) -> Dict[str, Any]:
         """Get analysis data with resume info"""
         try:
-            query = """
-                SELECT ra.*, r.file_name, r.extracted_data
-                FROM resume_analysis ra
-                JOIN resumes r ON ra.resume_id = r.id
-                WHERE ra.id = %s
-            """
-            
-            result = await self.db.fetch_one(query, (analysis_id,))
+            result = await self.db.load("analysis", analysis_id)
+            if not result:
+                # Analyses stored moments ago (e.g. by the bulk job this report follows)
+                # may not have reached the replica yet: ask the primary
+                self.db.forget("analysis", analysis_id)
+                with self.db.primary_only():
+                    result = await self.db.load("analysis", analysis_id)
             
             if result and result["extracted_data"]:
-                try:
-                    extracted_data = json.loads(result["extracted_data"])
-                    result.update(extracted_data)
-                except json.JSONDecodeError:
-                    pass
+                result.update(result["extracted_data"])
             
             return result
             
@@ -438,13 +427,7 @@ class ReportService:
     async def _store_report(self, report_data: Dict[str, Any]) -> str:
         """Store report in database"""
         try:
-            query = """
-                INSERT INTO generated_reports (
-                    user_id, job_description_id, report_type,
-                    report_content, report_metadata
-                ) VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            """
+            query = "generated_reports.insert"
             
             metadata = {
                 "candidates_count": report_data.get("candidates_count", 0),
@@ -461,13 +444,13 @@ class ReportService:
                     report_data["user_id"],
                     report_data["job_description_id"],
                     report_data["report_type"],
-                    json.dumps({
+                    {
                         "content": report_data.get("report_content", ""),
                         "statistics": report_data.get("statistics", {}),
                         "candidate_details": report_data.get("candidate_details", []),
                         "comparison_matrix": report_data.get("comparison_matrix", [])
-                    }),
-                    json.dumps(metadata)
+                    },
+                    metadata
                 )
             )
             
@@ -0,0 +1,143 @@
+"""
+Compressed external storage for large job results
+Results bigger than RESULT_INLINE_MAX_BYTES (as JSON) are split into chunks of
+RESULT_CHUNK_ITEMS items, zlib-compressed and written to processing_job_results
+in one statement. processing_jobs.result_data and the job_completed message
+then carry only a reference plus a summary; pages of results are read back by
+decompressing just the chunks that overlap the requested range.
+
+Small results stay inline in result_data, unchanged.
+"""
+
+import logging
+import os
+import zlib
+from typing import Dict, Any, List, Optional
+
+from utils.database import dumps_json, loads_json
+
+logger = logging.getLogger(__name__)
+
+STORAGE_TABLE = "processing_job_results"
+ENCODING = "zlib+json"
+
+
+def summarize_results(results: Any, top: int = 10) -> Dict[str, Any]:
+    """Counts (and the best matches of a bulk analysis) for the job row and completion message"""
+    if not isinstance(results, list):
+        return {"total_items": 1}
+
+    succeeded = [item for item in results if isinstance(item, dict) and item.get("success")]
+    summary: Dict[str, Any] = {
+        "total_items": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded)
+    }
+
+    scored = [
+        {"resume_id": item.get("resume_id"), "match_score": item["analysis"]["match_score"]}
+        for item in succeeded
+        if isinstance(item.get("analysis"), dict) and isinstance(item["analysis"].get("match_score"), (int, float))
+    ]
+    if scored:
+        scored.sort(key=lambda item: item["match_score"], reverse=True)
+        summary["top_matches"] = scored[:top]
+    return summary
+
+
+def is_result_reference(result_data: Any) -> bool:
+    return isinstance(result_data, dict) and result_data.get("storage") == STORAGE_TABLE
+
+
+class ResultStore:
+    """Writes large job results as compressed chunks and reads them back by page"""
+
+    def __init__(
+        self,
+        db_service,
+        chunk_items: Optional[int] = None,
+        inline_max_bytes: Optional[int] = None,
+        compression_level: Optional[int] = None
+    ):
+        """
+        Args:
+            db_service: DatabaseService
+            chunk_items: Results per stored chunk (RESULT_CHUNK_ITEMS)
+            inline_max_bytes: Larger JSON results go to the store (RESULT_INLINE_MAX_BYTES)
+            compression_level: zlib level 1-9 (RESULT_COMPRESSION_LEVEL)
+        """
+        self.db = db_service
+        self.chunk_items = chunk_items or int(os.getenv("RESULT_CHUNK_ITEMS", "100"))
+        self.inline_max_bytes = inline_max_bytes or int(os.getenv("RESULT_INLINE_MAX_BYTES", "65536"))
+        self.compression_level = compression_level or int(os.getenv("RESULT_COMPRESSION_LEVEL", "6"))
+
+    async def save(self, job_id: str, results: Any) -> Any:
+        """
+        Store results if they are large; returns what goes into result_data:
+        the results themselves when small, else a reference with a summary
+        """
+        raw_bytes = len(dumps_json(results).encode())
+        if raw_bytes <= self.inline_max_bytes:
+            return results
+
+        items = results if isinstance(results, list) else [results]
+        chunk_indexes, first_items, item_counts, payloads = [], [], [], []
+        for chunk_index, first_item in enumerate(range(0, len(items), self.chunk_items)):
+            chunk = items[first_item:first_item + self.chunk_items]
+            chunk_indexes.append(chunk_index)
+            first_items.append(first_item)
+            item_counts.append(len(chunk))
+            payloads.append(zlib.compress(dumps_json(chunk).encode(), self.compression_level))
+
+        # One round-trip for every chunk; rewriting a retried job's chunks is idempotent
+        await self.db.execute(
+            "processing_job_results.save_chunks",
+            (job_id, chunk_indexes, first_items, item_counts, payloads, ENCODING, len(chunk_indexes))
+        )
+
+        stored_bytes = sum(len(payload) for payload in payloads)
+        logger.info(
+            f"Stored results of job {job_id} externally: {len(items)} items in {len(payloads)} chunks, "
+            f"{raw_bytes} -> {stored_bytes} bytes"
+        )
+        return {
+            "storage": STORAGE_TABLE,
+            # Followers of a coalesced job point at the leader's chunks
+            "job_id": job_id,
+            "encoding": ENCODING,
+            "kind": "list" if isinstance(results, list) else "object",
+            "total_items": len(items),
+            "chunks": len(payloads),
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "summary": summarize_results(results)
+        }
+
+    async def fetch_page(self, job_id: str, result_data: Any, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """
+        One page of a job's results, whether they are inline or stored
+        (`result_data` is the job row's value)
+        """
+        offset = max(0, offset)
+        limit = max(1, limit)
+
+        if not is_result_reference(result_data):
+            items = result_data if isinstance(result_data, list) else ([] if result_data is None else [result_data])
+            return {"items": items[offset:offset + limit], "offset": offset, "limit": limit, "total_items": len(items)}
+
+        rows = await self.db.fetch_all(
+            "processing_job_results.get_range", (result_data.get("job_id", job_id), offset, offset + limit)
+        )
+        items: List[Any] = []
+        for row in rows:
+            chunk = loads_json(zlib.decompress(row["data"]).decode())
+            start = max(0, offset - row["first_item"])
+            end = offset + limit - row["first_item"]
+            items.extend(chunk[start:end])
+
+        return {
+            "items": items,
+            "offset": offset,
+            "limit": limit,
+            "total_items": result_data["total_items"]
+        }
@@ -1,16 +1,145 @@
 """
 Skill Gap Analysis Service
 Analyzes skill gaps between candidates and job requirements
+
+Batches (many resumes, one job) go through prepare_batch() once: the job
+description is loaded and digested into skill keywords, and every resume is
+matched against them in a single keyword pass into a coverage matrix. The
+keyword pass only settles a resume without the LLM when it could check every
+requirement of the job and found no critical gap (analyze_batch_item).
 """
 
+import asyncio
 import logging
 import json
-from typing import Dict, Any
+import re
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Callable
 from datetime import datetime
+
+import numpy as np
+
 from utils.openai_utils import call_openai_with_cache, create_skill_gap_prompt
+from utils.database import to_text_array
 
 logger = logging.getLogger(__name__)
 
+# Common technical skills and keywords
+SKILL_KEYWORDS = [
+    "Python", "Java", "JavaScript", "React", "Angular", "Node.js",
+    "SQL", "NoSQL", "MongoDB", "PostgreSQL", "MySQL",
+    "AWS", "Azure", "GCP", "Docker", "Kubernetes",
+    "Git", "CI/CD", "DevOps", "Agile", "Scrum",
+    "Machine Learning", "AI", "Data Science", "Analytics",
+    "REST", "API", "Microservices", "Cloud", "Linux"
+]
+
+# Keywords named in the requirements count double towards coverage
+CRITICAL_WEIGHT = 2.0
+
+# Requirement words that don't name a skill ("5+ years of experience with ...")
+REQUIREMENT_FILLER = {
+    "a", "an", "and", "at", "least", "minimum", "of", "or", "in", "on", "with", "the", "to", "plus",
+    "y", "yr", "yrs", "year", "years", "experience", "experienced", "professional", "commercial",
+    "strong", "solid", "good", "excellent", "deep", "proven", "working", "hands", "knowledge",
+    "proficiency", "proficient", "familiarity", "familiar", "understanding", "skills", "skill",
+    "must", "have", "should", "required", "preferred", "nice", "is", "are", "be", "etc", "using"
+}
+
+LEARNING_RESOURCES = [
+    "Online courses",
+    "Professional certifications",
+    "Hands-on projects"
+]
+
+
+def keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """
+    One regex matching any keyword as a whole word in lower-cased text
+    (so "java" doesn't match inside "javascript", nor "sql" inside "mysql")
+    """
+    alternatives = sorted((re.escape(keyword.lower()) for keyword in keywords), key=len, reverse=True)
+    return re.compile(r"(?<![a-z0-9])(" + "|".join(alternatives) + r")(?![a-z0-9])")
+
+
+def unchecked_requirements(requirements: str, pattern: re.Pattern) -> List[str]:
+    """
+    Requirement items (split on lines, commas, semicolons, bullets, and/or) that
+    still name something once the known keywords, numbers and filler words are
+    removed, i.e. requirements the keyword pass cannot check ("Go", "Terraform")
+    """
+    unchecked = []
+    for item in re.split(r"[\n,;•]|\band\b|\bor\b", requirements.lower()):
+        words = re.findall(r"[a-z0-9+#.]+", pattern.sub(" ", item))
+        if any(not re.search(r"\d", word) and word.strip(".") not in REQUIREMENT_FILLER for word in words):
+            unchecked.append(item.strip(" -*\t"))
+    return unchecked
+
+
+@asynccontextmanager
+async def _no_slot():
+    yield
+
+
+class SkillGapBatch:
+    """
+    One job description digested for a batch of resumes: its skill keywords
+    (critical when named in the requirements), the requirements the keywords
+    can't check and a resumes x keywords coverage matrix
+    """
+
+    def __init__(
+        self,
+        job_description_id: str,
+        job_text: str,
+        keywords: List[str],
+        critical: np.ndarray,
+        resumes: Dict[str, Optional[Dict[str, Any]]],
+        coverage: np.ndarray,
+        unchecked: Optional[List[str]] = None
+    ):
+        self.job_description_id = job_description_id
+        self.job_text = job_text
+        self.keywords = keywords
+        self.critical = critical
+        self.unchecked = unchecked or []
+        self.resumes = resumes
+        self.rows = {resume_id: index for index, resume_id in enumerate(resumes)}
+        self.coverage = coverage
+
+        # Whole-batch scoring in array ops; with no requirement keywords every keyword counts as critical
+        weights = np.where(critical, CRITICAL_WEIGHT, 1.0)
+        deciding = critical if critical.any() else np.ones(len(keywords), dtype=bool)
+        self.scores = coverage @ weights / weights.sum() if keywords else np.zeros(len(resumes))
+        self.critical_missing_counts = (~coverage & deciding).sum(axis=1)
+
+    @property
+    def llm_items(self) -> int:
+        """Resumes the LLM has to look at"""
+        return sum(1 for resume_id in self.resumes if self.needs_llm(resume_id))
+
+    def needs_llm(self, resume_id: str) -> bool:
+        """
+        Whether the keyword pass leaves something to explain: the resume misses
+        critical job keywords, or the requirements name skills the keyword list
+        can't check (or none it can). Missing nice-to-have keywords alone are
+        reported from the keyword pass.
+        """
+        if not self.keywords or self.unchecked:
+            return True
+        return bool(self.critical_missing_counts[self.rows[resume_id]])
+
+    def keyword_findings(self, resume_id: str) -> Dict[str, Any]:
+        """Matched and missing job keywords of one resume"""
+        row = self.coverage[self.rows[resume_id]]
+        missing = ~row
+        return {
+            "matched": [self.keywords[index] for index in np.flatnonzero(row)],
+            "critical_missing": [self.keywords[index] for index in np.flatnonzero(missing & self.critical)],
+            "nice_to_have_missing": [self.keywords[index] for index in np.flatnonzero(missing & ~self.critical)],
+            "coverage": round(float(self.scores[self.rows[resume_id]]), 3)
+        }
+
 class SkillGapService:
     def __init__(self, db_service, cache_service):
         self.db = db_service
@@ -73,27 +202,123 @@ class SkillGapService:
             logger.error(f"Error analyzing skill gaps: {str(e)}")
             raise Exception(f"Failed to analyze skill gaps: {str(e)}")
     
+    async def prepare_batch(self, job_description_id: str, resume_ids: List[str]) -> SkillGapBatch:
+        """
+        Load and digest the job description once and match every resume
+        against its keywords in one pass
+        
+        Args:
+            job_description_id: Job description shared by the batch
+            resume_ids: Resumes of the batch (fetched together inside a loader scope)
+            
+        Returns:
+            SkillGapBatch for analyze_batch_item
+        """
+        job = await self.db.load("job", job_description_id)
+        if not job:
+            raise Exception("Job description not found")
+        
+        job_text = self._format_job_description(job)
+        requirements = job["requirements"] or ""
+        if isinstance(requirements, list):
+            requirements = " ".join(str(requirement) for requirement in requirements)
+        
+        # The job's keywords, critical (in the requirements) first
+        pattern = keyword_pattern(SKILL_KEYWORDS)
+        canonical = {keyword.lower(): keyword for keyword in SKILL_KEYWORDS}
+        critical_found = set(pattern.findall(requirements.lower()))
+        found = critical_found | set(pattern.findall(job_text.lower()))
+        keywords = [canonical[key] for key in sorted(found, key=lambda key: (key not in critical_found, key))]
+        critical = np.array([keyword.lower() in critical_found for keyword in keywords], dtype=bool)
+        unchecked = unchecked_requirements(requirements, pattern)
+        
+        resume_rows = await asyncio.gather(*(self._get_resume_data(resume_id) for resume_id in resume_ids))
+        resumes = dict(zip(resume_ids, resume_rows))
+        
+        coverage = np.zeros((len(resume_ids), len(keywords)), dtype=bool)
+        if keywords:
+            columns = {keyword.lower(): index for index, keyword in enumerate(keywords)}
+            job_pattern = keyword_pattern(keywords)
+            for row, resume_data in enumerate(resume_rows):
+                if not resume_data:
+                    continue
+                text = " ".join([" ".join(map(str, resume_data.get("skills") or [])), resume_data.get("full_text", "")])
+                matched = {columns[key] for key in job_pattern.findall(text.lower())}
+                coverage[row, list(matched)] = True
+        
+        return SkillGapBatch(job_description_id, job_text, keywords, critical, resumes, coverage, unchecked)
+    
+    async def analyze_batch_item(
+        self,
+        batch: SkillGapBatch,
+        resume_id: str,
+        user_id: str,
+        plan_type: str = "free",
+        llm_slot: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        Skill gaps of one resume of a prepared batch. When the keyword pass
+        could check every requirement and the resume has all critical keywords,
+        it is answered from the keyword pass; otherwise it goes to the LLM
+        (inside llm_slot(), if given), falling back to the keyword result if
+        the call fails. Keyword matches and coverage are attached either way.
+        """
+        resume_data = batch.resumes.get(resume_id)
+        if not resume_data:
+            raise Exception("Resume not found")
+        
+        findings = batch.keyword_findings(resume_id)
+        if batch.needs_llm(resume_id):
+            try:
+                async with (llm_slot or _no_slot)():
+                    skill_gap_analysis = await self._request_skill_gap_analysis(resume_data, batch.job_text, plan_type)
+                skill_gap_analysis["analysis_source"] = "llm"
+            except Exception as e:
+                logger.warning(f"LLM skill gap analysis failed for resume {resume_id}, using keyword results: {e}")
+                skill_gap_analysis = self._keyword_skill_gap_analysis(findings, plan_type)
+                skill_gap_analysis["ai_insights"] = f"LLM analysis unavailable: {str(e)[:200]}"
+        else:
+            skill_gap_analysis = self._keyword_skill_gap_analysis(findings, plan_type)
+        
+        analysis_result = {
+            "resume_id": resume_id,
+            "job_description_id": batch.job_description_id,
+            "user_id": user_id,
+            **skill_gap_analysis,
+            "matched_skills": findings["matched"],
+            "keyword_coverage": findings["coverage"],
+            "analysis_date": str(datetime.utcnow()),
+            "plan_type": plan_type
+        }
+        
+        analysis_result["analysis_id"] = await self._store_skill_gap_analysis(analysis_result)
+        return analysis_result
+    
+    def _keyword_skill_gap_analysis(self, findings: Dict[str, Any], plan_type: str) -> Dict[str, Any]:
+        """Skill gap analysis from the keyword pass alone (no LLM call)"""
+        missing = findings["critical_missing"] + findings["nice_to_have_missing"]
+        data = {
+            "critical_missing_skills": findings["critical_missing"],
+            "nice_to_have_missing_skills": findings["nice_to_have_missing"],
+            "skill_development_recommendations": [f"Learn {skill}" for skill in missing[:3]],
+            "learning_resources": list(LEARNING_RESOURCES) if missing else [],
+            "timeline_for_acquisition": "3-6 months for basic proficiency" if missing else "No gaps in the job's listed skills",
+            "analysis_source": "keywords",
+            "ai_model_used": "none",
+            "tokens_used": 0,
+            "analysis_cost": 0.0
+        }
+        return self._validate_skill_gap_data(data, plan_type)
+    
     async def _get_resume_data(self, resume_id: str) -> Dict[str, Any]:
         """Get resume data from database"""
         try:
-            query = """
-                SELECT file_name, parsed_text, extracted_data
-                FROM resumes 
-                WHERE id = %s
-            """
-            
-            result = await self.db.fetch_one(query, (resume_id,))
+            result = await self.db.load("resume", resume_id)
             
             if not result:
                 return None
             
-            # Parse extracted data
-            extracted_data = result["extracted_data"] if result["extracted_data"] else {}
-            if isinstance(extracted_data, str):
-                try:
-                    extracted_data = json.loads(extracted_data)
-                except json.JSONDecodeError:
-                    extracted_data = {}
+            extracted_data = result["extracted_data"] or {}
             
             return {
                 "file_name": result["file_name"],
@@ -108,32 +333,30 @@ class SkillGapService:
     async def _get_job_description(self, job_description_id: str) -> str:
         """Get job description text"""
         try:
-            query = """
-                SELECT title, description, requirements
-                FROM job_descriptions 
-                WHERE id = %s
-            """
-            
-            result = await self.db.fetch_one(query, (job_description_id,))
+            result = await self.db.load("job", job_description_id)
             
             if not result:
                 return None
             
-            job_text = f"""
-            Job Title: {result['title']}
+            return self._format_job_description(result)
+            
+        except Exception as e:
+            logger.error(f"Error getting job description: {str(e)}")
+            return None
+    
+    def _format_job_description(self, job: Dict[str, Any]) -> str:
+        """Job text used in skill gap prompts"""
+        job_text = f"""
+            Job Title: {job['title']}
             
             Job Description:
-            {result['description']}
+            {job['description']}
             
             Requirements:
-            {result['requirements'] or 'Not specified'}
+            {job['requirements'] or 'Not specified'}
             """
-            
-            return job_text.strip()
-            
-        except Exception as e:
-            logger.error(f"Error getting job description: {str(e)}")
-            return None
+        
+        return job_text.strip()
     
     async def _generate_skill_gap_analysis(
         self,
@@ -143,42 +366,51 @@ class SkillGapService:
     ) -> Dict[str, Any]:
         """Generate AI-powered skill gap analysis"""
         try:
-            # Create skill gap prompt
-            prompt = create_skill_gap_prompt(resume_data, job_description, plan_type)
-            
-            # Call OpenAI with caching
-            response, usage, cost = await call_openai_with_cache(
-                messages=prompt,
-                plan=plan_type,
-                temperature=0.1,  # Low temperature for consistent analysis
-                max_tokens=1500,
-                cache_service=self.cache_service,
-                cache_type="skill_gap",
-                cache_ttl_hours=24
-            )
-            
-            # Parse JSON response
-            try:
-                skill_gap_data = json.loads(response)
-            except json.JSONDecodeError:
-                skill_gap_data = self._parse_skill_gap_fallback(response, resume_data, job_description)
-            
-            # Validate and enhance analysis
-            skill_gap_data = self._validate_skill_gap_data(skill_gap_data, plan_type)
-            
-            # Add metadata
-            skill_gap_data.update({
-                "ai_model_used": f"gpt-3.5-turbo" if plan_type in ["free", "basic"] else "gpt-4",
-                "tokens_used": usage.total_tokens if usage else 0,
-                "analysis_cost": cost
-            })
-            
-            return skill_gap_data
+            return await self._request_skill_gap_analysis(resume_data, job_description, plan_type)
             
         except Exception as e:
             logger.error(f"Error generating skill gap analysis: {str(e)}")
             return self._get_default_skill_gap_analysis()
     
+    async def _request_skill_gap_analysis(
+        self,
+        resume_data: Dict[str, Any],
+        job_description: str,
+        plan_type: str
+    ) -> Dict[str, Any]:
+        """LLM skill gap analysis; raises if the call fails"""
+        # Create skill gap prompt
+        prompt = create_skill_gap_prompt(resume_data, job_description, plan_type)
+        
+        # Call OpenAI with caching
+        response, usage, cost = await call_openai_with_cache(
+            messages=prompt,
+            plan=plan_type,
+            temperature=0.1,  # Low temperature for consistent analysis
+            max_tokens=1500,
+            cache_service=self.cache_service,
+            cache_type="skill_gap",
+            cache_ttl_hours=24
+        )
+        
+        # Parse JSON response
+        try:
+            skill_gap_data = json.loads(response)
+        except json.JSONDecodeError:
+            skill_gap_data = self._parse_skill_gap_fallback(response, resume_data, job_description)
+        
+        # Validate and enhance analysis
+        skill_gap_data = self._validate_skill_gap_data(skill_gap_data, plan_type)
+        
+        # Add metadata
+        skill_gap_data.update({
+            "ai_model_used": f"gpt-3.5-turbo" if plan_type in ["free", "basic"] else "gpt-4",
+            "tokens_used": usage.total_tokens if usage else 0,
+            "analysis_cost": cost
+        })
+        
+        return skill_gap_data
+    
     def _parse_skill_gap_fallback(self, response: str, resume_data: Dict[str, Any], job_description: str) -> Dict[str, Any]:
         """Fallback parsing when JSON parsing fails"""
         logger.warning("Skill gap JSON parsing failed, using fallback")
@@ -201,31 +433,17 @@ class SkillGapService:
             "skill_development_recommendations": [
                 f"Learn {skill}" for skill in missing_skills[:3]
             ],
-            "learning_resources": [
-                "Online courses",
-                "Professional certifications",
-                "Hands-on projects"
-            ],
+            "learning_resources": list(LEARNING_RESOURCES),
             "timeline_for_acquisition": "3-6 months for basic proficiency",
             "ai_insights": response[:500] if response else "Basic skill gap analysis completed"
         }
     
     def _extract_job_keywords(self, job_description: str) -> list:
         """Extract potential skill keywords from job description"""
-        # Common technical skills and keywords
-        common_skills = [
-            "Python", "Java", "JavaScript", "React", "Angular", "Node.js",
-            "SQL", "NoSQL", "MongoDB", "PostgreSQL", "MySQL",
-            "AWS", "Azure", "GCP", "Docker", "Kubernetes",
-            "Git", "CI/CD", "DevOps", "Agile", "Scrum",
-            "Machine Learning", "AI", "Data Science", "Analytics",
-            "REST", "API", "Microservices", "Cloud", "Linux"
-        ]
-        
         found_skills = []
         job_lower = job_description.lower()
         
-        for skill in common_skills:
+        for skill in SKILL_KEYWORDS:
             if skill.lower() in job_lower:
                 found_skills.append(skill)
         
@@ -290,15 +508,7 @@ class SkillGapService:
     async def _store_skill_gap_analysis(self, analysis_data: Dict[str, Any]) -> str:
         """Store skill gap analysis in database"""
         try:
-            query = """
-                INSERT INTO skill_gap_analysis (
-                    user_id, job_description_id, resume_id,
-                    critical_missing_skills, nice_to_have_missing_skills,
-                    skill_development_recommendations, learning_resources,
-                    timeline_for_acquisition, analysis_metadata
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """
+            query = "skill_gap_analysis.insert"
             
             metadata = {
                 "ai_model_used": analysis_data.get("ai_model_used", "gpt-3.5-turbo"),
@@ -313,12 +523,12 @@ class SkillGapService:
                     analysis_data["user_id"],
                     analysis_data["job_description_id"],
                     analysis_data["resume_id"],
-                    analysis_data.get("critical_missing_skills", []),
-                    analysis_data.get("nice_to_have_missing_skills", []),
-                    analysis_data.get("skill_development_recommendations", []),
-                    analysis_data.get("learning_resources", []),
+                    to_text_array(analysis_data.get("critical_missing_skills")),
+                    to_text_array(analysis_data.get("nice_to_have_missing_skills")),
+                    to_text_array(analysis_data.get("skill_development_recommendations")),
+                    to_text_array(analysis_data.get("learning_resources")),
                     analysis_data.get("timeline_for_acquisition", ""),
-                    json.dumps(metadata)
+                    metadata
                 )
             )
             
@@ -3,27 +3,102 @@ Multi-Tier Vector Service for Recruiter AI
 - Free Plan: Supabase Vector (pgvector)
 - Basic Plan: Pinecone (better performance)
 - Premium Plan: Pinecone + Advanced features
+- VECTOR_PROVIDER=local: an in-process ANN index (services/ann_index.py) for
+  every plan, persisted through Supabase and, with EMBEDDING_STORE_DIR, in a
+  memory-mapped file that is reloaded at startup (services/embedding_store.py)
 """
 
 import os
+import asyncio
 import logging
+import time
 import numpy as np
+from collections import OrderedDict
 from typing import List, Dict, Any, Tuple, Optional
 import json
 from datetime import datetime
 
+from services.ann_index import LocalVectorIndex
+from utils.openai_utils import generate_embeddings
+
 logger = logging.getLogger(__name__)
 
+# How a resume's chunk similarities to a job become one score
+POOLING_RULES = ("max", "mean", "topk")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale vectors (rows) to unit length so cosine similarity is a dot product; zero rows stay zero"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def cosine_to(matrix: np.ndarray, unit_vector: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row with a unit vector, without building a normalized copy of the matrix"""
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    return np.divide(matrix @ unit_vector, norms, out=np.zeros(len(matrix), dtype=np.float32), where=norms > 0)
+
+
+def pool_segments(similarities: np.ndarray, starts: np.ndarray, pooling: str = "max", top_k: int = 3) -> np.ndarray:
+    """
+    One score per resume from the chunk similarities of many resumes laid out
+    back to back (resume i owns similarities[starts[i]:starts[i + 1]], never
+    empty): max (best chunk), mean (all chunks) or topk (mean of the best top_k)
+    """
+    counts = np.diff(np.append(starts, similarities.size))
+    if pooling == "mean":
+        return np.add.reduceat(similarities, starts) / counts
+    if pooling == "topk":
+        segment = np.repeat(np.arange(starts.size), counts)
+        # Segments stay in place; within each, chunks are ranked best first
+        order = np.lexsort((-similarities, segment))
+        rank = np.arange(similarities.size) - np.repeat(starts, counts)
+        best = order[rank < top_k]
+        return np.bincount(segment[best], weights=similarities[best], minlength=starts.size) / np.minimum(counts, top_k)
+    return np.maximum.reduceat(similarities, starts)
+
+
 class VectorService:
     """
     Multi-tier vector service supporting different plans
     """
     
-    def __init__(self, db_service):
+    def __init__(self, db_service, local_index: bool = True):
+        """
+        Args:
+            db_service: DatabaseService
+            local_index: Host the in-process ANN index when VECTOR_PROVIDER=local. Only the
+                API process should: the index takes the EMBEDDING_STORE_DIR lock, and
+                other processes (queue workers) read and write Supabase directly.
+        """
         self.db = db_service
         self.pinecone_client = None
         self.pinecone_index = None
         
+        # Job-vs-resume similarity: chunk pooling rule and an LRU of computed scores
+        self.similarity_pooling = os.getenv("SIMILARITY_POOLING", "max").lower()
+        if self.similarity_pooling not in POOLING_RULES:
+            logger.warning(f"Unknown SIMILARITY_POOLING '{self.similarity_pooling}', using max")
+            self.similarity_pooling = "max"
+        self.similarity_top_k = int(os.getenv("SIMILARITY_TOP_K", "3"))
+        self.similarity_cache_size = int(os.getenv("SIMILARITY_CACHE_SIZE", "10000"))
+        self.similarity_cache_ttl = float(os.getenv("SIMILARITY_CACHE_TTL_SECONDS", "600"))
+        # (job_id, resume_id, model_version) -> (score, cached_at)
+        self._similarity_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, float]]" = OrderedDict()
+        self.similarity_stats = {"cache_hits": 0, "cache_misses": 0, "queries": 0, "jobs_embedded": 0}
+        # (job_id, model_version) -> task embedding that job, shared by concurrent misses
+        self._job_embedding_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        
+        # In-process ANN index serving every plan (filled by build_local_index);
+        # resumes stored while it is being built are skipped by the build scan
+        self.local_provider = os.getenv("VECTOR_PROVIDER", "").lower() == "local"
+        self.local_index = LocalVectorIndex() if self.local_provider and local_index else None
+        self._local_index_building = False
+        self._indexed_during_build: set = set()
+        # Catch-up scans of a reloaded store start this long before its last sync (clock skew)
+        self.store_sync_margin = float(os.getenv("EMBEDDING_STORE_SYNC_MARGIN_SECONDS", "300"))
+        
         # Initialize Pinecone for Basic/Premium plans
         self._initialize_pinecone()
         
@@ -51,6 +126,9 @@ class VectorService:
     
     def _get_vector_provider(self, plan_type: str) -> str:
         """Determine vector provider based on plan"""
+        if self.local_provider:
+            # Without the index in this process, use the Supabase tables it is built from
+            return "local" if self.local_index is not None else "supabase"
         plan_lower = plan_type.lower()
         
         if plan_lower == "free":
@@ -91,12 +169,16 @@ class VectorService:
         Store resume embeddings based on plan
         """
         try:
+            self.forget_similarities(resume_id=resume_id)
             provider = self._get_vector_provider(plan_type)
             
             if provider == "pinecone" and self.pinecone_index:
                 return await self._store_in_pinecone(resume_id, chunks, embeddings, plan_type)
-            else:
-                return await self._store_in_supabase(resume_id, chunks, embeddings, plan_type)
+            
+            stored = await self._store_in_supabase(resume_id, chunks, embeddings, plan_type)
+            if stored and provider == "local":
+                await self._index_locally([(resume_id, chunks, embeddings)], plan_type)
+            return stored
                 
         except Exception as e:
             logger.error(f"Error storing resume embeddings: {str(e)}")
@@ -128,8 +210,8 @@ class VectorService:
             # Upsert to Pinecone
             self.pinecone_index.upsert(vectors)
             
-            # Also store metadata in Supabase for backup
-            await self._store_metadata_in_supabase(resume_id, chunks, embeddings, plan_type, "pinecone")
+            # Mirror the chunks into Supabase: similarity scoring reads resume_embeddings
+            await self._store_in_supabase(resume_id, chunks, embeddings, plan_type)
             
             logger.info(f"Stored {len(embeddings)} embeddings in Pinecone for resume {resume_id}")
             return True
@@ -147,54 +229,174 @@ class VectorService:
     ) -> bool:
         """Store embeddings in Supabase Vector"""
         try:
-            embedding_data = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                embedding_data.append({
-                    "resume_id": resume_id,
-                    "chunk_index": i,
-                    "chunk_text": chunk,
-                    "embedding": embedding,
-                    "model_version": self._get_embedding_model(plan_type),
-                    "plan_type": plan_type,
-                    "created_at": datetime.utcnow().isoformat()
-                })
+            records = self._build_embedding_records(resume_id, chunks, embeddings, plan_type)
+            written = await self.db.copy_resume_embeddings(records)
             
-            success = await self.db.store_resume_embeddings(embedding_data)
-            
-            if success:
-                logger.info(f"Stored {len(embeddings)} embeddings in Supabase for resume {resume_id}")
-            
-            return success
+            logger.info(f"Stored {written} embeddings in Supabase for resume {resume_id}")
+            return True
             
         except Exception as e:
             logger.error(f"Error storing in Supabase: {str(e)}")
             return False
     
-    async def _store_metadata_in_supabase(
+    def _build_embedding_records(
         self,
         resume_id: str,
         chunks: List[str],
         embeddings: List[List[float]],
-        plan_type: str,
-        vector_provider: str
-    ) -> bool:
-        """Store metadata in Supabase for backup/reference"""
+        plan_type: str
+    ) -> List[tuple]:
+        """Build COPY rows for one resume (created_at is left to the column default)"""
+        model_version = self._get_embedding_model(plan_type)
+        return [
+            (resume_id, i, chunk, np.asarray(embedding, dtype=np.float32), model_version, plan_type)
+            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+        ]
+    
+    async def store_resume_embeddings_bulk(
+        self,
+        resumes: List[Tuple[str, List[str], List[List[float]]]],
+        plan_type: str = "free"
+    ) -> int:
+        """
+        Store embeddings for many resumes at once (backfills, bulk uploads)
+        
+        Args:
+            resumes: (resume_id, chunks, embeddings) per resume
+            plan_type: Subscription plan
+            
+        Returns:
+            Number of chunk embeddings stored
+        """
         try:
-            metadata = {
-                "resume_id": resume_id,
-                "vector_provider": vector_provider,
-                "chunk_count": len(chunks),
-                "embedding_dimensions": len(embeddings[0]) if embeddings else 0,
-                "model_version": self._get_embedding_model(plan_type),
-                "plan_type": plan_type,
-                "created_at": datetime.utcnow().isoformat()
-            }
+            for resume_id, _, _ in resumes:
+                self.forget_similarities(resume_id=resume_id)
+            provider = self._get_vector_provider(plan_type)
             
-            return await self.db.store_vector_metadata(metadata)
+            if provider == "pinecone" and self.pinecone_index:
+                stored = 0
+                for resume_id, chunks, embeddings in resumes:
+                    if await self._store_in_pinecone(resume_id, chunks, embeddings, plan_type):
+                        stored += len(embeddings)
+                return stored
+            
+            # Rows from every resume go into the same COPY batches
+            records = []
+            for resume_id, chunks, embeddings in resumes:
+                records.extend(self._build_embedding_records(resume_id, chunks, embeddings, plan_type))
+            
+            written = await self.db.copy_resume_embeddings(records)
+            logger.info(f"Bulk stored {written} embeddings in Supabase for {len(resumes)} resumes")
+            if provider == "local":
+                await self._index_locally(resumes, plan_type)
+            return written
             
         except Exception as e:
-            logger.error(f"Error storing metadata: {str(e)}")
-            return False
+            logger.error(f"Error bulk storing resume embeddings: {str(e)}")
+            return 0
+    
+    async def _index_locally(
+        self,
+        resumes: List[Tuple[str, List[str], List[List[float]]]],
+        plan_type: str
+    ):
+        """Put freshly stored resumes into the local ANN index, with their owners as filterable metadata"""
+        try:
+            model_version = self._get_embedding_model(plan_type)
+            rows = await self.db.fetch_all("embeddings.resume_owners", ([resume_id for resume_id, _, _ in resumes],))
+            owners = {str(row["id"]): row for row in rows}
+            
+            for resume_id, chunks, embeddings in resumes:
+                owner = owners.get(str(resume_id), {})
+                self.local_index.replace(model_version, str(resume_id), embeddings, chunks, {
+                    "user_id": str(owner["user_id"]) if owner.get("user_id") else None,
+                    "job_description_id": str(owner["job_description_id"]) if owner.get("job_description_id") else None,
+                    "plan_type": plan_type,
+                    "model_version": model_version
+                })
+                if self._local_index_building:
+                    self._indexed_during_build.add(str(resume_id))
+                    
+        except Exception as e:
+            # Stored in Supabase all the same; the next index build picks them up
+            logger.error(f"Error updating local vector index: {str(e)}")
+    
+    async def build_local_index(self) -> Dict[str, Any]:
+        """
+        Fill the local ANN index at startup. On-disk stores are mapped back in
+        and serve at once, then only chunks created since their last sync are
+        read from Postgres; without them every stored chunk is loaded and
+        each model's partition trained off the event loop, searches going to
+        Supabase until that finishes.
+        """
+        if self.local_index is None:
+            return {}
+        
+        started = time.perf_counter()
+        loaded = 0
+        current, chunk_indexes, chunk_texts, vectors, metadata = None, [], [], [], {}
+        self._local_index_building = True
+        
+        restored = self.local_index.load_stores()
+        synced_at = self.local_index.synced_at() if restored else None
+        if restored:
+            self.local_index.ready = True
+            logger.info(f"Local vector index serving {restored} chunks from disk after {time.perf_counter() - started:.2f}s")
+        created_after = datetime.utcfromtimestamp(synced_at - self.store_sync_margin) if synced_at else None
+        scan_started = time.time()
+        
+        def flush():
+            model_version, resume_id = current
+            if resume_id not in self._indexed_during_build:
+                index = self.local_index.index_for(model_version, len(vectors[0]))
+                # A reloaded store may hold an older version of the resume
+                add = index.replace if restored else index.add
+                add(resume_id, np.stack(vectors), chunk_indexes, chunk_texts, metadata)
+        
+        try:
+            async for row in self.db.iterate("embeddings.index_scan", (created_after,)):
+                key = (row["model_version"], str(row["resume_id"]))
+                if key != current:
+                    if current is not None:
+                        flush()
+                    current, chunk_indexes, chunk_texts, vectors = key, [], [], []
+                    metadata = {
+                        "user_id": str(row["user_id"]) if row["user_id"] else None,
+                        "job_description_id": str(row["job_description_id"]) if row["job_description_id"] else None,
+                        "plan_type": row["plan_type"],
+                        "model_version": row["model_version"]
+                    }
+                chunk_indexes.append(row["chunk_index"])
+                chunk_texts.append(row["chunk_text"] or "")
+                vectors.append(row["embedding"])
+                loaded += 1
+            if current is not None:
+                flush()
+            
+            for model_version in self.local_index.indexes:
+                self.local_index.schedule_training(model_version)
+            await self.local_index.wait_for_training()
+            self.local_index.ready = True
+            self.local_index.mark_synced(scan_started)
+            
+            stats = self.local_index.stats()
+            logger.info(
+                f"Local vector index built from {restored} stored and {loaded} scanned chunks "
+                f"in {time.perf_counter() - started:.1f}s: {stats['models']}"
+            )
+            return stats
+            
+        except Exception as e:
+            logger.error(f"Error building local vector index after {loaded} chunks: {str(e)}")
+            return {}
+        finally:
+            self._local_index_building = False
+            self._indexed_during_build.clear()
+    
+    def close(self):
+        """Release the local index's on-disk stores (shutdown)"""
+        if self.local_index is not None:
+            self.local_index.close()
     
     async def find_similar_candidates(
         self,
@@ -214,6 +416,8 @@ class VectorService:
             
             if provider == "pinecone" and self.pinecone_index:
                 return await self._search_pinecone(job_embedding, limit, threshold, filters)
+            elif provider == "local" and self.local_index.ready:
+                return self._search_local(job_embedding, limit, threshold, plan_type, filters)
             else:
                 return await self._search_supabase(job_embedding, limit, threshold, filters)
                 
@@ -265,6 +469,38 @@ class VectorService:
             logger.error(f"Error searching Pinecone: {str(e)}")
             return []
     
+    def _search_local(
+        self,
+        job_embedding: List[float],
+        limit: int,
+        threshold: float,
+        plan_type: str,
+        filters: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """Search the in-process ANN index (best chunk per resume)"""
+        try:
+            matches = self.local_index.search(self._get_embedding_model(plan_type), job_embedding, limit, threshold, filters)
+            
+            processed_results = []
+            for match in matches:
+                similarity_score = match["similarity"]
+                processed_results.append({
+                    "resume_id": match["resume_id"],
+                    "similarity_score": similarity_score,
+                    "match_percentage": round(similarity_score * 100, 2),
+                    "chunk_text": match["chunk_text"],
+                    "model_version": match["model_version"],
+                    "metadata": match["metadata"],
+                    "vector_provider": "local"
+                })
+            
+            logger.info(f"Found {len(processed_results)} candidates using the local index")
+            return processed_results
+            
+        except Exception as e:
+            logger.error(f"Error searching local index: {str(e)}")
+            return []
+    
     async def _search_supabase(
         self,
         job_embedding: List[float],
@@ -302,6 +538,173 @@ class VectorService:
             logger.error(f"Error searching Supabase: {str(e)}")
             return []
     
+    async def calculate_similarity_score(
+        self,
+        resume_id: str,
+        job_description_id: str,
+        plan_type: str = "free"
+    ) -> float:
+        """
+        Cosine similarity (about 0-1) between a job description and a resume:
+        the resume's chunk similarities to the job embedding, pooled by
+        SIMILARITY_POOLING (max | mean | topk). Scores are cached; a miss costs
+        one query. 0.0 if either side has no embedding for the plan's model.
+        """
+        scores = await self.calculate_similarity_scores(job_description_id, [resume_id], plan_type)
+        return scores[str(resume_id)]
+    
+    async def calculate_similarity_scores(
+        self,
+        job_description_id: str,
+        resume_ids: List[str],
+        plan_type: str = "free"
+    ) -> Dict[str, float]:
+        """
+        calculate_similarity_score for one job and many resumes: uncached
+        resumes are fetched in one query and scored with one matrix-vector
+        product over all their chunks, pooled per resume
+        
+        Returns:
+            Score per resume ID (as str); 0.0 for resumes without embeddings
+        """
+        model_version = self._get_embedding_model(plan_type)
+        scores: Dict[str, float] = {}
+        uncached = []
+        for resume_id in dict.fromkeys(str(resume_id) for resume_id in resume_ids):
+            cached = self._get_cached_similarity((str(job_description_id), resume_id, model_version))
+            if cached is None:
+                uncached.append(resume_id)
+            else:
+                scores[resume_id] = cached
+        
+        if uncached:
+            try:
+                job_vector, scored_ids, starts, chunks = await self._load_similarity_inputs(
+                    job_description_id, uncached, model_version
+                )
+            except Exception as e:
+                logger.error(f"Error loading embeddings for similarity: {str(e)}")
+                job_vector, scored_ids = None, []
+            
+            if job_vector is None and scored_ids:
+                job_vector = await self._embed_job(job_description_id, plan_type)
+            
+            if job_vector is not None and scored_ids:
+                if chunks.shape[1] != job_vector.shape[0]:
+                    logger.warning(f"Embedding dimensions differ for job {job_description_id} and its resumes")
+                else:
+                    pooled = pool_segments(cosine_to(chunks, job_vector), starts, self.similarity_pooling, self.similarity_top_k)
+                    for resume_id, score in zip(scored_ids, np.round(pooled.astype(np.float64), 4).tolist()):
+                        scores[resume_id] = score
+                        self._cache_similarity((str(job_description_id), resume_id, model_version), score)
+        
+        return {str(resume_id): scores.get(str(resume_id), 0.0) for resume_id in resume_ids}
+    
+    async def _load_similarity_inputs(
+        self,
+        job_description_id: str,
+        resume_ids: List[str],
+        model_version: str
+    ) -> Tuple[Optional[np.ndarray], List[str], np.ndarray, np.ndarray]:
+        """
+        From one query: the normalized job embedding, the IDs of resumes that
+        have chunks, where each one's chunks start, and all their chunk
+        embeddings stacked in that order (total chunks x dims)
+        """
+        self.similarity_stats["queries"] += 1
+        rows = await self.db.fetch_all(
+            "embeddings.similarity_inputs", (job_description_id, list(resume_ids), model_version)
+        )
+        
+        job_vector = None
+        chunk_vectors: Dict[str, List[np.ndarray]] = {}
+        for row in rows:
+            if row["resume_id"] is None:
+                job_vector = normalize_rows(row["embedding"])
+            else:
+                chunk_vectors.setdefault(str(row["resume_id"]), []).append(row["embedding"])
+        
+        if not chunk_vectors:
+            return job_vector, [], np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+        
+        counts = [len(vectors) for vectors in chunk_vectors.values()]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        chunks = np.vstack([vector for vectors in chunk_vectors.values() for vector in vectors]).astype(np.float32, copy=False)
+        return job_vector, list(chunk_vectors), starts, chunks
+    
+    async def _embed_job(self, job_description_id: str, plan_type: str) -> Optional[np.ndarray]:
+        """
+        Embed a job description that has no embedding for the plan's model yet
+        and store it, so later scores read it with the resume chunks. Concurrent
+        misses for the same job share one embedding call.
+        """
+        key = (str(job_description_id), self._get_embedding_model(plan_type))
+        task = self._job_embedding_tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._create_job_embedding(job_description_id, plan_type))
+            self._job_embedding_tasks[key] = task
+            task.add_done_callback(lambda _: self._job_embedding_tasks.pop(key, None))
+        
+        embedding = await asyncio.shield(task)
+        return normalize_rows(np.asarray(embedding, dtype=np.float32)) if embedding is not None else None
+    
+    async def _create_job_embedding(self, job_description_id: str, plan_type: str) -> Optional[List[float]]:
+        try:
+            job = await self.db.load("job", job_description_id)
+            if not job:
+                return None
+            
+            job_text = (
+                f"Job Title: {job['title']}\n\n"
+                f"Job Description:\n{job['description']}\n\n"
+                f"Requirements:\n{job['requirements'] or 'Not specified'}"
+            )
+            embeddings, _ = await generate_embeddings([job_text], plan_type, model=self._get_embedding_model(plan_type))
+            embedding = embeddings[0]
+            if not any(embedding):
+                # generate_embeddings falls back to a zero vector on API errors
+                return None
+            
+            self.similarity_stats["jobs_embedded"] += 1
+            # Postgres only: scoring reads it there, and job vectors don't belong in the resume index
+            await self.db.store_job_embeddings({
+                "job_description_id": str(job_description_id),
+                "job_text": job_text,
+                "embedding": embedding,
+                "model_version": self._get_embedding_model(plan_type),
+                "plan_type": plan_type,
+                "vector_provider": "supabase"
+            })
+            return embedding
+            
+        except Exception as e:
+            logger.error(f"Error embedding job {job_description_id}: {str(e)}")
+            return None
+    
+    def _get_cached_similarity(self, key: Tuple[str, str, str]) -> Optional[float]:
+        entry = self._similarity_cache.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.similarity_cache_ttl:
+            self.similarity_stats["cache_misses"] += 1
+            return None
+        self._similarity_cache.move_to_end(key)
+        self.similarity_stats["cache_hits"] += 1
+        return entry[0]
+    
+    def _cache_similarity(self, key: Tuple[str, str, str], score: float):
+        self._similarity_cache[key] = (score, time.monotonic())
+        self._similarity_cache.move_to_end(key)
+        while len(self._similarity_cache) > self.similarity_cache_size:
+            self._similarity_cache.popitem(last=False)
+    
+    def forget_similarities(self, resume_id: Optional[str] = None, job_id: Optional[str] = None):
+        """Drop cached scores of a resume or job whose embeddings changed"""
+        stale = [
+            key for key in self._similarity_cache
+            if (resume_id is not None and key[1] == str(resume_id)) or (job_id is not None and key[0] == str(job_id))
+        ]
+        for key in stale:
+            del self._similarity_cache[key]
+    
     async def store_job_embeddings(
         self,
         job_id: str,
@@ -311,6 +714,7 @@ class VectorService:
     ) -> bool:
         """Store job description embeddings"""
         try:
+            self.forget_similarities(job_id=job_id)
             provider = self._get_vector_provider(plan_type)
             
             if provider == "pinecone" and self.pinecone_index:
@@ -361,8 +765,18 @@ class VectorService:
                 "pinecone": {
                     "available": self.pinecone_index is not None,
                     "plans": ["basic", "premium"]
+                },
+                "local": {
+                    "available": self.local_index is not None,
+                    "plans": ["free", "basic", "premium"],
+                    **(self.local_index.stats() if self.local_index is not None else {})
                 }
             }
+            stats["similarity"] = {
+                "pooling": self.similarity_pooling,
+                "cached_scores": len(self._similarity_cache),
+                **self.similarity_stats
+            }
             
             return stats
             
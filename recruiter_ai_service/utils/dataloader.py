@@ -0,0 +1,153 @@
+"""
+Request/job-scoped entity loader for Recruiter AI
+Batches and memoizes row fetches by ID (resume, job, analysis) so every
+service taking part in one API request or one queue job shares the same
+reads instead of re-fetching identical rows.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Dict, Any, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Entity kind -> registry query taking a uuid[] of IDs
+LOADER_QUERIES = {
+    "resume": "resumes.get_many",
+    "job": "job_descriptions.get_many",
+    "analysis": "resume_analysis.get_many_with_resume"
+}
+
+# Entity kind -> single-row registry query used outside a loader scope
+SINGLE_ROW_QUERIES = {
+    "resume": "resumes.get_by_id",
+    "job": "job_descriptions.get_by_id",
+    "analysis": "resume_analysis.get_with_resume"
+}
+
+
+def normalize_id(entity_id: Any) -> str:
+    """Canonical text of an entity ID: lower-case, hyphenated UUID (braces and urn: prefix dropped)"""
+    try:
+        return str(entity_id if isinstance(entity_id, uuid.UUID) else uuid.UUID(str(entity_id)))
+    except ValueError:
+        return str(entity_id)
+
+
+class EntityLoader:
+    """
+    Collects every load() issued in the same event-loop tick into one
+    `WHERE id = ANY($1)` query per entity kind, and memoizes the result for
+    the lifetime of the scope. Rows are handed out as shallow copies so a
+    caller mutating its dict cannot affect other services.
+    """
+
+    def __init__(self, db_service):
+        self.db = db_service
+        self._cache: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._pending: Dict[str, Dict[str, asyncio.Future]] = {}
+        # Dispatch tasks in flight; holding them keeps them from being garbage collected
+        self._dispatches: Set[asyncio.Task] = set()
+        self.stats = {
+            "loads": 0,
+            "memo_hits": 0,
+            "batched_queries": 0,
+            "rows_fetched": 0
+        }
+
+    @property
+    def reads_avoided(self) -> int:
+        """Loads answered from the memo (or an identical load in flight) without querying"""
+        return self.stats["memo_hits"]
+
+    async def load(self, kind: str, entity_id: Any) -> Optional[Dict[str, Any]]:
+        """Load one entity row by ID (None if it doesn't exist)"""
+        if kind not in LOADER_QUERIES:
+            raise ValueError(f"Unknown entity kind: {kind}")
+
+        key = normalize_id(entity_id)
+        self.stats["loads"] += 1
+
+        cache = self._cache.setdefault(kind, {})
+        future = cache.get(key)
+
+        memoized = future is not None
+        if not memoized:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            cache[key] = future
+
+            pending = self._pending.setdefault(kind, {})
+            pending[key] = future
+            if len(pending) == 1:
+                # First miss this tick: dispatch once everything queued in this tick has joined
+                loop.call_soon(self._start_dispatch, kind)
+
+        row = await future
+        if memoized:
+            self.stats["memo_hits"] += 1
+        return dict(row) if row else None
+
+    async def load_many(self, kind: str, entity_ids: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        """Load several entities, batched into a single query"""
+        return list(await asyncio.gather(*(self.load(kind, entity_id) for entity_id in entity_ids)))
+
+    def prime(self, kind: str, entity_id: Any, row: Optional[Dict[str, Any]]):
+        """Seed the memo with a row the caller already has (e.g. just written)"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(row)
+        self._cache.setdefault(kind, {})[normalize_id(entity_id)] = future
+
+    def clear(self, kind: str, entity_id: Any):
+        """Forget a memoized row after it has been modified"""
+        self._cache.get(kind, {}).pop(normalize_id(entity_id), None)
+
+    def _start_dispatch(self, kind: str):
+        task = asyncio.get_running_loop().create_task(self._dispatch(kind))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self._dispatches.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # _dispatch resolves its waiters itself; anything escaping it is a bug worth seeing
+            logger.error(f"Entity loader dispatch failed: {task.exception()}")
+
+    async def _dispatch(self, kind: str):
+        """Fetch every pending ID of one kind in a single query and resolve the waiters"""
+        pending = self._pending.pop(kind, {})
+        if not pending:
+            return
+
+        ids = []
+        for key, future in pending.items():
+            try:
+                ids.append(uuid.UUID(key))
+            except ValueError:
+                # Not a valid ID: nothing to fetch, and it must not poison the batch
+                future.set_result(None)
+
+        if not ids:
+            return
+
+        try:
+            rows = await self.db.fetch_all(LOADER_QUERIES[kind], (ids,))
+        except Exception as e:
+            for key, future in pending.items():
+                if not future.done():
+                    future.set_exception(e)
+                self.clear(kind, key)
+            return
+
+        self.stats["batched_queries"] += 1
+        self.stats["rows_fetched"] += len(rows)
+
+        by_id = {str(row["id"]): row for row in rows}
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(by_id.get(key))
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for logging/monitoring"""
+        return {**self.stats, "reads_avoided": self.reads_avoided}
@@ -0,0 +1,80 @@
+"""
+Lightweight in-process metrics for Recruiter AI
+Fixed-bucket histograms cheap enough to record on every query or job
+"""
+
+import bisect
+from typing import Dict, Any, List, Sequence
+
+# Default bucket upper bounds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ROW_COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+DURATION_BUCKETS_S = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Histogram:
+    """
+    Fixed-bucket (non-cumulative) histogram.
+    Each observation lands in the first bucket whose upper bound is >= value;
+    values above the last bound go to the overflow ("+Inf") bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets: List[float] = sorted(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float) -> float:
+        """Approximate percentile as the upper bound of the bucket containing it"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(self.buckets[index]) if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view of the histogram"""
+        bucket_labels = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip(bucket_labels, self.counts))
+        }
+
+
+def merge_snapshots(snapshots: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine snapshots of histograms with the same buckets (e.g. one per worker process)"""
+    snapshots = [snapshot for snapshot in snapshots if snapshot and snapshot.get("buckets")]
+    if not snapshots:
+        return Histogram(()).snapshot()
+
+    labels = list(snapshots[0]["buckets"])
+    # Rebuild bounds so merged labels read like the originals ("5", not "5.0")
+    bounds = [float(label) for label in labels if label != "+Inf"]
+    merged = Histogram([int(bound) if bound.is_integer() else bound for bound in bounds])
+    for snapshot in snapshots:
+        for index, label in enumerate(labels):
+            merged.counts[index] += snapshot["buckets"].get(label, 0)
+        merged.count += snapshot["count"]
+        merged.total += snapshot["sum"]
+        merged.max = max(merged.max, snapshot["max"])
+    return merged.snapshot()
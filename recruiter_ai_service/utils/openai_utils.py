@@ -30,7 +30,8 @@ MODEL_MAP = {
 MODEL_COST_PER_1K = {
     "gpt-3.5-turbo": 0.0015,
     "gpt-4": 0.03,
-    "text-embedding-ada-002": 0.0001
+    "text-embedding-ada-002": 0.0001,
+    "text-embedding-3-large": 0.00013
 }
 
 def get_model_for_plan(plan: str) -> str:
@@ -140,7 +141,8 @@ async def call_openai_with_cache(
 async def generate_embeddings(
     texts: list,
     plan: str = "free",
-    cache_service=None
+    cache_service=None,
+    model: str = "text-embedding-ada-002"
 ) -> Tuple[list, float]:
     """
     Generate embeddings for texts with caching
@@ -149,11 +151,11 @@ async def generate_embeddings(
         texts: List of texts to embed
         plan: Subscription plan
         cache_service: Cache service instance
+        model: Embedding model
         
     Returns:
         Tuple of (embeddings_list, total_cost)
     """
-    model = "text-embedding-ada-002"
     cost_per_1k = get_cost_per_1k(model)
     
     embeddings = []
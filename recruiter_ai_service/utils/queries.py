@@ -0,0 +1,512 @@
+"""
+Named SQL registry for Recruiter AI
+Every statement the service runs lives here under a stable name so it can be
+prepared once per connection at pool init and instrumented per name.
+All statements use asyncpg-style $n placeholders.
+"""
+
+from typing import Dict, FrozenSet
+
+QUERIES: Dict[str, str] = {
+    # ------------------------------------------------------------------
+    # Health
+    # ------------------------------------------------------------------
+    "health.ping": "SELECT 1",
+    "replication.lag": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+        END AS lag_seconds
+    """,
+
+    # ------------------------------------------------------------------
+    # Resumes
+    # ------------------------------------------------------------------
+    "resumes.insert": """
+        INSERT INTO resumes (
+            user_id, job_description_id, file_name, file_path,
+            parsed_text, extracted_data, processing_status
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+        RETURNING id
+    """,
+    "resumes.get_by_id": """
+        SELECT id, user_id, job_description_id, file_name,
+               parsed_text, extracted_data, created_at
+        FROM resumes
+        WHERE id = $1
+    """,
+    "resumes.get_many": """
+        SELECT id, user_id, job_description_id, file_name,
+               parsed_text, extracted_data, created_at
+        FROM resumes
+        WHERE id = ANY($1::uuid[])
+    """,
+    "resumes.get_candidate_with_scores": """
+        SELECT r.file_name, r.extracted_data, ra.match_score,
+               ra.skill_match_score, ra.experience_score, ra.education_score
+        FROM resumes r
+        LEFT JOIN resume_analysis ra ON r.id = ra.resume_id
+        WHERE r.id = $1
+    """,
+    "resumes.list_by_user": """
+        SELECT id, file_name, extracted_data, created_at
+        FROM resumes
+        WHERE user_id = $1
+        ORDER BY created_at DESC
+    """,
+    "resumes.list_by_user_and_job": """
+        SELECT id, file_name, extracted_data, created_at
+        FROM resumes
+        WHERE user_id = $1 AND job_description_id = $2
+        ORDER BY created_at DESC
+    """,
+    # Keyset pages: trailing params are (after_created_at, after_id, page_size),
+    # both cursor values NULL for the first page (see DatabaseService.stream)
+    "resumes.page_by_user": """
+        SELECT id, job_description_id, file_name, extracted_data, created_at,
+               CASE WHEN $3::bool THEN parsed_text END AS parsed_text
+        FROM resumes
+        WHERE user_id = $1
+          AND ($2::uuid IS NULL OR job_description_id = $2::uuid)
+          AND ($5::uuid IS NULL OR (created_at, id) < ($4, $5::uuid))
+        ORDER BY created_at DESC, id DESC
+        LIMIT $6
+    """,
+    "resumes.candidate_pool_page": """
+        SELECT r.id, r.file_name, r.extracted_data, r.created_at,
+               CASE WHEN $4::bool THEN r.parsed_text END AS parsed_text
+        FROM resumes r
+        WHERE r.user_id = $1
+          AND ($2::text[] IS NULL OR r.extracted_data->'skills' ?| $2::text[])
+          AND ($3::int IS NULL OR jsonb_array_length(r.extracted_data->'experience') >= $3::int)
+          AND ($6::uuid IS NULL OR (r.created_at, r.id) < ($5, $6::uuid))
+        ORDER BY r.created_at DESC, r.id DESC
+        LIMIT $7
+    """,
+
+    # ------------------------------------------------------------------
+    # Job descriptions
+    # ------------------------------------------------------------------
+    "job_descriptions.get_by_id": """
+        SELECT id, user_id, title, description, requirements,
+               company_name, location, created_at
+        FROM job_descriptions
+        WHERE id = $1
+    """,
+    "job_descriptions.get_many": """
+        SELECT id, user_id, title, description, requirements,
+               company_name, location, created_at
+        FROM job_descriptions
+        WHERE id = ANY($1::uuid[])
+    """,
+
+    # ------------------------------------------------------------------
+    # Analysis results
+    # ------------------------------------------------------------------
+    "resume_analysis.insert": """
+        INSERT INTO resume_analysis (
+            user_id, job_description_id, resume_id,
+            match_score, skill_match_score, experience_score,
+            education_score, ats_compliance_score,
+            missing_skills, matching_skills, ai_summary,
+            ai_feedback, strengths, weaknesses, recommendations,
+            analysis_metadata
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
+        RETURNING id
+    """,
+    "resume_analysis.get_for_processing_job": """
+        SELECT id
+        FROM resume_analysis
+        WHERE resume_id = $1 AND analysis_metadata->>'processing_job_id' = $2
+        LIMIT 1
+    """,
+    "resume_analysis.list_by_processing_job": """
+        SELECT id, user_id, resume_id, job_description_id, created_at,
+               match_score, skill_match_score, experience_score,
+               education_score, ats_compliance_score,
+               missing_skills, matching_skills, ai_summary, ai_feedback,
+               strengths, weaknesses, recommendations, analysis_metadata
+        FROM resume_analysis
+        WHERE user_id = $1 AND job_description_id = $2
+          AND analysis_metadata->>'processing_job_id' = $3
+    """,
+    # Newest analysis per resume for one user, JD and plan, if stored within the
+    # last $5 seconds (bulk items reused from an overlapping job)
+    "resume_analysis.list_reusable": """
+        SELECT DISTINCT ON (resume_id)
+               id, user_id, resume_id, job_description_id, created_at,
+               match_score, skill_match_score, experience_score,
+               education_score, ats_compliance_score,
+               missing_skills, matching_skills, ai_summary, ai_feedback,
+               strengths, weaknesses, recommendations, analysis_metadata
+        FROM resume_analysis
+        WHERE user_id = $1 AND job_description_id = $2
+          AND resume_id = ANY($3::uuid[])
+          AND analysis_metadata->>'plan_type' = $4
+          AND created_at > NOW() - make_interval(secs => $5)
+        ORDER BY resume_id, created_at DESC
+    """,
+    "resume_analysis.list_by_user": """
+        SELECT ra.*, r.file_name, jd.title as job_title
+        FROM resume_analysis ra
+        JOIN resumes r ON ra.resume_id = r.id
+        JOIN job_descriptions jd ON ra.job_description_id = jd.id
+        WHERE ra.user_id = $1
+        ORDER BY ra.created_at DESC
+    """,
+    "resume_analysis.list_by_user_and_job": """
+        SELECT ra.*, r.file_name, jd.title as job_title
+        FROM resume_analysis ra
+        JOIN resumes r ON ra.resume_id = r.id
+        JOIN job_descriptions jd ON ra.job_description_id = jd.id
+        WHERE ra.user_id = $1 AND ra.job_description_id = $2
+        ORDER BY ra.created_at DESC
+    """,
+    "resume_analysis.page_by_user": """
+        SELECT ra.id, ra.resume_id, ra.job_description_id, ra.created_at,
+               ra.match_score, ra.skill_match_score, ra.experience_score,
+               ra.education_score, ra.ats_compliance_score,
+               ra.missing_skills, ra.matching_skills, ra.ai_summary,
+               CASE WHEN $3::bool THEN ra.ai_feedback END AS ai_feedback,
+               CASE WHEN $3::bool THEN ra.strengths END AS strengths,
+               CASE WHEN $3::bool THEN ra.weaknesses END AS weaknesses,
+               CASE WHEN $3::bool THEN ra.recommendations END AS recommendations,
+               CASE WHEN $3::bool THEN ra.analysis_metadata END AS analysis_metadata,
+               r.file_name, jd.title as job_title
+        FROM resume_analysis ra
+        JOIN resumes r ON ra.resume_id = r.id
+        JOIN job_descriptions jd ON ra.job_description_id = jd.id
+        WHERE ra.user_id = $1
+          AND ($2::uuid IS NULL OR ra.job_description_id = $2::uuid)
+          AND ($5::uuid IS NULL OR (ra.created_at, ra.id) < ($4, $5::uuid))
+        ORDER BY ra.created_at DESC, ra.id DESC
+        LIMIT $6
+    """,
+    "resume_analysis.get_with_resume": """
+        SELECT ra.*, r.file_name, r.extracted_data
+        FROM resume_analysis ra
+        JOIN resumes r ON ra.resume_id = r.id
+        WHERE ra.id = $1
+    """,
+    "resume_analysis.get_many_with_resume": """
+        SELECT ra.*, r.file_name, r.extracted_data
+        FROM resume_analysis ra
+        JOIN resumes r ON ra.resume_id = r.id
+        WHERE ra.id = ANY($1::uuid[])
+    """,
+    "skill_gap_analysis.insert": """
+        INSERT INTO skill_gap_analysis (
+            user_id, job_description_id, resume_id,
+            critical_missing_skills, nice_to_have_missing_skills,
+            skill_development_recommendations, learning_resources,
+            timeline_for_acquisition, analysis_metadata
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+        RETURNING id
+    """,
+    "candidate_comparisons.insert": """
+        INSERT INTO candidate_comparisons (
+            user_id, job_description_id, resume_ids,
+            comparison_result, ranking, ai_insights
+        ) VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id
+    """,
+    "candidate_comparisons.insert_with_metadata": """
+        INSERT INTO candidate_comparisons (
+            user_id, job_description_id, resume_ids,
+            comparison_result, ranking, ai_insights, comparison_metadata
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+        RETURNING id
+    """,
+    "generated_reports.insert": """
+        INSERT INTO generated_reports (
+            user_id, job_description_id, report_type,
+            report_content, report_metadata
+        ) VALUES ($1, $2, $3, $4, $5)
+        RETURNING id
+    """,
+
+    # ------------------------------------------------------------------
+    # Embeddings
+    # ------------------------------------------------------------------
+    # Inputs of a job-vs-resumes similarity in one round-trip: the job's latest
+    # embedding (resume_id NULL) followed by every chunk of the resumes, all of
+    # the same embedding model
+    "embeddings.similarity_inputs": """
+        SELECT NULL::uuid AS resume_id, NULL::int AS chunk_index, job.embedding
+        FROM (
+            SELECT embedding
+            FROM job_embeddings
+            WHERE job_description_id = $1 AND model_version = $3
+            ORDER BY created_at DESC
+            LIMIT 1
+        ) job
+        UNION ALL
+        SELECT resume_id, chunk_index, embedding
+        FROM resume_embeddings
+        WHERE resume_id = ANY($2::uuid[]) AND model_version = $3
+    """,
+    # Local ANN index build: every stored chunk (or those created after $1, to
+    # catch an on-disk store up) with its resume's owner, grouped by model and
+    # resume (streamed through a cursor, see VectorService.build_local_index)
+    "embeddings.index_scan": """
+        SELECT e.model_version, e.resume_id, e.chunk_index, LEFT(e.chunk_text, 1000) AS chunk_text,
+               e.embedding, e.plan_type, r.user_id, r.job_description_id
+        FROM resume_embeddings e
+        JOIN resumes r ON r.id = e.resume_id
+        WHERE $1::timestamp IS NULL OR e.created_at > $1::timestamp
+        ORDER BY e.model_version, e.resume_id, e.chunk_index
+    """,
+    "embeddings.insert_job": """
+        INSERT INTO job_embeddings (job_description_id, embedding, metadata, model_version)
+        VALUES ($1, $2, $3, $4)
+        RETURNING id
+    """,
+    "embeddings.resume_owners": """
+        SELECT id, user_id, job_description_id
+        FROM resumes
+        WHERE id = ANY($1::uuid[])
+    """,
+
+    # ------------------------------------------------------------------
+    # AI cache
+    # ------------------------------------------------------------------
+    "ai_cache.get": """
+        SELECT output_data, model_used, tokens_used, cost_usd, expires_at
+        FROM ai_cache
+        WHERE cache_key = $1 AND cache_type = $2 AND expires_at > NOW()
+    """,
+    "ai_cache.upsert": """
+        INSERT INTO ai_cache (
+            cache_key, cache_type, input_hash, output_data,
+            model_used, tokens_used, cost_usd, expires_at
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT (cache_key) DO UPDATE SET
+            output_data = EXCLUDED.output_data,
+            model_used = EXCLUDED.model_used,
+            tokens_used = EXCLUDED.tokens_used,
+            cost_usd = EXCLUDED.cost_usd,
+            expires_at = EXCLUDED.expires_at,
+            updated_at = NOW()
+    """,
+    "ai_cache.stats": """
+        SELECT
+            cache_type,
+            COUNT(*) as total_entries,
+            COUNT(CASE WHEN expires_at > NOW() THEN 1 END) as active_entries,
+            SUM(tokens_used) as total_tokens,
+            SUM(cost_usd) as total_cost_saved,
+            AVG(cost_usd) as avg_cost_per_entry
+        FROM ai_cache
+        GROUP BY cache_type
+    """,
+    "ai_cache.delete_expired": "DELETE FROM ai_cache WHERE expires_at <= NOW()",
+    "ai_cache.delete_by_type": "DELETE FROM ai_cache WHERE cache_type = $1",
+
+    # ------------------------------------------------------------------
+    # Processing jobs (queue worker)
+    # ------------------------------------------------------------------
+    # Jobs submitted to the in-process queue (QUEUE_BACKEND=memory); the .NET API creates its own
+    "processing_jobs.create": """
+        INSERT INTO processing_jobs (id, user_id, job_type, status, priority, total_items, job_data)
+        VALUES ($1, $2, $3, 'queued', $4, $5, $6)
+    """,
+    "processing_job_items.create_many": """
+        INSERT INTO processing_job_items (job_id, item_id, item_type)
+        SELECT $1, item_id, $3
+        FROM unnest($2::text[]) AS item_id
+    """,
+    "processing_jobs.update_status": """
+        UPDATE processing_jobs
+        SET status = $1,
+            started_at = CASE WHEN $1 = 'processing' THEN NOW() ELSE started_at END,
+            completed_at = CASE WHEN $1 IN ('completed', 'failed', 'cancelled') THEN NOW() ELSE completed_at END,
+            updated_at = NOW()
+        WHERE id = $2
+    """,
+    "processing_jobs.get_status": "SELECT status FROM processing_jobs WHERE id = $1",
+    "processing_jobs.update_progress": """
+        UPDATE processing_jobs
+        SET processed_items = $1,
+            failed_items = $2,
+            progress_percentage = $3,
+            updated_at = NOW()
+        WHERE id = $4
+    """,
+    "processing_jobs.complete": """
+        UPDATE processing_jobs
+        SET status = 'completed',
+            result_data = $1,
+            completed_at = NOW(),
+            updated_at = NOW()
+        WHERE id = $2
+    """,
+    "processing_jobs.fail": """
+        UPDATE processing_jobs
+        SET status = 'failed',
+            error_message = $1,
+            completed_at = NOW(),
+            updated_at = NOW()
+        WHERE id = $2
+    """,
+    # Duplicate jobs following a running job (services/job_coalescer.py); the follower
+    # row is what gets settled when the leader finishes, fails or goes away
+    "processing_jobs.follow": """
+        UPDATE processing_jobs
+        SET status = 'processing',
+            started_at = NOW(),
+            coalesced_with = $2,
+            coalesced_payload = $3,
+            updated_at = NOW()
+        WHERE id = $1
+    """,
+    # A former leader that now follows another job hands its own followers over
+    "processing_jobs.move_followers": """
+        UPDATE processing_jobs
+        SET coalesced_with = $2,
+            updated_at = NOW()
+        WHERE coalesced_with = $1 AND status = 'processing'
+    """,
+    "processing_jobs.complete_followers": """
+        UPDATE processing_jobs
+        SET status = 'completed',
+            result_data = $2,
+            completed_at = NOW(),
+            updated_at = NOW()
+        WHERE coalesced_with = $1 AND status = 'processing'
+        RETURNING id
+    """,
+    "processing_jobs.fail_followers": """
+        UPDATE processing_jobs
+        SET status = 'failed',
+            error_message = $2,
+            completed_at = NOW(),
+            updated_at = NOW()
+        WHERE coalesced_with = $1 AND status = 'processing'
+        RETURNING id, coalesced_payload
+    """,
+    # Followers that must run on their own again, with the payload to enqueue
+    "processing_jobs.detach_followers": """
+        WITH detached AS (
+            SELECT id, coalesced_payload
+            FROM processing_jobs
+            WHERE coalesced_with = $1 AND status = 'processing'
+            FOR UPDATE
+        )
+        UPDATE processing_jobs p
+        SET status = 'queued',
+            coalesced_with = NULL,
+            coalesced_payload = NULL,
+            updated_at = NOW()
+        FROM detached d
+        WHERE p.id = d.id
+        RETURNING d.id, d.coalesced_payload
+    """,
+    # One follower payload per leader, to check whether the leader still holds its claim
+    "processing_jobs.list_followed_leaders": """
+        SELECT DISTINCT ON (coalesced_with) coalesced_with AS leader_id, coalesced_payload
+        FROM processing_jobs
+        WHERE coalesced_with IS NOT NULL AND status = 'processing'
+    """,
+    # Replayed from the dead-letter queue
+    "processing_jobs.requeue": """
+        UPDATE processing_jobs
+        SET status = 'queued',
+            error_message = NULL,
+            completed_at = NULL,
+            updated_at = NOW()
+        WHERE id = $1
+    """,
+    "processing_jobs.fail_timed_out": """
+        UPDATE processing_jobs
+        SET status = 'failed',
+            error_message = 'Job timed out',
+            completed_at = NOW(),
+            updated_at = NOW()
+        WHERE status = 'processing'
+        AND started_at < NOW() - INTERVAL '30 minutes'
+    """,
+    "processing_jobs.delete_expired": """
+        DELETE FROM processing_jobs
+        WHERE expires_at < NOW()
+        AND status IN ('completed', 'failed', 'cancelled')
+    """,
+    # One round-trip for a batch of item status changes plus the job counters.
+    # Items arrive as parallel arrays; result_data is JSON text (NULL if none).
+    "processing_jobs.flush_progress": """
+        WITH item_updates AS (
+            UPDATE processing_job_items i
+            SET status = u.status,
+                result_data = u.result_data::jsonb,
+                error_message = u.error_message,
+                started_at = COALESCE(i.started_at, NOW()),
+                completed_at = CASE WHEN u.status IN ('completed', 'failed') THEN NOW() ELSE i.completed_at END
+            FROM unnest($2::text[], $3::text[], $4::text[], $5::text[])
+                AS u(item_id, status, result_data, error_message)
+            WHERE i.job_id = $1 AND i.item_id = u.item_id
+            RETURNING i.item_id
+        )
+        UPDATE processing_jobs
+        SET processed_items = $6,
+            failed_items = $7,
+            progress_percentage = $8,
+            updated_at = NOW()
+        WHERE id = $1
+    """,
+    "processing_jobs.get_results": """
+        SELECT id, status, total_items, result_data
+        FROM processing_jobs
+        WHERE id = $1 AND user_id = $2
+    """,
+    # Large results (services/result_store.py): compressed chunks written in one statement.
+    # Chunks past the new count (left by an earlier, longer write) are removed.
+    "processing_job_results.save_chunks": """
+        WITH stale AS (
+            DELETE FROM processing_job_results
+            WHERE job_id = $1 AND chunk_index >= $7
+        )
+        INSERT INTO processing_job_results (job_id, chunk_index, first_item, item_count, data, encoding)
+        SELECT $1, c.chunk_index, c.first_item, c.item_count, c.data, $6
+        FROM unnest($2::int[], $3::int[], $4::int[], $5::bytea[])
+            AS c(chunk_index, first_item, item_count, data)
+        ON CONFLICT (job_id, chunk_index) DO UPDATE
+        SET first_item = EXCLUDED.first_item,
+            item_count = EXCLUDED.item_count,
+            data = EXCLUDED.data,
+            encoding = EXCLUDED.encoding
+    """,
+    # Chunks overlapping items [$2, $3)
+    "processing_job_results.get_range": """
+        SELECT first_item, item_count, data
+        FROM processing_job_results
+        WHERE job_id = $1 AND first_item < $3 AND first_item + item_count > $2
+        ORDER BY chunk_index
+    """,
+    "processing_job_items.list_by_job": """
+        SELECT item_id, status, result_data
+        FROM processing_job_items
+        WHERE job_id = $1
+    """,
+    "processing_job_items.update_status": """
+        UPDATE processing_job_items
+        SET status = $1,
+            result_data = $2,
+            error_message = $3,
+            started_at = CASE WHEN $1 = 'processing' THEN NOW() ELSE started_at END,
+            completed_at = CASE WHEN $1 IN ('completed', 'failed') THEN NOW() ELSE completed_at END
+        WHERE job_id = $4 AND item_id = $5
+    """,
+}
+
+# Read-only reporting/listing queries that tolerate replica lag and may be
+# routed to a read replica. Anything read right after a write in the same
+# flow (e.g. a resume just stored and then embedded) must NOT be listed here.
+REPLICA_QUERIES: FrozenSet[str] = frozenset({
+    "resumes.candidate_pool_page",
+    "resume_analysis.page_by_user",
+    "resume_analysis.list_by_user",
+    "resume_analysis.list_by_user_and_job",
+    "resume_analysis.get_with_resume",
+    "resume_analysis.get_many_with_resume",
+    "ai_cache.stats",
+})
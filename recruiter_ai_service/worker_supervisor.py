@@ -0,0 +1,228 @@
+"""
+Multi-process supervisor for the queue worker
+Runs N QueueWorker processes (each with its own event loop, DB pools and Redis
+client) so CPU-heavy steps use every core. Children report heartbeats and
+metrics over a multiprocessing queue; the supervisor restarts crashed or hung
+children and coordinates a graceful drain on SIGTERM/SIGINT.
+
+    WORKER_PROCESSES=auto python queue_worker.py
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_worker_processes() -> int:
+    """WORKER_PROCESSES: a number, or 'auto' for one process per core"""
+    value = os.getenv("WORKER_PROCESSES", "1").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def _worker_process(index: int, status_queue, stop_event, llm_quota: int):
+    """Child entry point: run one QueueWorker until the supervisor asks it to drain"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    # Signals go to the supervisor, which drains children through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    # The provider quota is shared by all processes, not granted to each
+    os.environ["LLM_MAX_CONCURRENCY"] = str(llm_quota)
+
+    from queue_worker import QueueWorker
+
+    async def run():
+        worker = QueueWorker(
+            os.getenv("REDIS_URL", "redis://localhost:6379"),
+            int(os.getenv("MAX_CONCURRENT_JOBS", "5"))
+        )
+        interval = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "5"))
+
+        async def heartbeat():
+            while True:
+                try:
+                    status_queue.put_nowait({
+                        "worker": index,
+                        "pid": os.getpid(),
+                        "timestamp": time.time(),
+                        "metrics": worker.get_metrics()
+                    })
+                except queue.Full:
+                    pass
+
+                if stop_event.is_set():
+                    await worker.drain()
+                    return
+                await asyncio.sleep(interval)
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            await worker.start()
+        finally:
+            heartbeat_task.cancel()
+
+    asyncio.run(run())
+
+
+class WorkerSupervisor:
+    """Starts, watches and drains the worker processes"""
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.context = multiprocessing.get_context("spawn")
+        self.status_queue = self.context.Queue(maxsize=1000)
+        self.stop_event = self.context.Event()
+        self.heartbeat_timeout = float(os.getenv("WORKER_HEARTBEAT_TIMEOUT_SECONDS", "60"))
+        self.drain_timeout = float(os.getenv("WORKER_DRAIN_TIMEOUT_SECONDS", "120"))
+        self.metrics_interval = float(os.getenv("WORKER_METRICS_LOG_SECONDS", "60"))
+        self.llm_quota = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "20")) // processes)
+
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self.stopping = False
+
+    def run(self):
+        """Block until a shutdown signal has been handled and every child has exited"""
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - supervisor - %(name)s - %(levelname)s - %(message)s'
+        )
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+
+        logger.info(f"Starting {self.processes} queue worker processes")
+        for index in range(self.processes):
+            self.workers[index] = {"restarts": 0, "restart_delay": 1.0, "restart_at": None}
+            self._spawn(index)
+
+        last_metrics_log = time.monotonic()
+        while not self.stopping:
+            self._collect_heartbeats(timeout=1)
+            self._check_workers()
+
+            if time.monotonic() - last_metrics_log >= self.metrics_interval:
+                last_metrics_log = time.monotonic()
+                logger.info(f"Worker metrics: {self.get_metrics()}")
+
+        self._drain()
+
+    def _request_stop(self, signum, frame):
+        logger.info(f"Received signal {signum}, draining workers")
+        self.stopping = True
+
+    def _spawn(self, index: int):
+        process = self.context.Process(
+            target=_worker_process,
+            args=(index, self.status_queue, self.stop_event, self.llm_quota),
+            name=f"queue-worker-{index}",
+            daemon=False
+        )
+        process.start()
+
+        worker = self.workers[index]
+        worker.update({
+            "process": process,
+            "started_at": time.monotonic(),
+            "last_heartbeat": time.monotonic(),
+            "metrics": {},
+            "restart_at": None
+        })
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def _collect_heartbeats(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                beat = self.status_queue.get(timeout=remaining)
+            except queue.Empty:
+                return
+
+            worker = self.workers.get(beat["worker"])
+            if worker and worker.get("process") and worker["process"].pid == beat["pid"]:
+                worker["last_heartbeat"] = time.monotonic()
+                worker["metrics"] = beat["metrics"]
+
+    def _check_workers(self):
+        """Restart children that exited or stopped heartbeating, with backoff against crash loops"""
+        now = time.monotonic()
+        for index, worker in self.workers.items():
+            process = worker.get("process")
+
+            if worker["restart_at"] is not None:
+                if now >= worker["restart_at"]:
+                    worker["restarts"] += 1
+                    self._spawn(index)
+                continue
+
+            if process.is_alive() and now - worker["last_heartbeat"] > self.heartbeat_timeout:
+                logger.error(f"Worker {index} (pid {process.pid}) missed heartbeats for {self.heartbeat_timeout:.0f}s, killing")
+                process.kill()
+                process.join(5)
+
+            if not process.is_alive():
+                # A child that ran for a while gets a fresh backoff
+                if now - worker["started_at"] > 60:
+                    worker["restart_delay"] = 1.0
+                logger.error(
+                    f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, "
+                    f"restarting in {worker['restart_delay']:.0f}s"
+                )
+                worker["restart_at"] = now + worker["restart_delay"]
+                worker["restart_delay"] = min(worker["restart_delay"] * 2, 60.0)
+
+    def _drain(self):
+        """Ask every child to drain, wait for them, then force-stop stragglers"""
+        self.stop_event.set()
+        deadline = time.monotonic() + self.drain_timeout + 10
+
+        for index, worker in self.workers.items():
+            process = worker.get("process")
+            if not process or worker["restart_at"] is not None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {index} (pid {process.pid}) did not drain in time, terminating")
+                process.kill()
+                process.join(5)
+
+        logger.info("All queue workers stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Totals across workers plus per-worker liveness"""
+        totals: Dict[str, Any] = {
+            "jobs_started": 0, "jobs_succeeded": 0, "jobs_failed": 0, "jobs_retried": 0, "jobs_dead_lettered": 0,
+            "items_processed": 0, "active_jobs": 0
+        }
+        per_worker = {}
+
+        for index, worker in self.workers.items():
+            metrics = worker.get("metrics", {})
+            for key in totals:
+                totals[key] += metrics.get(key, 0)
+
+            process: Optional[multiprocessing.Process] = worker.get("process")
+            per_worker[index] = {
+                "pid": process.pid if process else None,
+                "alive": bool(process and process.is_alive()),
+                "restarts": worker["restarts"],
+                "heartbeat_age_seconds": round(time.monotonic() - worker.get("last_heartbeat", time.monotonic()), 1),
+                "active_jobs": metrics.get("active_jobs", 0),
+                "pickup_p95_ms": metrics.get("pickup_latency_ms", {}).get("p95", 0.0)
+            }
+
+        return {"processes": self.processes, **totals, "workers": per_worker}
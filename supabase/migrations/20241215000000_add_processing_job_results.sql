@@ -0,0 +1,17 @@
+-- Compressed chunks of large job results (recruiter_ai_service/services/result_store.py)
+-- processing_jobs.result_data then only holds a reference and a summary
+CREATE TABLE IF NOT EXISTS processing_job_results (
+  job_id UUID NOT NULL REFERENCES processing_jobs(id) ON DELETE CASCADE,
+  chunk_index INTEGER NOT NULL,
+  first_item INTEGER NOT NULL,
+  item_count INTEGER NOT NULL,
+  encoding TEXT NOT NULL DEFAULT 'zlib+json',
+  data BYTEA NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (job_id, chunk_index)
+);
+
+-- Data is already compressed: skip TOAST compression
+ALTER TABLE processing_job_results ALTER COLUMN data SET STORAGE EXTERNAL;
+
+COMMENT ON TABLE processing_job_results IS 'zlib-compressed JSON chunks of large processing job results, read back by page';
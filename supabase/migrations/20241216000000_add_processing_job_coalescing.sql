@@ -0,0 +1,13 @@
+-- Duplicate bulk jobs attached to the running job they duplicate
+-- (recruiter_ai_service/services/job_coalescer.py). The follower's row records its
+-- leader and its queue payload, so it can be completed, failed or requeued even
+-- if the worker running the leader dies.
+ALTER TABLE processing_jobs ADD COLUMN IF NOT EXISTS coalesced_with UUID REFERENCES processing_jobs(id) ON DELETE SET NULL;
+ALTER TABLE processing_jobs ADD COLUMN IF NOT EXISTS coalesced_payload JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_processing_jobs_coalesced_with
+  ON processing_jobs (coalesced_with)
+  WHERE coalesced_with IS NOT NULL;
+
+COMMENT ON COLUMN processing_jobs.coalesced_with IS 'Running job this duplicate follows; settled together with it';
+COMMENT ON COLUMN processing_jobs.coalesced_payload IS 'Queue payload of a follower, re-enqueued if its leader goes away';